@@ -1,8 +1,13 @@
 import streamlit as st
-import json, os, re
+import json, os, re, sys
 import pandas as pd
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nlu_engine import model_registry
+from nlu_engine.classifier_service import IntentClassifierService
+from nlu_engine.dialogue_policy import DialoguePolicy
+
 # =================================================
 # CONFIG
 # =================================================
@@ -92,15 +97,33 @@ def get_entity(entities, etype):
 # =================================================
 # INTENT PREDICTION
 # =================================================
+# Registered by the backend's IntentClassifier.train (TF-IDF + LogReg)
+REGISTERED_MODEL = "backend_intent_model"
+REGISTERED_MODEL_FILE = "intent_model.pkl"
+
+@st.cache_resource
+def load_registered_classifier(version):
+    """The trained model, once per registry version (a new version reloads it)"""
+    path = os.path.join(model_registry.version_path(REGISTERED_MODEL, version), REGISTERED_MODEL_FILE)
+    return IntentClassifierService.from_pickle(path)
+
+@st.cache_resource
+def load_example_classifier(training_examples):
+    return IntentClassifierService.from_examples(training_examples)
+
+def get_classifier():
+    version = model_registry.current_version(REGISTERED_MODEL)
+    if version:
+        return load_registered_classifier(version)
+    # No model trained yet: fit one on intents.json so the lab still works
+    return load_example_classifier(
+        tuple((ex, intent) for intent, data in intents.items() for ex in data["examples"])
+    )
+
+classifier = get_classifier()
+
 def predict_intents(text, top_n=5):
-    text = text.lower()
-    scores = []
-    for intent, data in intents.items():
-        score = sum(1 for ex in data["examples"] if ex.lower() in text)
-        scores.append((intent, score))
-    scores.sort(key=lambda x: x[1], reverse=True)
-    total = sum(s for _, s in scores) or 1
-    return [{"intent": i, "confidence": round(s/total, 3)} for i,s in scores[:top_n]]
+    return classifier.top_k(text, top_n)
 
 # =================================================
 # ENTITY EXTRACTION
@@ -141,43 +164,64 @@ def extract_entities(text):
 # =================================================
 # ACTION HANDLER
 # =================================================
-def execute_action(intent, entities):
-    now = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
-    types = {e["Type"] for e in entities}
-
-    approval_intents = ["open_new_account", "change_pin", "apply_loan", "update_kyc"]
-
-    if intent == "transfer_money":
-        if "AMOUNT" not in types or "ACCOUNT_NUMBER" not in types:
-            return "⚠️ Amount or account number missing"
-
-        tx = {
-            "time": now,
-            "account": get_entity(entities, "ACCOUNT_NUMBER"),
-            "account_type": get_entity(entities, "ACCOUNT_TYPE") or "Unknown",
-            "amount": int(get_entity(entities, "AMOUNT")),
-            "currency": get_entity(entities, "CURRENCY") or "INR"
-        }
-
-        st.session_state.tx_history.append(tx)
-        json.dump(st.session_state.tx_history, open(TX_FILE, "w"), indent=2)
-        return "✅ Transfer recorded successfully"
-
-    if intent in approval_intents:
-        req = {
-            "time": now,
-            "intent": intent,
-            "status": "PENDING",
-            "details": entities
-        }
-        st.session_state.requests.append(req)
-        json.dump(st.session_state.requests, open(REQUEST_FILE, "w"), indent=2)
-        return "🕒 Request submitted for approval"
+def _record_transfer(slots, context):
+    entities = context["entities"]
+    tx = {
+        "time": context["now"],
+        "account": slots["account_number"],
+        "account_type": get_entity(entities, "ACCOUNT_TYPE") or "Unknown",
+        "amount": int(slots["amount"]),
+        "currency": get_entity(entities, "CURRENCY") or "INR"
+    }
+
+    st.session_state.tx_history.append(tx)
+    json.dump(st.session_state.tx_history, open(TX_FILE, "w"), indent=2)
+    return {}
+
+
+def _submit_request(intent, slots, context):
+    req = {
+        "time": context["now"],
+        "intent": intent,
+        "status": "PENDING",
+        "details": context["entities"]
+    }
+    st.session_state.requests.append(req)
+    json.dump(st.session_state.requests, open(REQUEST_FILE, "w"), indent=2)
+
+
+ACTION_POLICY = DialoguePolicy(
+    {
+        "transfer_money": {
+            "slots": ["amount", "account_number"],
+            "prompts": {
+                "amount": "⚠️ Amount or account number missing",
+                "account_number": "⚠️ Amount or account number missing",
+            },
+            "handler": _record_transfer,
+            "template": "✅ Transfer recorded successfully",
+        },
+        "open_new_account": {"approval": True},
+        "change_pin": {"approval": True},
+        "apply_loan": {"approval": True},
+        "update_kyc": {"approval": True},
+        "check_balance": {"template": "💰 Balance: ₹48,920"},
+    },
+    approval=_submit_request,
+    fallback="ℹ️ Request processed",
+)
 
-    if intent == "check_balance":
-        return "💰 Balance: ₹48,920"
 
-    return "ℹ️ Request processed"
+def execute_action(intent, entities):
+    now = datetime.now().strftime("%d-%m-%Y %H:%M:%S")
+    slots = {
+        "amount": get_entity(entities, "AMOUNT"),
+        "account_number": get_entity(entities, "ACCOUNT_NUMBER"),
+    }
+    response, _ = ACTION_POLICY.respond(
+        "", intent, slots=slots, context={"entities": entities, "now": now}
+    )
+    return response
 
 # =================================================
 # UI
@@ -1,48 +1,90 @@
 import os
 import logging
-import pandas as pd
+import tempfile
+import joblib
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 
+from nlu_engine import dataset, model_registry
+from nlu_engine.hashing_features import HashedFeatures
+from nlu_engine.shared_weights import load_joblib
+
 logging.basicConfig(level=logging.INFO)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TRAIN_PATH = os.path.join(BASE_DIR, "data", "training_data.csv")
+REGISTRY_NAME = "chatbot_intent_engine"
+MODEL_FILE = "intent_engine.pkl"
+
+
+def load_bundle(version_dir):
+    # The example matrix is memory-mapped and shared between processes
+    return load_joblib(os.path.join(version_dir, MODEL_FILE))
 
 
 class IntentEngine:
-    def __init__(self, threshold: float = 0.3):
-        self.vectorizer = None
-        self.matrix = None
-        self.labels = []
+    def __init__(self, threshold: float = 0.3, features: str = "tfidf"):
         self.threshold = threshold
+        self.features = features
+        self.watcher = None
 
     def load_model(self):
-        df = pd.read_csv(TRAIN_PATH)
+        """
+        Serve the version matching the training CSV and these settings;
+        retrain() reuses it when one is registered and fits one otherwise,
+        so CSV edits are picked up on every start.
+        """
+        self.retrain()
+        self.watcher = model_registry.ModelWatcher(REGISTRY_NAME, load_bundle)
 
-        df = df.dropna()
-        df["utterance"] = df["utterance"].str.lower().str.strip()
-        df["intent"] = df["intent"].str.lower().str.strip()
+        logging.info("Intent model loaded successfully")
 
-        self.labels = df["intent"].tolist()
-        self.vectorizer = TfidfVectorizer(stop_words="english")
-        self.matrix = self.vectorizer.fit_transform(df["utterance"])
+    def retrain(self):
+        """Fit on the training CSV and publish it as a new registry version."""
+        records = [
+            (text.lower(), intent.lower()) for text, intent in dataset.iter_records(TRAIN_PATH)
+        ]
+        data_hash = dataset.hash_records(records)
+        params = {"threshold": self.threshold, "features": self.features}
 
-        logging.info("Intent model loaded successfully")
+        existing = model_registry.find_version(REGISTRY_NAME, data_hash, params)
+        if existing:
+            model_registry.activate(REGISTRY_NAME, existing)
+            return existing
+
+        labels = [intent for _, intent in records]
+        if self.features == "hashing":
+            vectorizer = HashedFeatures()
+        else:
+            vectorizer = TfidfVectorizer(stop_words="english")
+        matrix = vectorizer.fit_transform([text for text, _ in records])
+
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, MODEL_FILE)
+            joblib.dump((vectorizer, matrix, labels), path)
+            version = model_registry.register(
+                REGISTRY_NAME, path, data_hash=data_hash, params=params
+            )
+
+        logging.info("Intent model version %s registered", version)
+        return version
 
     def predict(self, query: str):
         if not query.strip():
             return "unknown", 0.0
 
-        vec = self.vectorizer.transform([query.lower()])
-        sims = cosine_similarity(vec, self.matrix)[0]
+        # Picks up newly activated versions without blocking
+        vectorizer, matrix, labels = self.watcher.get()
+
+        vec = vectorizer.transform([query.lower()])
+        sims = cosine_similarity(vec, matrix)[0]
         idx = sims.argmax()
         score = float(sims[idx])
 
         if score < self.threshold:
             return "unknown", score
 
-        return self.labels[idx], score
+        return labels[idx], score
 
 
 # ✅ SINGLE GLOBAL ENGINE (IMPORTANT)
@@ -19,6 +19,18 @@ from email.mime.multipart import MIMEMultipart
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+import sys
+
+# Make the project packages (nlu_engine, llm, database, ...) importable
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from nlu_engine import tracing
+from nlu_engine.classifier_service import IntentClassifierService
+from nlu_engine import evaluation
+from nlu_engine import sweep
+from nlu_engine import model_registry
+from nlu_engine import active_learning
+from nlu_engine.cascade import CascadeRouter
+from nlu_engine.conversation_store import ConversationStore
 
 # Load .env with explicit path and error handling
 env_path = Path(__file__).parent.parent / '.env'
@@ -266,9 +278,17 @@ def init_db_real():
         user_id TEXT,
         session_id TEXT,
         device TEXT,
-        location TEXT
+        location TEXT,
+        nlu_ms REAL,
+        dispatch_ms REAL
     )''')
     
+    # Migrate databases created before stage timings were recorded
+    existing = {row[1] for row in c.execute("PRAGMA table_info(queries_real)")}
+    for column in ("nlu_ms", "dispatch_ms"):
+        if column not in existing:
+            c.execute(f"ALTER TABLE queries_real ADD COLUMN {column} REAL")
+    
     c.execute('''CREATE TABLE IF NOT EXISTS training_real (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         timestamp TEXT NOT NULL,
@@ -280,11 +300,44 @@ def init_db_real():
         duration INTEGER NOT NULL
     )''')
     
+    # Cross-validated sweep trials; their params differ per model, so they
+    # are kept as JSON here rather than in training_real's epoch/batch columns
+    c.execute('''CREATE TABLE IF NOT EXISTS sweep_trials (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        model TEXT NOT NULL,
+        params TEXT NOT NULL,
+        cv_folds INTEGER NOT NULL,
+        accuracy REAL NOT NULL,
+        accuracy_std REAL,
+        loss REAL NOT NULL,
+        duration REAL NOT NULL
+    )''')
+    
+    # One-time migration for databases where sweeps were logged into
+    # training_real: move those rows out, then drop the sweep-only columns
+    existing = {row[1] for row in c.execute("PRAGMA table_info(training_real)")}
+    if "params" in existing:
+        if c.execute("SELECT 1 FROM training_real WHERE params IS NOT NULL LIMIT 1").fetchone():
+            c.execute('''INSERT INTO sweep_trials
+                         (timestamp, model, params, cv_folds, accuracy, loss, duration)
+                         SELECT timestamp, model, params, cv_folds, accuracy, loss, duration
+                         FROM training_real WHERE params IS NOT NULL''')
+            c.execute("DELETE FROM training_real WHERE params IS NOT NULL")
+        try:
+            for column in ("model", "params", "cv_folds"):
+                if column in existing:
+                    c.execute(f"ALTER TABLE training_real DROP COLUMN {column}")
+        except sqlite3.OperationalError:
+            # SQLite before 3.35 can't drop columns; they stay, unused and empty
+            pass
+    
     conn.commit()
     conn.close()
 
 def add_real_query(query_text, intent, confidence, success, response_time, 
-                   user_id="anonymous", session_id="session", device="web", location="Unknown"):
+                   user_id="anonymous", session_id="session", device="web", location="Unknown",
+                   nlu_ms=None, dispatch_ms=None):
     """Save query to database"""
     conn = sqlite3.connect('chatbot_data.db')
     c = conn.cursor()
@@ -292,10 +345,10 @@ def add_real_query(query_text, intent, confidence, success, response_time,
     
     c.execute('''INSERT INTO queries_real 
                  (query, intent, confidence, success, timestamp, response_time,
-                  user_id, session_id, device, location)
-                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                  user_id, session_id, device, location, nlu_ms, dispatch_ms)
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
               (query_text, intent, confidence, success, timestamp, response_time,
-               user_id, session_id, device, location))
+               user_id, session_id, device, location, nlu_ms, dispatch_ms))
     conn.commit()
     conn.close()
 
@@ -307,7 +360,7 @@ def get_real_queries(limit=1000):
     except:
         df = pd.DataFrame(columns=['id', 'query', 'intent', 'confidence', 'success', 
                                    'timestamp', 'response_time', 'user_id', 'session_id', 
-                                   'device', 'location'])
+                                   'device', 'location', 'nlu_ms', 'dispatch_ms'])
     conn.close()
     return df
 
@@ -324,6 +377,111 @@ def add_real_training(epochs, batch_size, learning_rate, accuracy, loss, duratio
     conn.commit()
     conn.close()
 
+def add_sweep_trial(result):
+    """Save one sweep.run_sweep result to database"""
+    conn = sqlite3.connect('chatbot_data.db')
+    c = conn.cursor()
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    
+    c.execute('''INSERT INTO sweep_trials
+                 (timestamp, model, params, cv_folds, accuracy, accuracy_std, loss, duration)
+                 VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
+              (timestamp, result['model'], json.dumps(result['params'], sort_keys=True), result['folds'],
+               result['accuracy'], result['accuracy_std'], result['loss'], result['duration']))
+    conn.commit()
+    conn.close()
+
+def resolve_response(intent, intents, faqs=()):
+    """Dispatch stage: pick the FAQ answer for the intent's category"""
+    category = next((i.get('category') for i in intents if i['name'] == intent), None)
+    for faq in faqs:
+        if category and faq.get('category') == category:
+            return faq['answer']
+    return "ℹ️ Request processed"
+
+UNKNOWN_THRESHOLD = 0.4
+
+@st.cache_resource
+def load_intent_classifier(training_examples):
+    """Train the shared classifier once per distinct set of (example, intent) pairs"""
+    return IntentClassifierService.from_examples(training_examples, threshold=UNKNOWN_THRESHOLD)
+
+def get_intent_classifier(intents):
+    return load_intent_classifier(
+        tuple((ex, intent['name']) for intent in intents for ex in intent['examples'])
+    )
+
+@st.cache_resource
+def load_intent_cascade(training_examples):
+    """Keyword automaton -> TF-IDF cascade with thresholds calibrated on a held-out split"""
+    return CascadeRouter.from_examples(training_examples)
+
+def get_intent_cascade(intents):
+    return load_intent_cascade(
+        tuple((ex, intent['name']) for intent in intents for ex in intent['examples'])
+    )
+
+def get_model_evaluation(intents):
+    """Held-out evaluation of the current model, cached by model version"""
+    return evaluation.evaluate_cached(
+        (ex, intent['name']) for intent in intents for ex in intent['examples']
+    )
+
+def run_test_query(query_text, intents, faqs=()):
+    """Run a query through NLU + dispatch and time each stage with perf_counter_ns"""
+    cascade = get_intent_cascade(intents)
+    start = time.perf_counter_ns()
+    
+    # NLU stage: cheapest confident tier wins
+    routed = cascade.route(query_text)
+    matched = routed['intent'] or "unknown"
+    conf = round(routed['confidence'] * 100, 1)
+    nlu_done = time.perf_counter_ns()
+    
+    # Dispatch stage
+    response = resolve_response(matched, intents, faqs)
+    dispatch_done = time.perf_counter_ns()
+    
+    return {
+        "intent": matched,
+        "confidence": conf,
+        "success": matched != "unknown",
+        "response": response,
+        "tier": routed['tier'],
+        "nlu_ms": (nlu_done - start) / 1_000_000,
+        "dispatch_ms": (dispatch_done - nlu_done) / 1_000_000,
+        "response_time": round((dispatch_done - start) / 1_000_000, 3)
+    }
+
+def run_test_batch(queries, intents, faqs=()):
+    """Score a whole test suite with one vectorized NLU call, then dispatch each query"""
+    classifier = get_intent_classifier(intents)
+    start = time.perf_counter_ns()
+    matched, confidences, _ = classifier.predict_batch(queries)
+    nlu_ms = (time.perf_counter_ns() - start) / 1_000_000 / max(len(queries), 1)
+    
+    results = []
+    for query, intent, conf in zip(queries, matched, confidences):
+        dispatch_start = time.perf_counter_ns()
+        response = resolve_response(intent, intents, faqs)
+        dispatch_ms = (time.perf_counter_ns() - dispatch_start) / 1_000_000
+        results.append({
+            "query": query,
+            "intent": intent,
+            "confidence": round(float(conf) * 100, 1),
+            "success": intent != "unknown",
+            "response": response,
+            "nlu_ms": nlu_ms,
+            "dispatch_ms": dispatch_ms,
+            "response_time": round(nlu_ms + dispatch_ms, 3)
+        })
+    return results
+
+@st.cache_resource
+def start_active_learning_miner():
+    """One background log miner per server process"""
+    return active_learning.start_miner(interval=60)
+
 def get_real_training():
     """Load training from database"""
     conn = sqlite3.connect('chatbot_data.db')
@@ -797,20 +955,21 @@ def get_intents_from_db():
     conn.close()
     return result
 
+CONVERSATIONS = ConversationStore('chatbot_data.db')
+
 def add_conversation_to_db(session_id, role, message):
-    conn = sqlite3.connect('chatbot_data.db')
-    c = conn.cursor()
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    c.execute('''INSERT INTO conversations (session_id, role, message, timestamp)
-                 VALUES (?, ?, ?, ?)''', (session_id, role, message, timestamp))
-    conn.commit()
-    conn.close()
+    add_conversation_turns_to_db(session_id, [(role, message)])
 
-def get_conversation_from_db(session_id):
-    conn = sqlite3.connect('chatbot_data.db')
-    df = pd.read_sql_query("SELECT * FROM conversations WHERE session_id = ? ORDER BY timestamp", conn, params=(session_id,))
-    conn.close()
-    return df
+def add_conversation_turns_to_db(session_id, turns):
+    """Write several (role, message) rows in one transaction"""
+    CONVERSATIONS.append_many(
+        session_id, [{"role": role, "content": message} for role, message in turns]
+    )
+
+def get_conversation_from_db(session_id, before_id=None, limit=200):
+    """One page of a conversation (newest page by default), oldest first"""
+    rows = CONVERSATIONS.page(session_id, before_id, limit)
+    return pd.DataFrame(rows, columns=["id", "role", "content", "timestamp"]).rename(columns={"content": "message"})
 
 def search_queries(search_term):
     conn = sqlite3.connect('chatbot_data.db')
@@ -1416,10 +1575,13 @@ if 'queries' not in st.session_state:
             ]
         }
         
+        seed_intents = [{"name": name, "examples": examples} for name, examples in queries_text.items()]
+        
         # ✅ GENERATE 500 INITIAL QUERIES
         for i in range(500):
             intent = random.choice(intents_list)
             query_text = random.choice(queries_text[intent])
+            timing = run_test_query(query_text, seed_intents)
             
             # Spread queries over last 7 days
             hours_ago = random.randint(0, 168)  # 7 days = 168 hours
@@ -1428,11 +1590,13 @@ if 'queries' not in st.session_state:
             query = {
                 "id": i + 1,
                 "query": query_text,
-                "intent": intent,
-                "confidence": random.randint(75, 99),
-                "success": True,
+                "intent": timing['intent'],
+                "confidence": timing['confidence'],
+                "success": timing['success'],
                 "timestamp": timestamp,
-                "response_time": random.randint(100, 500),
+                "response_time": timing['response_time'],
+                "nlu_ms": timing['nlu_ms'],
+                "dispatch_ms": timing['dispatch_ms'],
                 "user_id": f"user_{random.randint(1000, 9999)}",
                 "session_id": f"session_{random.randint(10000, 99999)}",
                 "device": random.choice(["mobile", "desktop", "tablet"]),
@@ -1443,7 +1607,8 @@ if 'queries' not in st.session_state:
             # Save to database
             add_real_query(query['query'], query['intent'], query['confidence'], 
                           query['success'], query['response_time'], query['user_id'],
-                          query['session_id'], query['device'], query['location'])
+                          query['session_id'], query['device'], query['location'],
+                          query['nlu_ms'], query['dispatch_ms'])
         
         print(f"✅ Generated {len(st.session_state.queries)} initial queries")
 
@@ -2288,16 +2453,16 @@ with tab1:
                 for i in range(100):
                     intent = random.choice(intents_list)
                     query_text = random.choice(queries_text[intent])
-                    hours_ago = random.randint(0, 168)
-                    timestamp = (datetime.now() - timedelta(hours=hours_ago)).strftime("%Y-%m-%d %H:%M:%S")
+                    timing = run_test_query(query_text, st.session_state.intents, st.session_state.faqs)
                     
                     add_real_query(
-                        query_text, intent, random.randint(75, 99), True,
-                        random.randint(100, 500),
+                        query_text, timing['intent'], timing['confidence'], timing['success'],
+                        timing['response_time'],
                         f"user_{random.randint(1000, 9999)}",
                         f"session_{random.randint(10000, 99999)}",
                         random.choice(["mobile", "desktop", "tablet"]),
-                        random.choice(["New York", "London", "Tokyo", "Mumbai"])
+                        random.choice(["New York", "London", "Tokyo", "Mumbai"]),
+                        timing['nlu_ms'], timing['dispatch_ms']
                     )
                 
                 st.success("✅ Added 100 queries!")
@@ -2320,16 +2485,16 @@ with tab1:
                 for i in range(500):
                     intent = random.choice(intents_list)
                     query_text = random.choice(queries_text[intent])
-                    hours_ago = random.randint(0, 168)
-                    timestamp = (datetime.now() - timedelta(hours=hours_ago)).strftime("%Y-%m-%d %H:%M:%S")
+                    timing = run_test_query(query_text, st.session_state.intents, st.session_state.faqs)
                     
                     add_real_query(
-                        query_text, intent, random.randint(75, 99), True,
-                        random.randint(100, 500),
+                        query_text, timing['intent'], timing['confidence'], timing['success'],
+                        timing['response_time'],
                         f"user_{random.randint(1000, 9999)}",
                         f"session_{random.randint(10000, 99999)}",
                         random.choice(["mobile", "desktop", "tablet"]),
-                        random.choice(["New York", "London", "Tokyo", "Mumbai", "Singapore"])
+                        random.choice(["New York", "London", "Tokyo", "Mumbai", "Singapore"]),
+                        timing['nlu_ms'], timing['dispatch_ms']
                     )
                 
                 st.success("✅ Added 500 queries!")
@@ -2729,6 +2894,68 @@ with tab2:
     
     st.markdown("---")
     
+    # ================= HYPERPARAMETER SWEEP =================
+    with st.expander("🔬 Hyperparameter Sweep (k-fold CV, all CPU cores)"):
+        col_a, col_b, col_c, col_d = st.columns(4)
+        with col_a:
+            sweep_model = st.selectbox(
+                "Model", ["tfidf", "neural"],
+                format_func=lambda m: {"tfidf": "TF-IDF + LogReg", "neural": "NeuralNLUEngine"}[m]
+            )
+        with col_b:
+            sweep_search = st.selectbox("Search", ["grid", "random"])
+        with col_c:
+            sweep_trials = st.number_input("Random Trials", 2, 100, 12, disabled=sweep_search == "grid")
+        with col_d:
+            sweep_folds = st.slider("CV Folds", 2, 10, 5)
+        
+        default_space = sweep.SEARCH_SPACES[sweep_model]
+        sweep_space = {}
+        space_cols = st.columns(len(default_space))
+        for col, (param, values) in zip(space_cols, default_space.items()):
+            with col:
+                sweep_space[param] = st.multiselect(param, values, default=values, key=f"sweep_{sweep_model}_{param}")
+        
+        n_configs = len(sweep.grid_configs(sweep_space)) if all(sweep_space.values()) else 0
+        if sweep_search == "random":
+            n_configs = min(n_configs, sweep_trials)
+        st.caption(f"{n_configs} configs × {sweep_folds} folds on {os.cpu_count()} CPU cores")
+        
+        if st.button("🔬 RUN SWEEP", use_container_width=True, disabled=n_configs == 0):
+            sweep_pairs = [(ex, intent['name']) for intent in st.session_state.intents for ex in intent['examples']]
+            sweep_progress = st.progress(0)
+            sweep_status = st.empty()
+            
+            def record_trial(result, done, total):
+                params = result['params']
+                add_sweep_trial(result)
+                sweep_progress.progress(done / total)
+                sweep_status.markdown(f"**Trial {done}/{total}** — {json.dumps(params)} → "
+                                      f"{result['accuracy']*100:.2f}% ±{result['accuracy_std']*100:.2f}")
+            
+            sweep_start = time.perf_counter()
+            st.session_state.sweep_results = sweep.run_sweep(
+                sweep_pairs, sweep_model, space=sweep_space, search=sweep_search,
+                n_trials=sweep_trials, folds=sweep_folds, on_result=record_trial
+            )
+            sweep_status.success(f"✅ Sweep finished in {time.perf_counter() - sweep_start:.1f}s")
+        
+        if st.session_state.get('sweep_results'):
+            results = st.session_state.sweep_results
+            best = sweep.best_config(results)
+            st.success(f"""
+            ### 🏆 Best {best['model']} config
+            `{json.dumps(best['params'])}`  
+            CV Accuracy: **{best['accuracy']*100:.2f}% ±{best['accuracy_std']*100:.2f}** over {best['folds']} folds | Loss: **{best['loss']:.4f}**
+            """)
+            st.dataframe(pd.DataFrame([
+                {**r['params'], 'accuracy': r['accuracy'], 'accuracy_std': r['accuracy_std'],
+                 'loss': r['loss'], 'cpu_seconds': r['duration']}
+                for r in results
+            ]), use_container_width=True)
+    
+    st.markdown("---")
+    
     # ================= TRAINING HISTORY =================
     if len(st.session_state.training_history) > 0:
         st.markdown("### 📜 Training History")
@@ -2782,20 +3009,31 @@ with tab3:
         st.warning("⚠️ No training data available. Please train a model first!")
     else:
         metrics = st.session_state.model_metrics
+        evaluation_result = get_model_evaluation(st.session_state.intents)
+        if evaluation_result:
+            metrics = dict(metrics,
+                           accuracy=evaluation_result['accuracy'],
+                           precision=evaluation_result['macro_precision'],
+                           recall=evaluation_result['macro_recall'],
+                           f1_score=evaluation_result['macro_f1'])
         
         # TOP METRICS
         st.markdown("### 🎯 Model Performance KPIs")
+        if evaluation_result:
+            st.caption(f"Held-out evaluation • model version `{evaluation_result['version']}` • "
+                       f"{evaluation_result['train_size']} train / {evaluation_result['test_size']} test examples")
         col1, col2, col3, col4, col5 = st.columns(5)
         with col1:
-            st.metric("Accuracy", f"{metrics['accuracy']*100:.2f}%", delta="+2.3%")
+            st.metric("Accuracy", f"{metrics['accuracy']*100:.2f}%")
         with col2:
-            st.metric("Precision", f"{metrics['precision']*100:.2f}%", delta="+1.8%")
+            st.metric("Precision", f"{metrics['precision']*100:.2f}%")
         with col3:
-            st.metric("Recall", f"{metrics['recall']*100:.2f}%", delta="+1.5%")
+            st.metric("Recall", f"{metrics['recall']*100:.2f}%")
         with col4:
-            st.metric("F1 Score", f"{metrics['f1_score']:.4f}", delta="+0.012")
+            st.metric("F1 Score", f"{metrics['f1_score']:.4f}")
         with col5:
-            st.metric("ROC-AUC", f"{random.uniform(0.92, 0.98):.4f}", delta="+0.015")
+            roc_auc = evaluation_result['macro_roc_auc'] if evaluation_result else float('nan')
+            st.metric("ROC-AUC", f"{roc_auc:.4f}" if not np.isnan(roc_auc) else "n/a")
         
         st.markdown("---")
         
@@ -2866,18 +3104,11 @@ with tab3:
         
         with col1:
             st.markdown("### 🔲 Confusion Matrix Heatmap")
-            intent_names = [intent['name'][:15] for intent in st.session_state.intents[:6]]
-            n = len(intent_names)
-            
-            confusion_matrix = []
-            for i in range(n):
-                row = []
-                for j in range(n):
-                    if i == j:
-                        row.append(random.randint(88, 98))
-                    else:
-                        row.append(random.randint(0, 8))
-                confusion_matrix.append(row)
+            if evaluation_result:
+                intent_names = [name[:15] for name in evaluation_result['labels']]
+                confusion_matrix = evaluation_result['confusion_matrix'].tolist()
+            else:
+                intent_names, confusion_matrix = [], []
             
             fig = go.Figure(data=go.Heatmap(
                 z=confusion_matrix,
@@ -2903,10 +3134,14 @@ with tab3:
         
         with col2:
             st.markdown("### 📊 Matrix Analysis")
-            st.success("**✅ Model Status**: Excellent")
-            st.info(f"**Total Predictions**: {n * random.randint(150, 250)}")
-            st.info(f"**Correct**: {random.randint(88, 95)}%")
-            st.warning(f"**Misclassified**: {random.randint(5, 12)}%")
+            if evaluation_result:
+                total_predictions = int(evaluation_result['confusion_matrix'].sum())
+                correct_pct = evaluation_result['accuracy'] * 100
+                st.info(f"**Total Predictions**: {total_predictions}")
+                st.info(f"**Correct**: {correct_pct:.1f}%")
+                st.warning(f"**Misclassified**: {100 - correct_pct:.1f}%")
+            else:
+                st.warning("Not enough examples for a held-out split")
             
             st.markdown("---")
             
@@ -2923,6 +3158,18 @@ with tab3:
             else:
                 st.warning("⚠️ **Needs Improvement**")
         
+        if evaluation_result:
+            st.markdown("### 🧾 Per-Intent Report")
+            report_df = pd.DataFrame({
+                'Intent': evaluation_result['labels'],
+                'Precision': evaluation_result['precision'].round(3),
+                'Recall': evaluation_result['recall'].round(3),
+                'F1': evaluation_result['f1'].round(3),
+                'ROC-AUC': evaluation_result['roc_auc'].round(3),
+                'Support': evaluation_result['support']
+            })
+            st.dataframe(report_df, use_container_width=True)
+        
         st.markdown("---")
         
         # ADDITIONAL ANALYTICS
@@ -2953,29 +3200,51 @@ with tab3:
 # ===== ENHANCEMENT #7: MODEL COMPARISON =====
         st.markdown("---")
         st.markdown("### 🔀 Model Comparison")
-        if len(st.session_state.training_history) >= 2:
-            col1, col2 = st.columns(2)
-            with col1:
-                model1 = st.selectbox("Model 1", range(len(st.session_state.training_history)), 
-                                     format_func=lambda x: f"Model v{x+1}")
-            with col2:
-                model2 = st.selectbox("Model 2", range(len(st.session_state.training_history)), 
-                                     format_func=lambda x: f"Model v{x+1}")
+        registered_models = model_registry.list_models()
+        if not registered_models:
+            st.info("No models in the registry yet — train one to start comparing versions")
+        else:
+            registry_name = st.selectbox("Registered Model", registered_models)
+            versions = model_registry.list_versions(registry_name)
             
-            if model1 != model2:
-                m1 = st.session_state.training_history[model1]
-                m2 = st.session_state.training_history[model2]
-                
-                comparison_df = pd.DataFrame({
-                    'Metric': ['Accuracy', 'Loss', 'Epochs', 'Duration (s)'],
-                    f'Model v{model1+1}': [m1['accuracy']*100, m1['loss'], m1['epochs'], m1['duration']],
-                    f'Model v{model2+1}': [m2['accuracy']*100, m2['loss'], m2['epochs'], m2['duration']]
-                })
+            if len(versions) >= 2:
+                def version_label(i):
+                    v = versions[i]
+                    return f"{v['version']} ({v['created_at']}){' ✅ current' if v['current'] else ''}"
                 
-                st.dataframe(comparison_df, use_container_width=True)
+                col1, col2 = st.columns(2)
+                with col1:
+                    model1 = st.selectbox("Model 1", range(len(versions)), format_func=version_label)
+                with col2:
+                    model2 = st.selectbox("Model 2", range(len(versions)), index=1, format_func=version_label)
                 
-                winner = model1 if m1['accuracy'] > m2['accuracy'] else model2
-                st.success(f"🏆 Winner: Model v{winner+1} with {max(m1['accuracy'], m2['accuracy'])*100:.2f}% accuracy")
+                if model1 != model2:
+                    m1, m2 = versions[model1], versions[model2]
+                    metric_names = sorted(set(m1['metrics']) | set(m2['metrics']))
+                    rows = [(name, m1['metrics'].get(name), m2['metrics'].get(name)) for name in metric_names]
+                    rows += [
+                        ('training_seconds', m1['training_seconds'], m2['training_seconds']),
+                        ('data_hash', (m1['data_hash'] or '')[:12], (m2['data_hash'] or '')[:12]),
+                        ('params', json.dumps(m1['params']), json.dumps(m2['params'])),
+                    ]
+                    comparison_df = pd.DataFrame(rows, columns=['Metric', m1['version'], m2['version']]).astype(str)
+                    st.dataframe(comparison_df, use_container_width=True)
+                    
+                    score_key = next((k for k in ('val_accuracy', 'accuracy', 'train_accuracy')
+                                      if k in m1['metrics'] and k in m2['metrics']), None)
+                    if score_key:
+                        winner = m1 if m1['metrics'][score_key] >= m2['metrics'][score_key] else m2
+                        st.success(f"🏆 Winner: {winner['version']} with {winner['metrics'][score_key]*100:.2f}% {score_key}")
+            else:
+                st.info("Register at least two versions to compare them")
+            
+            # Rollback / promote any version by moving the CURRENT pointer
+            target = st.selectbox("Serve version", [v['version'] for v in versions],
+                                  index=next((i for i, v in enumerate(versions) if v['current']), 0),
+                                  key="registry_activate")
+            if st.button("🚀 Activate Version"):
+                model_registry.activate(registry_name, target)
+                st.success(f"✅ {registry_name} now serving {target}")
 
 # Continue with remaining tabs in next message due to length...
 
@@ -3074,6 +3343,51 @@ with tab4:
                 if st.button("🗑️ Delete Intent", key=f"del_intent_{intent['id']}"):
                     st.session_state.intents = [i for i in st.session_state.intents if i['id'] != intent['id']]
                     st.rerun()
+    
+    # ================= ACTIVE LEARNING SUGGESTIONS =================
+    st.markdown("---")
+    st.markdown("### 🧲 Suggested Examples from Production Logs")
+    start_active_learning_miner()
+    
+    col1, col2 = st.columns([3, 1])
+    with col2:
+        if st.button("🔄 Scan New Logs", use_container_width=True):
+            queued, clustered = active_learning.run_once()
+            st.success(f"✅ {queued} new queries queued, {clustered} clustered")
+    with col1:
+        al_stats = active_learning.queue_stats()
+        st.caption(f"Pending: {al_stats.get('pending', 0)} | Added: {al_stats.get('accepted', 0)} | "
+                   f"Dismissed: {al_stats.get('dismissed', 0)} — low-confidence and unknown queries, grouped by similarity")
+    
+    intent_names = [i['name'] for i in st.session_state.intents]
+    al_groups = active_learning.suggestions(limit=8)
+    if not al_groups:
+        st.info("No uncertain queries to review yet")
+    
+    for group in al_groups:
+        suggested = group['suggested_intent'] if group['suggested_intent'] in intent_names else None
+        with st.expander(f"🧩 Cluster {group['cluster']} — {group['size']} queries, {group['hits']} hits"
+                         f"{f' | suggested: {suggested}' if suggested else ''}"):
+            for item in group['queries']:
+                col1, col2, col3, col4 = st.columns([4, 2, 1, 1])
+                with col1:
+                    st.markdown(f"`{item['query']}` ({item['confidence']*100:.0f}% → {item['predicted_intent'] or 'unknown'}, ×{item['hits']})")
+                with col2:
+                    target_intent = st.selectbox(
+                        "Intent", intent_names, key=f"al_intent_{item['id']}", label_visibility="collapsed",
+                        index=intent_names.index(suggested) if suggested else 0
+                    )
+                with col3:
+                    if st.button("➕", key=f"al_add_{item['id']}", help="Add as example"):
+                        for intent in st.session_state.intents:
+                            if intent['name'] == target_intent and item['query'] not in intent['examples']:
+                                intent['examples'].append(item['query'])
+                        active_learning.accept(item['id'])
+                        st.rerun()
+                with col4:
+                    if st.button("✖️", key=f"al_dismiss_{item['id']}", help="Dismiss"):
+                        active_learning.dismiss(item['id'])
+                        st.rerun()
 
 # ===== ENHANCEMENT #8: INTENT CONFIDENCE TRACKING =====
     st.markdown("---")
@@ -3627,30 +3941,18 @@ with tab10:
     with col2:
         if st.button("🚀 RUN TEST", type="primary", use_container_width=True):
             if test_query:
-                # Match intent
-                matched = "unknown"
-                conf = random.randint(40, 70)
-                
-                for intent in st.session_state.intents:
-                    for ex in intent['examples']:
-                        if ex.lower() in test_query.lower() or test_query.lower() in ex.lower():
-                            matched = intent['name']
-                            conf = random.randint(80, 99)
-                            break
-                    if matched != "unknown":
-                        break
+                # Run NLU + dispatch with real timings
+                result = run_test_query(test_query, st.session_state.intents, st.session_state.faqs)
+                matched = result['intent']
+                conf = result['confidence']
                 
                 # SAVE TO DATABASE FIRST
-                response_time = random.randint(100, 500)
                 add_real_query(test_query, matched, conf, 
-                              matched != "unknown",
-                              response_time, 
+                              result['success'],
+                              result['response_time'], 
                               "test_user", "test_session",
-                              "desktop", "Test Lab")
-                
-                # Show immediate feedback
-                with st.spinner("Processing query..."):
-                    time.sleep(0.5)
+                              "desktop", "Test Lab",
+                              result['nlu_ms'], result['dispatch_ms'])
                 
                 col_a, col_b, col_c = st.columns(3)
                 with col_a:
@@ -3658,7 +3960,8 @@ with tab10:
                 with col_b:
                     st.metric("Confidence", f"{conf}%")
                 with col_c:
-                    st.metric("Response Time", f"{response_time}ms")
+                    st.metric("Response Time", f"{result['response_time']:.3f}ms")
+                st.caption(f"⏱️ NLU: {result['nlu_ms']:.3f}ms ({result['tier']} tier) | Dispatch: {result['dispatch_ms']:.3f}ms")
                 
                 if matched != "unknown":
                     st.success(f"✅ Query successfully processed and saved to database!")
@@ -3708,6 +4011,8 @@ with tab10:
                 with col3:
                     st.markdown("**Response Time:**")
                     st.info(f"⏱️ {row['response_time']}ms")
+                    if pd.notna(row.get('nlu_ms')):
+                        st.caption(f"NLU {row['nlu_ms']:.3f}ms • Dispatch {row['dispatch_ms']:.3f}ms")
                 
                 with col4:
                     st.markdown("**Device:**")
@@ -3726,72 +4031,83 @@ with tab10:
         st.markdown("Test multiple queries simultaneously")
         
         batch_queries = st.text_area(
-            "Enter queries (one per line)",
-            placeholder="What's my balance?\nTransfer $100\nWhere is ATM?",
+            "Enter queries (one per line, optionally `query | expected_intent`)",
+            placeholder="What's my balance? | check_balance\nTransfer $100 | transfer_money\nWhere is ATM?",
             height=150
         )
         
         if st.button("🔥 RUN BATCH TEST", type="primary"):
             if batch_queries:
-                queries_list = [q.strip() for q in batch_queries.split('\n') if q.strip()]
+                lines = [q.strip() for q in batch_queries.split('\n') if q.strip()]
+                queries_list = [line.split('|', 1)[0].strip() for line in lines]
+                expected = [line.split('|', 1)[1].strip() if '|' in line else None for line in lines]
                 
                 if len(queries_list) > 0:
                     with st.spinner(f"Processing {len(queries_list)} queries..."):
-                        progress_bar = st.progress(0)
-                        results = []
+                        results = run_test_batch(queries_list, st.session_state.intents, st.session_state.faqs)
                         
-                        for idx, query in enumerate(queries_list):
-                            # Match intent
-                            matched = "unknown"
-                            conf = random.randint(40, 70)
-                            
-                            for intent in st.session_state.intents:
-                                for ex in intent['examples']:
-                                    if ex.lower() in query.lower() or query.lower() in ex.lower():
-                                        matched = intent['name']
-                                        conf = random.randint(80, 99)
-                                        break
-                                if matched != "unknown":
-                                    break
-                            
-                            # Save to database
-                            response_time = random.randint(100, 500)
-                            add_real_query(query, matched, conf,
-                                          matched != "unknown",
-                                          response_time,
+                        batch_session = f"batch_session_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+                        for idx, result in enumerate(results):
+                            add_real_query(result['query'], result['intent'], result['confidence'],
+                                          result['success'],
+                                          result['response_time'],
                                           f"batch_user_{idx}",
-                                          f"batch_session_{datetime.now().strftime('%Y%m%d%H%M%S')}",
-                                          "desktop", "Batch Test")
-                            
-                            results.append({
-                                'query': query,
-                                'intent': matched,
-                                'confidence': conf,
-                                'success': matched != "unknown"
-                            })
-                            
-                            progress_bar.progress((idx + 1) / len(queries_list))
-                            time.sleep(0.2)
+                                          batch_session,
+                                          "desktop", "Batch Test",
+                                          result['nlu_ms'], result['dispatch_ms'])
                         
-                        st.success(f"✅ Batch test complete! Processed {len(queries_list)} queries")
-                        
-                        # Show summary
-                        success_count = sum(1 for r in results if r['success'])
-                        avg_conf = sum(r['confidence'] for r in results) / len(results)
-                        
-                        col1, col2, col3 = st.columns(3)
-                        with col1:
-                            st.metric("Success Rate", f"{success_count/len(results)*100:.1f}%")
-                        with col2:
-                            st.metric("Avg Confidence", f"{avg_conf:.1f}%")
-                        with col3:
-                            st.metric("Total Queries", len(results))
-                        
-                        st.balloons()
-                        time.sleep(2)
-                        st.rerun()
+                        report = {"results": results, "confusion": None}
+                        labelled = [(q, e) for q, e in zip(queries_list, expected) if e]
+                        if labelled:
+                            labels, matrix, accuracy = get_intent_classifier(st.session_state.intents).confusion_matrix(
+                                [q for q, _ in labelled], [e for _, e in labelled]
+                            )
+                            report["confusion"] = {"labels": labels, "matrix": matrix.tolist(), "accuracy": accuracy}
+                        st.session_state.batch_test_report = report
                 else:
                     st.error("Please enter at least one query")
+        
+        report = st.session_state.get('batch_test_report')
+        if report:
+            results = report["results"]
+            st.success(f"✅ Batch test complete! Processed {len(results)} queries")
+            
+            # Show summary
+            success_count = sum(1 for r in results if r['success'])
+            avg_conf = sum(r['confidence'] for r in results) / len(results)
+            avg_time = sum(r['response_time'] for r in results) / len(results)
+            
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Success Rate", f"{success_count/len(results)*100:.1f}%")
+            with col2:
+                st.metric("Avg Confidence", f"{avg_conf:.1f}%")
+            with col3:
+                st.metric("Total Queries", len(results))
+            with col4:
+                st.metric("Avg Response", f"{avg_time:.3f}ms")
+            
+            st.dataframe(pd.DataFrame(results)[['query', 'intent', 'confidence', 'response_time']],
+                        use_container_width=True)
+            
+            if report["confusion"]:
+                confusion = report["confusion"]
+                st.metric("Test Suite Accuracy", f"{confusion['accuracy']*100:.1f}%")
+                fig = px.imshow(
+                    confusion["matrix"],
+                    x=confusion["labels"],
+                    y=confusion["labels"],
+                    labels=dict(x="Predicted", y="Expected", color="Count"),
+                    text_auto=True,
+                    color_continuous_scale='Blues'
+                )
+                fig.update_layout(
+                    paper_bgcolor='rgba(0,0,0,0)',
+                    plot_bgcolor='rgba(0,0,0,0)',
+                    font=dict(color=text_primary),
+                    height=400
+                )
+                st.plotly_chart(fig, use_container_width=True)
     
     st.markdown("---")
     
@@ -3805,9 +4121,11 @@ with tab10:
         if st.button("💰 Test Balance Check", use_container_width=True):
             test_queries = ["What's my balance?", "Show account balance", "Check my savings"]
             for q in test_queries:
-                add_real_query(q, "check_balance", random.randint(85, 98), True,
-                              random.randint(100, 300), "template_user", "template_session",
-                              "desktop", "Template Test")
+                timing = run_test_query(q, st.session_state.intents, st.session_state.faqs)
+                add_real_query(q, timing['intent'], timing['confidence'], timing['success'],
+                              timing['response_time'], "template_user", "template_session",
+                              "desktop", "Template Test",
+                              timing['nlu_ms'], timing['dispatch_ms'])
             st.success("✅ Added 3 balance queries!")
             time.sleep(1)
             st.rerun()
@@ -3817,9 +4135,11 @@ with tab10:
         if st.button("💸 Test Transfers", use_container_width=True):
             test_queries = ["Transfer $500", "Send money to savings", "Move funds"]
             for q in test_queries:
-                add_real_query(q, "transfer_money", random.randint(85, 98), True,
-                              random.randint(100, 300), "template_user", "template_session",
-                              "desktop", "Template Test")
+                timing = run_test_query(q, st.session_state.intents, st.session_state.faqs)
+                add_real_query(q, timing['intent'], timing['confidence'], timing['success'],
+                              timing['response_time'], "template_user", "template_session",
+                              "desktop", "Template Test",
+                              timing['nlu_ms'], timing['dispatch_ms'])
             st.success("✅ Added 3 transfer queries!")
             time.sleep(1)
             st.rerun()
@@ -3829,9 +4149,11 @@ with tab10:
         if st.button("🔒 Test Card Block", use_container_width=True):
             test_queries = ["Block my card", "I lost my card", "Freeze credit card"]
             for q in test_queries:
-                add_real_query(q, "card_block", random.randint(85, 98), True,
-                              random.randint(100, 300), "template_user", "template_session",
-                              "desktop", "Template Test")
+                timing = run_test_query(q, st.session_state.intents, st.session_state.faqs)
+                add_real_query(q, timing['intent'], timing['confidence'], timing['success'],
+                              timing['response_time'], "template_user", "template_session",
+                              "desktop", "Template Test",
+                              timing['nlu_ms'], timing['dispatch_ms'])
             st.success("✅ Added 3 security queries!")
             time.sleep(1)
             st.rerun()
@@ -4453,6 +4775,67 @@ with tab17:
     
     st.markdown("---")
     
+    # Per-turn trace breakdown
+    st.markdown("### 🔥 Per-turn Trace Breakdown")
+
+    traces = tracing.load_trace_file(tracing.TRACE_FILE, limit=50)
+    traces.update(tracing.recent_traces(limit=50))
+
+    if traces:
+        trace_options = {
+            f"{spans[0]['name']} • {datetime.fromtimestamp(spans[0]['start_ns'] / 1e9).strftime('%H:%M:%S')} • {tid[:8]}": tid
+            for tid, spans in reversed(list(traces.items()))
+        }
+        selected_turn = st.selectbox("Select chat turn", list(trace_options.keys()), key="trace_turn_select")
+        rows = pd.DataFrame(tracing.flame_rows(traces[trace_options[selected_turn]]))
+
+        fig = go.Figure(go.Bar(
+            y=[f"{'  ' * d}{n}" for d, n in zip(rows['depth'], rows['name'])],
+            x=rows['duration_ms'],
+            base=rows['offset_ms'],
+            orientation='h',
+            marker_color=['#ef4444' if s == 'error' else '#667eea' for s in rows['status']],
+            text=[f"{v:.1f}ms" for v in rows['duration_ms']],
+            textposition='inside'
+        ))
+        fig.update_layout(
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            font=dict(color=text_primary),
+            xaxis_title="Time since turn start (ms)",
+            yaxis=dict(autorange="reversed"),
+            height=max(250, 45 * len(rows))
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+        stage_totals = rows[rows['depth'] > 0].groupby('name')['duration_ms'].sum().sort_values(ascending=False)
+        if not stage_totals.empty:
+            st.caption(f"Slowest stage: **{stage_totals.index[0]}** ({stage_totals.iloc[0]:.1f}ms of {rows['duration_ms'].iloc[0]:.1f}ms)")
+    else:
+        st.info("No traces recorded yet. Set BANKBOT_TRACE_FILE for the chatbot process to export per-turn spans here.")
+
+    st.markdown("---")
+
+    # Cascade tier breakdown
+    st.markdown("### 🪜 Intent Cascade Tiers")
+
+    cascade_stats = pd.DataFrame(get_intent_cascade(st.session_state.intents).stats())
+    if cascade_stats['reached'].sum():
+        cascade_stats['share_resolved'] = (cascade_stats['share_resolved'] * 100).round(1)
+        cascade_stats['resolve_rate'] = (cascade_stats['resolve_rate'] * 100).round(1)
+        st.dataframe(
+            cascade_stats.rename(columns={
+                'tier': 'Tier', 'threshold': 'Threshold', 'reached': 'Reached',
+                'resolved': 'Resolved', 'share_resolved': '% of Traffic',
+                'resolve_rate': '% Resolved When Reached', 'mean_ms': 'Mean (ms)', 'p95_ms': 'p95 (ms)'
+            }),
+            use_container_width=True, hide_index=True
+        )
+    else:
+        st.info("No queries routed yet. Run a test query to see which tier answers it.")
+
+    st.markdown("---")
+
     # Scheduled Tasks
     st.markdown("### ⏰ Scheduled Tasks & Automation")
     
@@ -1,31 +1,229 @@
-from fastapi import FastAPI
+import asyncio
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import httpx
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
 from bankbot_ai.backend.database import SessionLocal, ChatLog
 from bankbot_ai.backend.nlu.intent_classifier import IntentClassifier
+from database.bank_service import get_balance
+from nlu_engine.dialogue_policy import DialoguePolicy
+from nlu_engine.entity_extractor import extract_account_number
+from nlu_engine.rate_limit import RATE_LIMIT_MESSAGE, SHED_MESSAGE, check_rate, get_admission
+from nlu_engine.response_catalog import get_catalog
+from nlu_engine.session_state import get_store
+from nlu_engine.shared_weights import memory_usage
 
 app = FastAPI(title="BankBot Backend")
 
 # Load ML model once
 clf = IntentClassifier()
 
+# CPU-bound NLU + dialogue steps run here, never on the event loop
+NLU_WORKERS = int(os.getenv("BANKBOT_NLU_WORKERS", str(os.cpu_count() or 4)))
+nlu_pool = ThreadPoolExecutor(max_workers=NLU_WORKERS, thread_name_prefix="nlu")
+
+# Below this the message goes to the LLM instead of a canned flow
+CONFIDENCE_THRESHOLD = 0.5
+SUCCESS_THRESHOLD = 0.5
+MAX_BATCH = 64
+
+# Completion server with POST /complete and /stream (load_test.py runs a stub);
+# unset uses Groq via llm.llm_groq
+LLM_URL = os.getenv("BANKBOT_LLM_URL")
+LLM_TIMEOUT = float(os.getenv("BANKBOT_LLM_TIMEOUT", "30"))
+http_client = None
+
+CATALOG = get_catalog()
+
+AMOUNT_PATTERN = re.compile(r"(?:₹|rs\.?\s*|\$)?\s*(\d+(?:,\d{3})*(?:\.\d+)?)", re.I)
+
 
 # ---------- Request / Response Schemas ----------
 class ChatRequest(BaseModel):
     message: str
+    session_id: Optional[str] = None
+    locale: Optional[str] = None
+    channel: str = "text"          # "text" | "markdown"
 
 
 class ChatResponse(BaseModel):
+    response: str
     intent: str
     confidence: float
+    route: str
+    entities: dict
+    latency_ms: float
+
+
+class BatchRequest(BaseModel):
+    messages: List[str]
+
+
+class BatchResponse(BaseModel):
+    results: List[ChatResponse]
+
+
+# ---------- Dialogue Policy ----------
+def extract_amount(text):
+    # Account numbers are not amounts
+    account = extract_account_number(text)
+    for match in AMOUNT_PATTERN.finditer(text):
+        value = match.group(1).replace(",", "")
+        if value != account:
+            return value
+    return None
+
+
+def _balance(slots, context):
+    balance = get_balance(slots["account_number"])
+    if balance is None:
+        return CATALOG.render("balance.not_found", slots, context.get("locale"), context.get("channel"))
+    return {"balance": balance}
+
+
+EXTRACTORS = {"account_number": extract_account_number, "amount": extract_amount}
+
+POLICY = DialoguePolicy(
+    {
+        "check_balance": {
+            "slots": ["account_number"],
+            "prompts": {"account_number": CATALOG.ref("balance.ask_account")},
+            "handler": _balance,
+            "template": CATALOG.ref("balance"),
+        },
+        "transfer_money": {
+            "slots": ["amount", "account_number"],
+            "prompts": {
+                "amount": CATALOG.ref("transfer.ask_amount"),
+                "account_number": CATALOG.ref("transfer.ask_account"),
+            },
+            "template": CATALOG.ref("transfer.initiated"),
+        },
+        "card_block": {"template": CATALOG.ref("card.blocked")},
+    },
+    extractors=EXTRACTORS,
+    # None marks "ask the LLM"; that call is awaited outside the pool
+    fallback=lambda text: None,
+)
+
+
+def dialogue_step(text, intent, confidence, session_id=None, locale=None, channel="text"):
+    """Entity extraction + one policy turn. Runs in nlu_pool."""
+    if confidence < CONFIDENCE_THRESHOLD or intent == "llm_fallback":
+        intent = None
+
+    entities = {name: value for name, extract in EXTRACTORS.items()
+                if (value := extract(text)) is not None}
+
+    with get_store().session(session_id) as state:
+        response, route = POLICY.respond(text, intent, state, context={"locale": locale, "channel": channel})
+    return response, route, entities
+
+
+def nlu_and_dialogue(text, session_id=None, locale=None, channel="text"):
+    intent, confidence = clf.predict(text)
+    return (intent, confidence) + dialogue_step(text, intent, confidence, session_id, locale, channel)
+
+
+# ---------- LLM Fallback ----------
+async def llm_answer(text):
+    # Past the in-flight cap a canned reply beats queueing behind the LLM
+    with get_admission().admit("llm") as admitted:
+        if not admitted:
+            return SHED_MESSAGE
+
+        if LLM_URL:
+            resp = await http_client.post(f"{LLM_URL}/complete", json={"prompt": text})
+            resp.raise_for_status()
+            return resp.json()["text"]
+
+        from llm.llm_groq import grok_answer
+        return await asyncio.to_thread(grok_answer, text)
+
+
+async def llm_stream(text):
+    if not LLM_URL:
+        yield await llm_answer(text)
+        return
+
+    with get_admission().admit("llm") as admitted:
+        if not admitted:
+            yield SHED_MESSAGE
+            return
+
+        async with http_client.stream("POST", f"{LLM_URL}/stream", json={"prompt": text}) as resp:
+            resp.raise_for_status()
+            async for chunk in resp.aiter_text():
+                yield chunk
+
+
+# ---------- Rate Limiting ----------
+async def enforce_rate_limit(request, session_id=None, cost=1):
+    """Token bucket per session (or client IP without one); 429 when it's empty."""
+    key = f"session:{session_id}" if session_id else f"ip:{request.client.host}"
+    # The SQLite store can wait on another process's write lock; keep that off the event loop
+    allowed, retry_after = await asyncio.to_thread(check_rate, key, cost)
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail=RATE_LIMIT_MESSAGE,
+            headers={"Retry-After": str(max(1, round(retry_after)))},
+        )
+
+
+def shed_result(start):
+    return {
+        "response": SHED_MESSAGE,
+        "intent": "unknown",
+        "confidence": 0.0,
+        "route": "shed",
+        "entities": {},
+        "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+# ---------- Logging ----------
+def log_chats(rows):
+    """Write (query, intent, confidence) rows in one transaction, after the response."""
+    db = SessionLocal()
+    try:
+        db.add_all([
+            ChatLog(
+                user_query=query,
+                predicted_intent=intent,
+                confidence=confidence,
+                success=1 if confidence >= SUCCESS_THRESHOLD else 0
+            )
+            for query, intent, confidence in rows
+        ])
+        db.commit()
+    finally:
+        db.close()
 
 
 # ---------- Startup ----------
 @app.on_event("startup")
-def on_startup():
+async def on_startup():
+    global http_client
     # Ensure DB tables exist
     from bankbot_ai.backend.database import create_db
-    create_db()
+    await asyncio.to_thread(create_db)
+    http_client = httpx.AsyncClient(timeout=LLM_TIMEOUT)
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    if http_client is not None:
+        await http_client.aclose()
+    nlu_pool.shutdown(wait=False)
 
 
 # ---------- Health ----------
@@ -34,25 +232,131 @@ def root():
     return {"status": "BankBot backend running"}
 
 
+@app.get("/health/memory")
+def worker_memory():
+    """This worker's RSS and PSS; PSS drops when model pages are shared."""
+    return {"pid": os.getpid(), "model_version": clf.watcher.version, **memory_usage()}
+
+
+@app.get("/health/admission")
+def admission_metrics():
+    """This worker's admitted / rejected counts and in-flight work."""
+    return get_admission().metrics()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    return get_admission().prometheus_text()
+
+
 # ---------- Chat API ----------
-@app.post("/chat", response_model=ChatResponse)
-def chat(req: ChatRequest):
-    intent, confidence = clf.predict(req.message)
+async def run_pipeline(text, session_id=None, locale=None, channel="text"):
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
 
-    # Log to DB
-    db = SessionLocal()
-    log = ChatLog(
-        user_query=req.message,
-        predicted_intent=intent,
-        confidence=confidence,
-        success=1 if confidence >= 0.5 else 0
-    )
-    db.add(log)
-    db.commit()
-    db.close()
+    with get_admission().admit("queue") as admitted:
+        if not admitted:
+            return shed_result(start)
+        intent, confidence, response, route, entities = await loop.run_in_executor(
+            nlu_pool, nlu_and_dialogue, text, session_id, locale, channel
+        )
+    if route == "fallback":
+        response = await llm_answer(text)
 
     return {
+        "response": response,
         "intent": intent,
-        "confidence": round(confidence, 3)
+        "confidence": round(confidence, 3),
+        "route": route,
+        "entities": entities,
+        "latency_ms": round((time.perf_counter() - start) * 1000, 3),
     }
 
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(req: ChatRequest, request: Request, background: BackgroundTasks):
+    await enforce_rate_limit(request, req.session_id)
+    result = await run_pipeline(req.message, req.session_id, req.locale, req.channel)
+    if result["route"] != "shed":
+        background.add_task(log_chats, [(req.message, result["intent"], result["confidence"])])
+    return result
+
+
+@app.post("/chat/batch", response_model=BatchResponse)
+async def chat_batch(req: BatchRequest, request: Request, background: BackgroundTasks):
+    """Stateless turns for many messages: one vectorized NLU call, LLM fallbacks in parallel."""
+    messages = req.messages[:MAX_BATCH]
+    # Each message costs a token, up to a full bucket per batch
+    await enforce_rate_limit(request, cost=max(1, len(messages)))
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+
+    with get_admission().admit("queue") as admitted:
+        if not admitted:
+            return {"results": [shed_result(start) for _ in messages]}
+        predictions = await loop.run_in_executor(nlu_pool, clf.predict_batch, messages)
+        steps = await asyncio.gather(*[
+            loop.run_in_executor(nlu_pool, dialogue_step, text, intent, confidence)
+            for text, (intent, confidence) in zip(messages, predictions)
+        ])
+    llm_replies = await asyncio.gather(*[
+        llm_answer(text) for text, (_, route, _) in zip(messages, steps) if route == "fallback"
+    ])
+
+    replies = iter(llm_replies)
+    elapsed_ms = round((time.perf_counter() - start) * 1000, 3)
+    results = [
+        {
+            "response": next(replies) if route == "fallback" else response,
+            "intent": intent,
+            "confidence": round(confidence, 3),
+            "route": route,
+            "entities": entities,
+            "latency_ms": elapsed_ms,
+        }
+        for (intent, confidence), (response, route, entities) in zip(predictions, steps)
+    ]
+
+    background.add_task(log_chats, [(m, r["intent"], r["confidence"]) for m, r in zip(messages, results)])
+    return {"results": results}
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest, request: Request):
+    """
+    Server-sent events: "nlu" as soon as the intent is known, then
+    "token" chunks of the reply (streamed from the LLM on fallback), then "done".
+    """
+    await enforce_rate_limit(request, req.session_id)
+    loop = asyncio.get_running_loop()
+
+    async def events():
+        start = time.perf_counter()
+        with get_admission().admit("queue") as admitted:
+            if not admitted:
+                result = shed_result(start)
+                yield sse("token", {"text": result["response"]})
+                yield sse("done", {"latency_ms": result["latency_ms"], "route": "shed"})
+                return
+            intent, confidence, response, route, entities = await loop.run_in_executor(
+                nlu_pool, nlu_and_dialogue, req.message, req.session_id, req.locale, req.channel
+            )
+        yield sse("nlu", {"intent": intent, "confidence": round(confidence, 3),
+                          "route": route, "entities": entities})
+
+        if route == "fallback":
+            async for chunk in llm_stream(req.message):
+                yield sse("token", {"text": chunk})
+        else:
+            yield sse("token", {"text": response})
+
+        yield sse("done", {"latency_ms": round((time.perf_counter() - start) * 1000, 3)})
+
+        # The client already has its reply
+        await asyncio.to_thread(log_chats, [(req.message, intent, confidence)])
+
+    return StreamingResponse(events(), media_type="text/event-stream")
@@ -0,0 +1,29 @@
+# ==============================
+# Gunicorn: preload-then-fork
+# ==============================
+#
+# The app (and with it the intent model) is imported once in the master.
+# The GC is frozen and then the workers are forked, so every worker
+# serves the same copy-on-write model pages instead of loading its own.
+#
+#   BANKBOT_WORKERS=8 gunicorn -c database/auth/backend/gunicorn_conf.py bankbot_ai.backend.app:app
+#
+# Compare per-worker memory with GET /health/memory on each worker.
+
+import os
+
+from nlu_engine.shared_weights import freeze_for_fork
+
+bind = os.getenv("BANKBOT_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("BANKBOT_WORKERS", str(os.cpu_count() or 2)))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 60
+
+
+def when_ready(server):
+    # Runs in the master after the preloaded app is imported, before any fork.
+    # Nothing has run inference yet, so no torch/BLAS thread pools exist that
+    # a fork could break.
+    freeze_for_fork()
+    server.log.info("Models preloaded; GC frozen before forking %s workers", workers)
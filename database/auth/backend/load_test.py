@@ -0,0 +1,196 @@
+# ==============================
+# Chat API Load Test
+# ==============================
+#
+# Drives /chat (or /chat/batch) at fixed concurrency levels with httpx
+# and reports throughput and latency percentiles per level. A stub LLM
+# with a fixed delay stands in for Groq so the fallback path is
+# exercised without network calls or API quota.
+#
+#   # 1. stub LLM (or let --stub-llm start it in this process)
+#   python -m bankbot_ai.backend.load_test --serve-stub-llm --llm-latency-ms 300
+#
+#   # 2. backend pointed at the stub (rate limit raised so it measures capacity,
+#   #    not the per-session token buckets)
+#   BANKBOT_LLM_URL=http://127.0.0.1:8100 BANKBOT_RATE_LIMIT=100000 BANKBOT_RATE_BURST=100000 \
+#       uvicorn bankbot_ai.backend.app:app --port 8000
+#
+#   # 3. load
+#   python -m bankbot_ai.backend.load_test --concurrency 1 8 32 64 --requests 500
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import threading
+import time
+
+import httpx
+import numpy as np
+
+SAMPLE_MESSAGES = [
+    "What is my account balance?",
+    "check balance for 999001",
+    "transfer 500 to 886877",
+    "send money",
+    "block my debit card",
+    "what are your branch timings on sunday?",
+    "how do I apply for a home loan?",
+    "hello",
+]
+
+
+# ---------- Stub LLM ----------
+def create_stub_llm(latency_ms=300, tokens=20):
+    from fastapi import FastAPI
+    from fastapi.responses import StreamingResponse
+    from pydantic import BaseModel
+
+    stub = FastAPI(title="Stub LLM")
+
+    class Prompt(BaseModel):
+        prompt: str
+
+    def reply(prompt):
+        return " ".join(["stub"] * tokens) + f" ({len(prompt)} chars)"
+
+    @stub.post("/complete")
+    async def complete(req: Prompt):
+        await asyncio.sleep(latency_ms / 1000)
+        return {"text": reply(req.prompt)}
+
+    @stub.post("/stream")
+    async def stream(req: Prompt):
+        async def chunks():
+            words = reply(req.prompt).split(" ")
+            for word in words:
+                await asyncio.sleep(latency_ms / 1000 / len(words))
+                yield word + " "
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    return stub
+
+
+def serve_stub_llm(port=8100, latency_ms=300, background=False):
+    import uvicorn
+
+    config = uvicorn.Config(create_stub_llm(latency_ms), host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    if not background:
+        server.run()
+        return None
+
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+# ---------- Load generator ----------
+async def run_level(url, endpoint, concurrency, total, batch_size, seed):
+    rng = random.Random(seed)
+    latencies = []
+    errors = rate_limited = shed = 0
+    queue = asyncio.Queue()
+    for i in range(total):
+        queue.put_nowait(i)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=60, limits=limits) as client:
+
+        async def worker(worker_id):
+            nonlocal errors, rate_limited, shed
+            while True:
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                if endpoint == "batch":
+                    payload = {"messages": [rng.choice(SAMPLE_MESSAGES) for _ in range(batch_size)]}
+                    path = "/chat/batch"
+                else:
+                    payload = {"message": rng.choice(SAMPLE_MESSAGES), "session_id": f"load-{worker_id}"}
+                    path = "/chat"
+
+                start = time.perf_counter()
+                try:
+                    resp = await client.post(path, json=payload)
+                    if resp.status_code == 429:
+                        rate_limited += 1
+                        continue
+                    resp.raise_for_status()
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    body = resp.json()
+                    results = body["results"] if endpoint == "batch" else [body]
+                    shed += sum(r["route"] == "shed" for r in results)
+                except httpx.HTTPError:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*[worker(i) for i in range(concurrency)])
+        elapsed = time.perf_counter() - started
+
+    messages_per_request = batch_size if endpoint == "batch" else 1
+    lat = np.array(latencies) if latencies else np.zeros(1)
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "rate_limited": rate_limited,
+        "shed": shed,
+        "rps": len(latencies) / elapsed,
+        "messages_per_s": len(latencies) * messages_per_request / elapsed,
+        "mean_ms": statistics.fmean(lat),
+        "p50_ms": float(np.percentile(lat, 50)),
+        "p99_ms": float(np.percentile(lat, 99)),
+    }
+
+
+def print_results(results):
+    print(f"\n{'conc':>6}{'reqs':>8}{'errs':>6}{'429':>6}{'shed':>6}{'RPS':>10}{'msg/s':>10}"
+          f"{'p50 ms':>10}{'p99 ms':>10}")
+    for r in results:
+        print(f"{r['concurrency']:>6}{r['requests']:>8}{r['errors']:>6}{r['rate_limited']:>6}{r['shed']:>6}"
+              f"{r['rps']:>10.1f}{r['messages_per_s']:>10.1f}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}")
+
+
+async def main(args):
+    results = []
+    for concurrency in args.concurrency:
+        result = await run_level(args.url, args.endpoint, concurrency, args.requests,
+                                 args.batch_size, args.seed)
+        results.append(result)
+        print(f"✅ concurrency {concurrency}: {result['rps']:.1f} RPS, p99 {result['p99_ms']:.1f}ms")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the BankBot chat API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", choices=["chat", "batch"], default="chat")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--requests", type=int, default=500, help="Requests per concurrency level")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--stub-llm", action="store_true",
+                        help="Also run the stub LLM in this process (backend needs BANKBOT_LLM_URL)")
+    parser.add_argument("--serve-stub-llm", action="store_true", help="Only serve the stub LLM")
+    parser.add_argument("--llm-port", type=int, default=8100)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    if args.serve_stub_llm:
+        serve_stub_llm(args.llm_port, args.llm_latency_ms)
+    else:
+        if args.stub_llm:
+            serve_stub_llm(args.llm_port, args.llm_latency_ms, background=True)
+
+        results = asyncio.run(main(args))
+        print_results(results)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
@@ -2,46 +2,95 @@ import joblib
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 import os
+import tempfile
+
+from nlu_engine import dataset, model_registry
+from nlu_engine.shared_weights import load_joblib
+from nlu_engine.hashing_features import HashedFeatures
 
 
 MODEL_PATH = "models/intent_model.pkl"
+REGISTRY_NAME = "backend_intent_model"
+MODEL_FILE = "intent_model.pkl"
+PARAMS = {"ngram_range": [1, 2], "max_iter": 1000}
+
+
+def load_model(version_dir):
+    # Memory-mapped, so every worker process shares one copy of the weights
+    return load_joblib(os.path.join(version_dir, MODEL_FILE))
 
 
 class IntentClassifier:
-    def __init__(self):
-        self.vectorizer = TfidfVectorizer(
-            ngram_range=(1, 2),
-            stop_words="english"
-        )
+    def __init__(self, features="tfidf"):
+        # "hashing": fixed-size char n-gram features, no vocabulary to grow
+        if features == "hashing":
+            self.vectorizer = HashedFeatures()
+        else:
+            self.vectorizer = TfidfVectorizer(
+                ngram_range=(1, 2),
+                stop_words="english"
+            )
+        self.params = {**PARAMS, "features": features}
         self.model = LogisticRegression(
             max_iter=1000,
             solver="lbfgs",
             multi_class="auto"
         )
+        self.watcher = model_registry.ModelWatcher(REGISTRY_NAME, load_model)
+        self.legacy = None
 
     def train(self, texts, labels):
+        records = list(dataset.iter_records(zip(texts, labels)))
+        data_hash = dataset.hash_records(records)
+
+        # Nothing changed since a registered version was trained
+        existing = model_registry.find_version(REGISTRY_NAME, data_hash, self.params)
+        if existing:
+            model_registry.activate(REGISTRY_NAME, existing)
+            return existing
+
+        texts = [text for text, _ in records]
+        labels = [intent for _, intent in records]
         X = self.vectorizer.fit_transform(texts)
         self.model.fit(X, labels)
 
-        os.makedirs("models", exist_ok=True)
-        joblib.dump(
-            (self.vectorizer, self.model),
-            MODEL_PATH
-        )
+        # Write to a scratch file, then publish it as a new registry version
+        with tempfile.TemporaryDirectory() as workdir:
+            path = os.path.join(workdir, MODEL_FILE)
+            joblib.dump((self.vectorizer, self.model), path)
+            return model_registry.register(
+                REGISTRY_NAME,
+                path,
+                metrics={"train_accuracy": float(self.model.score(X, labels))},
+                data_hash=data_hash,
+                params=self.params,
+            )
 
-    def predict(self, text):
-        if not os.path.exists(MODEL_PATH):
-            return "llm_fallback", 0.0
+    def _current_model(self):
+        model = self.watcher.get()
+        if model is not None:
+            return model
 
-        vectorizer, model = joblib.load(MODEL_PATH)
-        X = vectorizer.transform([text])
+        # Models trained before the registry existed
+        if self.legacy is None and os.path.exists(MODEL_PATH):
+            self.legacy = load_joblib(MODEL_PATH)
+        return self.legacy
 
-        probabilities = model.predict_proba(X)[0]
-        confidence = float(max(probabilities))
-        intent = model.classes_[probabilities.argmax()]
-
-        return intent, confidence
+    def predict(self, text):
+        return self.predict_batch([text])[0]
 
+    def predict_batch(self, texts):
+        """(intent, confidence) for many texts with one transform + predict_proba."""
+        bundle = self._current_model()
+        if bundle is None:
+            return [("llm_fallback", 0.0) for _ in texts]
 
+        vectorizer, model = bundle
+        X = vectorizer.transform(list(texts))
 
- 
+        probabilities = model.predict_proba(X)
+        best = probabilities.argmax(axis=1)
+        return [
+            (model.classes_[i], float(row[i]))
+            for row, i in zip(probabilities, best)
+        ]
@@ -1,9 +1,18 @@
 from backend.database import SessionLocal, ChatLog
 from backend.nlu.intent_classifier import IntentClassifier
+from nlu_engine.response_catalog import get_catalog
 
 
 classifier = IntentClassifier()
 
+# intent -> (catalog key, values); built once, not per call
+CANNED_RESPONSES = {
+    "check_balance": ("demo.balance", {"balance": 25000}),
+    "transfer_money": ("demo.transfer", None),
+    "card_block": ("card.blocked", None),
+    "llm_fallback": ("fallback.support", None),
+}
+
 
 def handle_chat(user_text: str):
     intent, confidence = classifier.predict(user_text)
@@ -31,12 +40,6 @@ def handle_chat(user_text: str):
     }
 
 
-def generate_response(intent: str):
-    responses = {
-        "check_balance": "Your account balance is ₹25,000.",
-        "transfer_money": "Money transfer initiated successfully.",
-        "card_block": "Your card has been blocked for security.",
-        "llm_fallback": "I am not sure about that. Let me connect you to support."
-    }
-
-    return responses.get(intent, "Sorry, I didn’t understand that.")
+def generate_response(intent: str, locale: str = None, channel: str = None):
+    key, values = CANNED_RESPONSES.get(intent, ("fallback.unknown", None))
+    return get_catalog().render(key, values, locale, channel)
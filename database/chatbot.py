@@ -1,5 +1,52 @@
 from chatbot.intents import detect_intent, extract_amount
 from database.db import get_conn
+from nlu_engine.dialogue_policy import DialoguePolicy
+from nlu_engine.response_catalog import get_catalog
+
+CATALOG = get_catalog()
+
+
+def _balance(slots, context):
+    return {"balance": context["balance"]}
+
+
+def _deposit(slots, context):
+    context["cur"].execute("UPDATE users SET balance=balance+? WHERE account_number=?",
+                           (slots["amount"], context["acc_no"]))
+    context["conn"].commit()
+    return {}
+
+
+def _withdraw(slots, context):
+    if slots["amount"] > context["balance"]:
+        return CATALOG.render("ledger.insufficient", channel="markdown")
+    context["cur"].execute("UPDATE users SET balance=balance-? WHERE account_number=?",
+                           (slots["amount"], context["acc_no"]))
+    context["conn"].commit()
+    return {}
+
+
+POLICY = DialoguePolicy(
+    {
+        "balance": {"handler": _balance, "template": CATALOG.ref("balance.current")},
+        "deposit": {
+            "slots": ["amount"],
+            "prompts": {"amount": CATALOG.ref("ledger.ask_deposit")},
+            "handler": _deposit,
+            "template": CATALOG.ref("ledger.deposited"),
+        },
+        "withdraw": {
+            "slots": ["amount"],
+            "prompts": {"amount": CATALOG.ref("ledger.ask_withdraw")},
+            "handler": _withdraw,
+            "template": CATALOG.ref("ledger.withdrawn"),
+        },
+    },
+    # A zero amount counts as missing
+    extractors={"amount": lambda text: extract_amount(text) or None},
+    fallback=CATALOG.ref("ledger.help"),
+)
+
 
 def chatbot_response(text, acc_no):
     intent = detect_intent(text)
@@ -9,25 +56,8 @@ def chatbot_response(text, acc_no):
     cur.execute("SELECT balance FROM users WHERE account_number=?", (acc_no,))
     balance = cur.fetchone()[0]
 
-    if intent == "balance":
-        return f"💰 Your current balance is ₹{balance}"
-
-    if intent == "deposit":
-        amt = extract_amount(text)
-        if not amt:
-            return "❌ Please mention amount to deposit"
-        cur.execute("UPDATE users SET balance=balance+? WHERE account_number=?", (amt, acc_no))
-        conn.commit()
-        return f"✅ Deposited ₹{amt}"
-
-    if intent == "withdraw":
-        amt = extract_amount(text)
-        if not amt:
-            return "❌ Please mention amount"
-        if amt > balance:
-            return "❌ Insufficient balance"
-        cur.execute("UPDATE users SET balance=balance-? WHERE account_number=?", (amt, acc_no))
-        conn.commit()
-        return f"✅ Withdrawn ₹{amt}"
-
-    return "🤖 I can help with balance, deposit, withdraw"
+    response, _ = POLICY.respond(
+        text, intent, context={"conn": conn, "cur": cur, "acc_no": acc_no, "balance": balance,
+                               "channel": "markdown"}
+    )
+    return response
@@ -1,48 +1,51 @@
 from nlu_engine.intent_parser import detect_intent
 from nlu_engine.entity_extractor import extract_entities
-
-
+from nlu_engine.dialogue_policy import DialoguePolicy
+from nlu_engine.tracing import span, traced
+
+
+def _transfer(slots, context):
+    return {"amount": slots["amount"].replace("₹", "").replace(",", "")}
+
+
+POLICY = DialoguePolicy(
+    {
+        "greet": {"template": "Hello 👋 I’m your BankBot. How can I help you today?"},
+        "check_balance": {
+            "slots": ["account_number"],
+            "prompts": {"account_number": "⚠️ Please provide the account number."},
+            "template": "💰 Your account {account_number} has a balance of ₹45,000.",
+        },
+        "transfer_money": {
+            "slots": ["amount", "account_number"],
+            "prompts": {
+                "amount": "⚠️ Please provide the amount to transfer.",
+                "account_number": "⚠️ Please provide the destination account number.",
+            },
+            "handler": _transfer,
+            "template": "✅ Successfully transferred ₹{amount} to account {account_number}.",
+        },
+    },
+    fallback="🤔 I didn’t understand that. Try asking about balance or money transfer.",
+)
+
+
+@traced("dialog_manager.handle_dialog")
 def handle_dialog(user_msg: str, slots: dict | None = None):
     """
     Main dialog handler
     """
 
-    intent = detect_intent(user_msg)
+    with span("detect_intent"):
+        intent = detect_intent(user_msg)
 
     # Auto-extract slots if not provided
     if slots is None:
-        slots = extract_entities(user_msg)
-
-    # ---------- GREETING ----------
-    if intent == "greet":
-        return "Hello 👋 I’m your BankBot. How can I help you today?"
-
-    # ---------- CHECK BALANCE ----------
-    if intent == "check_balance":
-        accounts = slots.get("account_number", [])
-
-        if not accounts:
-            return "⚠️ Please provide the account number."
-
-        account = accounts[0]
-        return f"💰 Your account {account} has a balance of ₹45,000."
-
-    # ---------- TRANSFER MONEY ----------
-    if intent == "transfer_money":
-        accounts = slots.get("account_number", [])
-        amounts = slots.get("amount", [])
-
-        if not amounts:
-            return "⚠️ Please provide the amount to transfer."
-
-        if not accounts:
-            return "⚠️ Please provide the destination account number."
-
-        amount = amounts[0].replace("₹", "").replace(",", "")
-        account = accounts[0]
-
-        return f"✅ Successfully transferred ₹{amount} to account {account}."
+        with span("extract_entities"):
+            slots = extract_entities(user_msg)
 
-    # ---------- FALLBACK ----------
-    return "🤔 I didn’t understand that. Try asking about balance or money transfer."
+    # extract_entities gives every match; the first one fills the slot
+    first = {name: values[0] for name, values in slots.items() if values}
 
+    response, _ = POLICY.respond(user_msg, intent, slots=first)
+    return response
@@ -0,0 +1,320 @@
+# ==============================
+# Active-Learning Queue
+# ==============================
+#
+# Mines production logs for queries the model was unsure about so they
+# can be labelled in the Intent Studio.
+#
+#   1. scan()    reads only log rows past each source's high-water mark
+#                and queues the low-confidence / "unknown" ones
+#   2. cluster() embeds newly queued queries with hashed TF-IDF features
+#                and updates a MiniBatchKMeans model with partial_fit,
+#                so neither step ever rescans the whole log
+#   3. suggestions() ranks clusters by size for one-click labelling
+#
+#   python -m nlu_engine.active_learning --interval 60
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+import joblib
+from sklearn.cluster import MiniBatchKMeans
+
+from nlu_engine.dataset import normalize
+from nlu_engine.hashing_features import HashedFeatures
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUEUE_DB = os.getenv("BANKBOT_ACTIVE_LEARNING_DB", "chatbot_data.db")
+MODEL_PATH = os.path.join(BASE_DIR, "models", "active_learning.joblib")
+
+CONFIDENCE_THRESHOLD = 0.5
+N_CLUSTERS = 12
+N_FEATURES = 2 ** 14
+SCAN_BATCH = 5000
+
+# The miner thread and the dashboard's "mine now" button both run scan +
+# cluster; one at a time so partial_fit never sees a half-updated model
+_run_lock = threading.RLock()
+
+# Log tables to mine: (name, db path, table, text col, intent col, confidence col)
+SOURCES = [
+    ("queries_real", "chatbot_data.db", "queries_real", "query", "intent", "confidence"),
+    ("chat_logs", "bankbot.db", "chat_logs", "user_query", "predicted_intent", "confidence"),
+]
+
+
+def _connect(db_path=None):
+    conn = sqlite3.connect(db_path or QUEUE_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS active_learning_state (
+        source TEXT PRIMARY KEY,
+        high_water INTEGER NOT NULL DEFAULT 0
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS active_learning_queue (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        query TEXT NOT NULL,
+        query_hash TEXT NOT NULL UNIQUE,
+        predicted_intent TEXT,
+        confidence REAL,
+        source TEXT,
+        hits INTEGER NOT NULL DEFAULT 1,
+        cluster INTEGER,
+        status TEXT NOT NULL DEFAULT 'pending',
+        created_at TEXT NOT NULL
+    )
+    """)
+    return conn
+
+
+def _table_exists(conn, table):
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+# ==============================
+# Incremental log scan
+# ==============================
+
+def scan(sources=SOURCES, threshold=CONFIDENCE_THRESHOLD, db_path=None):
+    """Queue uncertain queries logged since the last scan. Returns how many were new."""
+    conn = _connect(db_path)
+    (before,) = conn.execute("SELECT COUNT(*) FROM active_learning_queue").fetchone()
+
+    for name, log_db, table, text_col, intent_col, conf_col in sources:
+        if not os.path.exists(log_db):
+            continue
+
+        row = conn.execute(
+            "SELECT high_water FROM active_learning_state WHERE source = ?", (name,)
+        ).fetchone()
+        high_water = row["high_water"] if row else 0
+
+        log_conn = sqlite3.connect(log_db, timeout=30)
+        try:
+            if not _table_exists(log_conn, table):
+                continue
+
+            while True:
+                rows = log_conn.execute(
+                    f"SELECT rowid, {text_col}, {intent_col}, {conf_col} FROM {table} "
+                    f"WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                    (high_water, SCAN_BATCH)
+                ).fetchall()
+                if not rows:
+                    break
+
+                for _, text, intent, confidence in rows:
+                    if not text or not str(text).strip():
+                        continue
+                    confidence = float(confidence or 0.0)
+                    if confidence > 1.0:
+                        # queries_real stores percentages
+                        confidence /= 100.0
+                    if intent not in (None, "", "unknown") and confidence >= threshold:
+                        continue
+
+                    conn.execute(
+                        "INSERT INTO active_learning_queue "
+                        "(query, query_hash, predicted_intent, confidence, source, created_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?) "
+                        "ON CONFLICT(query_hash) DO UPDATE SET hits = hits + 1",
+                        (str(text).strip(), hashlib.sha1(normalize(text).encode("utf-8")).hexdigest(),
+                         intent, confidence, name, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+                    )
+
+                high_water = rows[-1][0]
+                conn.execute(
+                    "INSERT INTO active_learning_state (source, high_water) VALUES (?, ?) "
+                    "ON CONFLICT(source) DO UPDATE SET high_water = excluded.high_water",
+                    (name, high_water)
+                )
+                conn.commit()
+        finally:
+            log_conn.close()
+
+    (after,) = conn.execute("SELECT COUNT(*) FROM active_learning_queue").fetchone()
+    conn.close()
+    return after - before
+
+
+# ==============================
+# Incremental clustering
+# ==============================
+
+def _load_model():
+    if os.path.exists(MODEL_PATH):
+        return joblib.load(MODEL_PATH)
+    return {
+        "features": HashedFeatures(n_features=N_FEATURES),
+        "kmeans": MiniBatchKMeans(n_clusters=N_CLUSTERS, random_state=42),
+        "fitted": False,
+    }
+
+
+def _save_model(model):
+    model_dir = os.path.dirname(MODEL_PATH)
+    os.makedirs(model_dir, exist_ok=True)
+    # Unique temp file in the same directory, so concurrent writers (other
+    # processes) never share it and os.replace stays an atomic rename
+    fd, tmp_path = tempfile.mkstemp(dir=model_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            joblib.dump(model, f)
+        os.replace(tmp_path, MODEL_PATH)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def cluster(db_path=None):
+    """Assign clusters to queued queries that don't have one yet."""
+    with _run_lock:
+        return _cluster(db_path)
+
+
+def _cluster(db_path=None):
+    conn = _connect(db_path)
+    rows = conn.execute(
+        "SELECT id, query FROM active_learning_queue WHERE cluster IS NULL ORDER BY id"
+    ).fetchall()
+
+    model = _load_model()
+    # MiniBatchKMeans needs at least n_clusters points for its first batch
+    if not rows or (not model["fitted"] and len(rows) < model["kmeans"].n_clusters):
+        conn.close()
+        return 0
+
+    texts = [r["query"] for r in rows]
+    features = model["features"]
+    features.partial_fit(texts)
+    X = features.transform(texts)
+
+    model["kmeans"].partial_fit(X)
+    model["fitted"] = True
+    labels = model["kmeans"].predict(X)
+
+    conn.executemany(
+        "UPDATE active_learning_queue SET cluster = ? WHERE id = ?",
+        [(int(label), r["id"]) for label, r in zip(labels, rows)]
+    )
+    conn.commit()
+    conn.close()
+
+    _save_model(model)
+    return len(rows)
+
+
+def run_once(db_path=None):
+    with _run_lock:
+        return scan(db_path=db_path), _cluster(db_path)
+
+
+# ==============================
+# Labelling
+# ==============================
+
+def suggestions(limit=10, per_cluster=5, db_path=None):
+    """
+    Pending queries grouped by cluster, biggest clusters first. Each
+    group suggests its most common predicted intent other than "unknown".
+    """
+    conn = _connect(db_path)
+    clusters = conn.execute("""
+        SELECT cluster, COUNT(*) AS size, SUM(hits) AS hits
+        FROM active_learning_queue
+        WHERE status = 'pending' AND cluster IS NOT NULL
+        GROUP BY cluster
+        ORDER BY hits DESC, size DESC
+        LIMIT ?
+    """, (limit,)).fetchall()
+
+    groups = []
+    for c in clusters:
+        members = conn.execute("""
+            SELECT id, query, predicted_intent, confidence, hits
+            FROM active_learning_queue
+            WHERE status = 'pending' AND cluster = ?
+            ORDER BY hits DESC, id
+        """, (c["cluster"],)).fetchall()
+
+        votes = Counter(m["predicted_intent"] for m in members
+                        if m["predicted_intent"] not in (None, "", "unknown"))
+        groups.append({
+            "cluster": c["cluster"],
+            "size": c["size"],
+            "hits": c["hits"],
+            "suggested_intent": votes.most_common(1)[0][0] if votes else None,
+            "queries": [dict(m) for m in members[:per_cluster]],
+        })
+
+    conn.close()
+    return groups
+
+
+def _set_status(item_id, status, db_path=None):
+    conn = _connect(db_path)
+    conn.execute("UPDATE active_learning_queue SET status = ? WHERE id = ?", (status, item_id))
+    conn.commit()
+    conn.close()
+
+
+def accept(item_id, db_path=None):
+    _set_status(item_id, "accepted", db_path)
+
+
+def dismiss(item_id, db_path=None):
+    _set_status(item_id, "dismissed", db_path)
+
+
+def queue_stats(db_path=None):
+    conn = _connect(db_path)
+    rows = conn.execute(
+        "SELECT status, COUNT(*) AS n FROM active_learning_queue GROUP BY status"
+    ).fetchall()
+    conn.close()
+    return {r["status"]: r["n"] for r in rows}
+
+
+# ==============================
+# Background miner
+# ==============================
+
+def start_miner(interval=60, db_path=None):
+    """Daemon thread that runs scan + cluster every `interval` seconds."""
+    def loop():
+        while True:
+            try:
+                run_once(db_path)
+            except sqlite3.Error:
+                # A locked or half-migrated log DB is retried next round
+                pass
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name="active-learning-miner", daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Mine low-confidence queries for labelling")
+    parser.add_argument("--interval", type=int, default=0,
+                        help="Seconds between scans; 0 runs once and exits")
+    args = parser.parse_args()
+
+    while True:
+        queued, clustered = run_once()
+        print(f"🧲 queued {queued} new queries, clustered {clustered}")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
@@ -0,0 +1,221 @@
+# ==============================
+# Training Data Augmentation
+# ==============================
+#
+# Turns each training example into a template by marking its entity
+# mentions as slots, then fills the slots with new amounts, currencies,
+# account numbers, account types and bank names (values come from
+# data/entity_patterns.json). Variants also get synonym swaps and
+# injected typos.
+#
+# Each example is augmented with its own RNG seeded from (seed, text),
+# so the output is identical however the work is split across the
+# process pool. Results are streamed to a cached JSONL file keyed by
+# the data + config hash, and trainers read that file lazily.
+#
+#   path = build_augmented("intents.json", n_variants=5)
+#   for text, intent in dataset.iter_records(path): ...
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+from multiprocessing import get_context
+
+from nlu_engine import dataset
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTITY_PATTERNS_PATH = os.path.join(BASE_DIR, "data", "entity_patterns.json")
+CACHE_DIR = os.path.join(BASE_DIR, "models", "augmented")
+
+CURRENCY_FORMATS = ["₹{}", "rs {}", "rs. {}", "{} rupees", "{} inr", "${}", "{} dollars"]
+AMOUNTS = [100, 250, 500, 1000, 1500, 2000, 2500, 5000, 7500, 10000, 15000, 25000, 50000]
+
+SYNONYMS = {
+    "balance": ["funds", "available balance", "account balance"],
+    "transfer": ["send", "move", "wire"],
+    "send": ["transfer", "pay"],
+    "money": ["funds", "cash", "amount"],
+    "show": ["display", "tell me", "give me"],
+    "check": ["see", "view", "know"],
+    "block": ["freeze", "disable", "stop"],
+    "card": ["debit card", "credit card", "atm card"],
+    "account": ["a/c", "bank account"],
+    "recent": ["latest", "last"],
+    "transactions": ["payments", "transaction history"],
+    "apply": ["request", "get"],
+    "find": ["locate", "search for", "where is"],
+    "nearest": ["closest", "nearby"],
+    "i want to": ["i need to", "i would like to", "please"],
+}
+
+# Slot detection, most specific first
+SLOT_PATTERNS = [
+    ("account_number", re.compile(r"\b\d{6,16}\b")),
+    ("amount", re.compile(r"(?:₹|\$|rs\.?\s*)?\b\d+(?:,\d{3})*(?:\.\d+)?\b(?:\s*(?:rupees|inr|dollars|usd))?", re.I)),
+]
+
+
+def load_entity_values(path=ENTITY_PATTERNS_PATH):
+    """
+    Slot values from entity_patterns.json: alternation groups such as
+    \\b(savings|current|salary)\\b become value lists.
+    """
+    with open(path, encoding="utf-8") as f:
+        patterns = json.load(f)
+
+    values = {}
+    for entity, pattern in patterns.items():
+        group = re.search(r"\(([^()?]+(?:\|[^()?]+)+)\)", pattern)
+        if group:
+            values[entity] = group.group(1).split("|")
+    return values
+
+
+def _config_hash(sources, n_variants, seed, typo_rate, entity_values):
+    digest = hashlib.sha256()
+    digest.update(dataset.content_hash(*sources).encode())
+    digest.update(json.dumps(
+        {"n_variants": n_variants, "seed": seed, "typo_rate": typo_rate,
+         "entities": entity_values, "synonyms": SYNONYMS},
+        sort_keys=True
+    ).encode())
+    return digest.hexdigest()[:16]
+
+
+# ==============================
+# Per-example augmentation
+# ==============================
+
+def to_template(text, entity_values):
+    """Replace entity mentions with {slot} markers."""
+    template = text
+    for slot, pattern in SLOT_PATTERNS:
+        template = pattern.sub("{" + slot + "}", template)
+
+    for entity, values in entity_values.items():
+        alternation = "|".join(re.escape(v) for v in values)
+        template = re.sub(rf"\b({alternation})\b", "{" + entity + "}", template, flags=re.I)
+    return template
+
+
+def fill_template(template, rng, entity_values):
+    def fill(match):
+        slot = match.group(1)
+        if slot == "amount":
+            return rng.choice(CURRENCY_FORMATS).format(rng.choice(AMOUNTS))
+        if slot == "account_number":
+            return str(rng.randint(10 ** 9, 10 ** 10 - 1))
+        if slot in entity_values:
+            return rng.choice(entity_values[slot])
+        return match.group(0)
+
+    return re.sub(r"\{(\w+)\}", fill, template)
+
+
+def swap_synonyms(text, rng, rate=0.5):
+    for word, options in SYNONYMS.items():
+        if rng.random() < rate and re.search(rf"\b{re.escape(word)}\b", text):
+            text = re.sub(rf"\b{re.escape(word)}\b", rng.choice(options), text, count=1)
+    return text
+
+
+def inject_typo(text, rng):
+    """Drop, duplicate or swap one character in a random longer word."""
+    words = text.split()
+    candidates = [i for i, w in enumerate(words) if len(w) > 3 and w.isalpha()]
+    if not candidates:
+        return text
+
+    i = rng.choice(candidates)
+    word = words[i]
+    pos = rng.randrange(1, len(word) - 1)
+    edit = rng.choice(["drop", "double", "swap"])
+    if edit == "drop":
+        word = word[:pos] + word[pos + 1:]
+    elif edit == "double":
+        word = word[:pos] + word[pos] + word[pos:]
+    else:
+        word = word[:pos] + word[pos + 1] + word[pos] + word[pos + 2:]
+    words[i] = word
+    return " ".join(words)
+
+
+def augment_example(text, intent, n_variants, seed, typo_rate, entity_values):
+    """The example followed by up to n_variants deterministic variants."""
+    rng = random.Random(f"{seed}:{intent}:{dataset.normalize(text)}")
+    template = to_template(text, entity_values)
+
+    variants = []
+    seen = {dataset.normalize(text)}
+    # A few extra attempts, since short examples often repeat themselves
+    for _ in range(n_variants * 3):
+        if len(variants) == n_variants:
+            break
+        variant = swap_synonyms(fill_template(template, rng, entity_values), rng)
+        if rng.random() < typo_rate:
+            variant = inject_typo(variant, rng)
+
+        key = dataset.normalize(variant)
+        if key not in seen:
+            seen.add(key)
+            variants.append(variant)
+
+    return [(text, intent)] + [(v, intent) for v in variants]
+
+
+def _augment_task(args):
+    return augment_example(*args)
+
+
+# ==============================
+# Cached, parallel build
+# ==============================
+
+def build_augmented(*sources, n_variants=5, seed=42, typo_rate=0.3, workers=None,
+                    cache_dir=CACHE_DIR):
+    """
+    Write the augmented dataset for sources to a cached JSONL file and
+    return its path. Reuses the file when data and config are unchanged.
+    """
+    entity_values = load_entity_values()
+    key = _config_hash(sources, n_variants, seed, typo_rate, entity_values)
+    path = os.path.join(cache_dir, f"augmented-{key}.jsonl")
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tasks = (
+        (text, intent, n_variants, seed, typo_rate, entity_values)
+        for text, intent in dataset.iter_records(*sources)
+    )
+
+    tmp_path = path + ".tmp"
+    with get_context("spawn").Pool(workers or os.cpu_count()) as pool, \
+            open(tmp_path, "w", encoding="utf-8") as f:
+        # imap keeps input order, so the file is byte-for-byte reproducible
+        for records in pool.imap(_augment_task, tasks, chunksize=64):
+            for text, intent in records:
+                f.write(json.dumps({"text": text, "intent": intent}, ensure_ascii=False) + "\n")
+    os.replace(tmp_path, path)
+    return path
+
+
+def iter_augmented(*sources, **options):
+    """Stream augmented (text, intent) records, building the cache if needed."""
+    return dataset.iter_records(build_augmented(*sources, **options))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a cached augmented training set")
+    parser.add_argument("sources", nargs="+")
+    parser.add_argument("--variants", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--typo-rate", type=float, default=0.3)
+    args = parser.parse_args()
+
+    path = build_augmented(*args.sources, n_variants=args.variants, seed=args.seed,
+                           typo_rate=args.typo_rate)
+    print(f"✅ Augmented dataset: {path}")
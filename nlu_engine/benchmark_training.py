@@ -0,0 +1,94 @@
+# ==============================
+# Training Profile Benchmark
+# ==============================
+#
+# Compares the "full" and "fast" training profiles on intents.json:
+# wall-clock training time and accuracy on the same held-out split.
+#
+#   python -m nlu_engine.benchmark_training --epochs 10
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import torch
+from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+from nlu_engine.evaluation import split_examples
+from nlu_engine.train_intent import load_training_data, train
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA = os.path.join(BASE_DIR, "intents.json")
+
+
+def held_out_accuracy(model_path, test_pairs):
+    tokenizer = AutoTokenizer.from_pretrained(model_path)
+    model = AutoModelForSequenceClassification.from_pretrained(model_path)
+    model.eval()
+
+    with open(os.path.join(model_path, "labels.json")) as f:
+        label_map = json.load(f)
+
+    texts = [text for text, _ in test_pairs]
+    expected = torch.tensor([label_map[intent] for _, intent in test_pairs])
+
+    with torch.no_grad():
+        tokens = tokenizer(texts, return_tensors="pt", padding=True, truncation=True)
+        predicted = model(**tokens).logits.argmax(dim=-1)
+
+    return float((predicted == expected).float().mean())
+
+
+def run(data_path, epochs, batch_size, learning_rate, profiles=("full", "fast")):
+    texts, labels, label_map = load_training_data(data_path)
+    id2label = {idx: intent for intent, idx in label_map.items()}
+    train_pairs, test_pairs = split_examples(
+        [(text, id2label[label]) for text, label in zip(texts, labels)]
+    )
+
+    # Keep every intent (in the same order) so label ids match across runs
+    train_data = {intent: [] for intent in label_map}
+    for text, intent in train_pairs:
+        train_data[intent].append(text)
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        train_path = os.path.join(workdir, "train.json")
+        with open(train_path, "w") as f:
+            json.dump(train_data, f)
+
+        for profile in profiles:
+            model_path = os.path.join(workdir, profile)
+            start = time.perf_counter()
+            train(train_path, model_path, epochs, batch_size, learning_rate, profile=profile,
+                  registry_name=None)
+            duration = time.perf_counter() - start
+
+            results.append({
+                "profile": profile,
+                "seconds": duration,
+                "accuracy": held_out_accuracy(model_path, test_pairs),
+            })
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark intent training profiles")
+    parser.add_argument("--data", default=DEFAULT_DATA)
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--learning-rate", type=float, default=3e-5)
+    args = parser.parse_args()
+
+    results = run(args.data, args.epochs, args.batch_size, args.learning_rate)
+
+    print(f"\n{'Profile':<10}{'Time (s)':>12}{'Accuracy':>12}")
+    for r in results:
+        print(f"{r['profile']:<10}{r['seconds']:>12.1f}{r['accuracy'] * 100:>11.1f}%")
+
+    full, fast = results[0], results[-1]
+    print(f"\n⚡ fast profile: {full['seconds'] / fast['seconds']:.1f}x faster, "
+          f"{(fast['accuracy'] - full['accuracy']) * 100:+.1f} pts accuracy vs full")
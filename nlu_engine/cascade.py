@@ -0,0 +1,273 @@
+# ==============================
+# Confidence-Gated Cascade
+# ==============================
+#
+# Routes each message through progressively more expensive intent
+# models and stops at the first one that is confident enough:
+#
+#   keyword automaton  ~µs   unanimous keyword hits
+#   TF-IDF + LogReg    ~0.1ms
+#   DistilBERT         ~10ms+ (loaded on first escalation)
+#   LLM fallback       seconds; answers the message directly
+#
+# Thresholds are calibrated on a held-out split so each tier only
+# answers when its precision there meets the target. Every tier records
+# how often it was reached and resolved the request, and how long it took.
+#
+#   cascade = CascadeRouter.from_examples(pairs, model_path="models/intent_model",
+#                                         fallback=grok_answer)
+#   cascade.route("show my balance")
+#   # {'intent': 'check_balance', 'confidence': 1.0, 'tier': 'keyword', ...}
+#   cascade.stats()
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from nlu_engine.classifier_service import IntentClassifierService
+from nlu_engine.evaluation import split_examples
+from nlu_engine.keyword_router import KeywordAutomaton, candidates, get_router
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TRANSFORMER_PATH = os.path.join(BASE_DIR, "models", "intent_model")
+
+DEFAULT_THRESHOLDS = {"keyword": 0.99, "tfidf": 0.6, "transformer": 0.5}
+TARGET_PRECISION = 0.95
+MIN_CALIBRATION = 5        # fewer accepted held-out predictions keeps the default
+LATENCY_WINDOW = 1000
+
+logger = logging.getLogger(__name__)
+
+
+# ==============================
+# Tiers
+# ==============================
+
+class KeywordTier:
+    name = "keyword"
+
+    def __init__(self, automaton=None):
+        # The process-wide keyword router unless given one
+        self.automaton = automaton if automaton is not None else get_router()
+
+    def predict(self, text):
+        """Top intent and its share of all keyword hits."""
+        ranked = candidates(text, self.automaton)
+        if not ranked:
+            return None, 0.0
+        intent, top = ranked[0]
+        return intent, top / sum(hits for _, hits in ranked)
+
+
+class TfidfTier:
+    name = "tfidf"
+
+    def __init__(self, classifier):
+        self.classifier = classifier
+
+    def predict(self, text):
+        if not text.strip() or not self.classifier.trained:
+            return None, 0.0
+        probs = self.classifier.predict_proba([text])[0]
+        best = int(probs.argmax())
+        return str(self.classifier.labels[best]), float(probs[best])
+
+
+class TransformerTier:
+    """DistilBERT, loaded the first time a request gets this far."""
+    name = "transformer"
+
+    def __init__(self, model_path=TRANSFORMER_PATH):
+        self.model_path = model_path
+        self._model = None
+        self._failed = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._model is None and not self._failed:
+                try:
+                    from nlu_engine.intent_classifier import IntentClassifier
+                    self._model = IntentClassifier(self.model_path)
+                except Exception:
+                    # No torch/transformers, no trained model, or a broken one
+                    # (corrupt registry entry, mismatched labels): skip this tier
+                    logger.exception("Transformer tier disabled: could not load %s", self.model_path)
+                    self._failed = True
+        return self._model
+
+    def predict(self, text):
+        model = self._load()
+        if model is None:
+            return None, 0.0
+        return model.predict_intent(text)
+
+
+# ==============================
+# Calibration
+# ==============================
+
+def calibrate_threshold(predict, pairs, target_precision=TARGET_PRECISION, default=None):
+    """
+    Lowest confidence at which the tier's accepted predictions on pairs
+    reach target_precision. Falls back to default without enough data.
+    """
+    scored = []
+    for text, expected in pairs:
+        intent, confidence = predict(text)
+        if intent is not None:
+            scored.append((confidence, intent == expected))
+    if len(scored) < MIN_CALIBRATION:
+        return default
+
+    scored.sort(key=lambda s: -s[0])
+    confidences = np.array([c for c, _ in scored])
+    precision = np.cumsum([ok for _, ok in scored]) / np.arange(1, len(scored) + 1)
+
+    threshold = default
+    # Walk down the confidences; each distinct value is a candidate cut
+    for i in range(len(scored)):
+        if i + 1 < len(scored) and confidences[i + 1] == confidences[i]:
+            continue
+        if precision[i] >= target_precision and i + 1 >= MIN_CALIBRATION:
+            threshold = float(confidences[i])
+    return threshold
+
+
+# ==============================
+# Router
+# ==============================
+
+class CascadeRouter:
+    """
+    tiers:      objects with .name and .predict(text) -> (intent, confidence),
+                cheapest first
+    thresholds: {tier name: minimum confidence to answer}
+    fallback:   fn(text) -> reply, used when no tier is confident
+    """
+
+    def __init__(self, tiers, thresholds=None, fallback=None):
+        self.tiers = list(tiers)
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+        self.fallback = fallback
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    @classmethod
+    def from_examples(cls, pairs, model_path=None, fallback=None, keywords=None, router=None,
+                      target_precision=TARGET_PRECISION, seed=42):
+        """
+        Build keyword + TF-IDF tiers (plus DistilBERT when model_path is
+        given) from (text, intent) pairs and calibrate their thresholds on
+        a held-out split before refitting on everything.
+        router: automaton for the serving keyword tier, e.g. the shared
+                keyword_router.get_router() built from the same keywords
+                and examples; built from keywords + pairs when None
+        """
+        pairs = list(pairs)
+        train, held_out = split_examples(pairs, test_size=0.25, seed=seed)
+
+        def build(examples, automaton=None):
+            if automaton is None:
+                phrases = {intent: list(words) for intent, words in (keywords or {}).items()}
+                for text, intent in examples:
+                    phrases.setdefault(intent, []).append(text)
+                automaton = KeywordAutomaton(phrases, whole_words=True)
+            return (KeywordTier(automaton),
+                    TfidfTier(IntentClassifierService.from_examples(examples)))
+
+        thresholds = {}
+        if held_out:
+            for tier in build(train):
+                thresholds[tier.name] = calibrate_threshold(
+                    tier.predict, held_out, target_precision, DEFAULT_THRESHOLDS[tier.name]
+                )
+
+        # Calibration above uses an automaton without the held-out examples
+        tiers = list(build(pairs, router))
+        if model_path:
+            tiers.append(TransformerTier(model_path))
+        return cls(tiers, thresholds, fallback)
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = 0
+            self._stats = {
+                name: {"reached": 0, "resolved": 0, "latency_ms": deque(maxlen=LATENCY_WINDOW)}
+                for name in [t.name for t in self.tiers] + ["fallback"]
+            }
+
+    def _record(self, name, resolved, elapsed_ms):
+        with self._lock:
+            stats = self._stats[name]
+            stats["reached"] += 1
+            stats["resolved"] += int(resolved)
+            stats["latency_ms"].append(elapsed_ms)
+
+    def route(self, text):
+        """
+        Classify text with the cheapest confident tier. Returns a dict with
+        intent, confidence, tier, latency_ms and, when every tier was unsure,
+        the fallback's response (intent None).
+        """
+        with self._lock:
+            self.requests += 1
+        started = time.perf_counter_ns()
+
+        best = (None, 0.0)
+        for tier in self.tiers:
+            tier_start = time.perf_counter_ns()
+            intent, confidence = tier.predict(text)
+            confident = intent is not None and confidence >= self.thresholds.get(tier.name, 1.0)
+            self._record(tier.name, confident, (time.perf_counter_ns() - tier_start) / 1_000_000)
+
+            if confident:
+                return {
+                    "intent": intent,
+                    "confidence": float(confidence),
+                    "tier": tier.name,
+                    "latency_ms": (time.perf_counter_ns() - started) / 1_000_000,
+                }
+            if intent is not None and confidence > best[1]:
+                best = (intent, confidence)
+
+        fallback_start = time.perf_counter_ns()
+        response = self.fallback(text) if self.fallback is not None else None
+        self._record("fallback", self.fallback is not None,
+                     (time.perf_counter_ns() - fallback_start) / 1_000_000)
+
+        return {
+            "intent": None,
+            "confidence": float(best[1]),
+            "best_guess": best[0],
+            "tier": "fallback",
+            "response": response,
+            "latency_ms": (time.perf_counter_ns() - started) / 1_000_000,
+        }
+
+    def predict(self, text):
+        """(intent, confidence) like the single-model classifiers; "unknown" when unsure."""
+        result = self.route(text)
+        return result["intent"] or "unknown", result["confidence"]
+
+    def stats(self):
+        """Per tier: how often it was reached, resolved the request, and its latency."""
+        with self._lock:
+            rows = []
+            for name, stats in self._stats.items():
+                latencies = np.array(stats["latency_ms"]) if stats["latency_ms"] else np.zeros(1)
+                rows.append({
+                    "tier": name,
+                    "threshold": self.thresholds.get(name),
+                    "reached": stats["reached"],
+                    "resolved": stats["resolved"],
+                    "share_resolved": stats["resolved"] / self.requests if self.requests else 0.0,
+                    "resolve_rate": stats["resolved"] / stats["reached"] if stats["reached"] else 0.0,
+                    "mean_ms": float(latencies.mean()),
+                    "p95_ms": float(np.percentile(latencies, 95)),
+                })
+            return rows
@@ -0,0 +1,117 @@
+# ==============================
+# Intent Classifier Service
+# ==============================
+#
+# Shared TF-IDF + LogisticRegression intent classifier for the admin
+# dashboards. Build it once (the Streamlit apps wrap the constructors in
+# st.cache_resource) and score single queries or whole test suites with
+# one vectorized call.
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+
+from nlu_engine.shared_weights import load_joblib
+
+UNKNOWN_INTENT = "unknown"
+
+
+class IntentClassifierService:
+    """
+    model=None is an untrained service (fewer than two intents to tell
+    apart): every query comes back as UNKNOWN_INTENT with confidence 0.
+    """
+
+    def __init__(self, vectorizer, model, threshold: float = 0.0, labels=()):
+        self.vectorizer = vectorizer
+        self.model = model
+        self.threshold = threshold
+        self.labels = np.asarray(model.classes_ if model is not None else list(labels))
+
+    @property
+    def trained(self):
+        return self.model is not None
+
+    @classmethod
+    def from_examples(cls, pairs, threshold: float = 0.0):
+        """Train on an iterable of (text, intent) pairs."""
+        pairs = list(pairs)
+        intents = sorted({intent for _, intent in pairs})
+        # LogisticRegression needs at least two classes
+        if len(intents) < 2:
+            return cls(None, None, threshold, labels=intents)
+
+        texts, intents = zip(*pairs)
+
+        vectorizer = TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True)
+        X = vectorizer.fit_transform([t.lower() for t in texts])
+
+        model = LogisticRegression(max_iter=1000, C=10.0)
+        model.fit(X, intents)
+
+        return cls(vectorizer, model, threshold)
+
+    @classmethod
+    def from_pickle(cls, path, threshold: float = 0.0):
+        """Load a (vectorizer, model) pair saved with joblib by the backend trainer."""
+        vectorizer, model = load_joblib(path)
+        return cls(vectorizer, model, threshold)
+
+    def predict_proba(self, texts):
+        if not self.trained:
+            return np.zeros((len(texts), len(self.labels)))
+        X = self.vectorizer.transform([t.lower() for t in texts])
+        return self.model.predict_proba(X)
+
+    def predict_batch(self, texts):
+        """
+        Score many queries at once.
+        Returns (intents, confidences, probability matrix).
+        """
+        if len(texts) == 0 or not self.trained:
+            return ([UNKNOWN_INTENT] * len(texts), np.zeros(len(texts)),
+                    np.zeros((len(texts), len(self.labels))))
+
+        probs = self.predict_proba(texts)
+        best = probs.argmax(axis=1)
+        confidences = probs[np.arange(len(texts)), best]
+
+        intents = np.where(confidences >= self.threshold, self.labels[best], UNKNOWN_INTENT)
+        return intents.tolist(), confidences, probs
+
+    def predict(self, text: str):
+        if not text.strip():
+            return UNKNOWN_INTENT, 0.0
+
+        intents, confidences, _ = self.predict_batch([text])
+        return intents[0], float(confidences[0])
+
+    def top_k(self, text: str, k: int = 5):
+        if not self.trained:
+            return [{"intent": UNKNOWN_INTENT, "confidence": 0.0}]
+        probs = self.predict_proba([text])[0]
+        order = np.argsort(probs)[::-1][:k]
+        return [
+            {"intent": str(self.labels[i]), "confidence": round(float(probs[i]), 3)}
+            for i in order
+        ]
+
+    def confusion_matrix(self, texts, expected):
+        """
+        Run a labelled test suite in one pass.
+        Returns (labels, matrix, accuracy) with rows = expected, cols = predicted.
+        """
+        predicted, _, _ = self.predict_batch(texts)
+
+        labels = sorted(set(expected) | set(predicted))
+        index = {label: i for i, label in enumerate(labels)}
+
+        matrix = np.zeros((len(labels), len(labels)), dtype=int)
+        np.add.at(
+            matrix,
+            ([index[e] for e in expected], [index[p] for p in predicted]),
+            1
+        )
+
+        accuracy = float(np.trace(matrix) / matrix.sum()) if matrix.sum() else 0.0
+        return labels, matrix, accuracy
@@ -0,0 +1,270 @@
+# ==============================
+# Conversation Store
+# ==============================
+#
+# Chat history with a bounded footprint per session:
+#
+#   window    the last WINDOW_SIZE messages, in memory (what the UI shows
+#             and the LLM sees verbatim)
+#   SQLite    every message; add_turn() writes a user message and its
+#             reply in one transaction, single append()s are batched
+#             FLUSH_EVERY at a time. Older turns are paged back on demand
+#   summary   a compact digest of the messages that left the window, so
+#             the LLM keeps the gist of a long chat in a few lines
+#
+#   convo = ConversationWindow.load(session_id)
+#   convo.add_turn(user_input, response)      # one write for both messages
+#   convo.messages                            # recent window
+#   convo.page_older()                        # the page just before the window
+#   convo.llm_context()                       # summary + recent turns, for prompts
+#
+# Messages go to the `conversations` table of chatbot_data.db, the same
+# table the admin dashboard reads (BANKBOT_CONVERSATION_DB to change it).
+
+import os
+import re
+import sqlite3
+import threading
+from collections import deque
+from datetime import datetime
+
+CONVERSATION_DB = os.getenv("BANKBOT_CONVERSATION_DB", "chatbot_data.db")
+WINDOW_SIZE = int(os.getenv("BANKBOT_CHAT_WINDOW", "50"))
+FLUSH_EVERY = int(os.getenv("BANKBOT_CHAT_FLUSH_EVERY", "2"))
+PAGE_SIZE = 20
+
+SUMMARY_ITEMS = 8          # earlier user requests kept in the summary
+SNIPPET_CHARS = 80
+ROLE_LABELS = {"user": "User", "assistant": "Assistant"}
+
+
+def _timestamp():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+# ==============================
+# SQLite
+# ==============================
+
+class ConversationStore:
+    def __init__(self, db_path=CONVERSATION_DB):
+        self.db_path = db_path
+        conn = self._connect()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS conversations (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT,
+            role TEXT,
+            message TEXT,
+            timestamp TEXT
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_conversations_session ON conversations (session_id, id)")
+        conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def append_many(self, session_id, messages):
+        """Insert [{"role", "content", "timestamp"}] in one transaction; returns their ids."""
+        if not messages:
+            return []
+        conn = self._connect()
+        ids = []
+        with conn:
+            for msg in messages:
+                cur = conn.execute(
+                    "INSERT INTO conversations (session_id, role, message, timestamp) VALUES (?, ?, ?, ?)",
+                    (session_id, msg["role"], msg["content"], msg.get("timestamp") or _timestamp())
+                )
+                ids.append(cur.lastrowid)
+        conn.close()
+        return ids
+
+    def page(self, session_id, before_id=None, limit=PAGE_SIZE):
+        """Up to `limit` messages older than before_id (newest page when None), oldest first."""
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT id, role, message, timestamp FROM conversations "
+            "WHERE session_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (session_id, before_id if before_id is not None else 2 ** 63 - 1, limit)
+        ).fetchall()
+        conn.close()
+        return [
+            {"id": row[0], "role": row[1], "content": row[2], "timestamp": row[3]}
+            for row in reversed(rows)
+        ]
+
+    def count(self, session_id):
+        conn = self._connect()
+        (total,) = conn.execute(
+            "SELECT COUNT(*) FROM conversations WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        conn.close()
+        return total
+
+    def delete(self, session_id):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM conversations WHERE session_id = ?", (session_id,))
+        conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ConversationStore()
+        return _store
+
+
+# ==============================
+# Summary
+# ==============================
+
+def _snippet(text, limit=SNIPPET_CHARS):
+    text = re.sub(r"\s+", " ", text).strip()
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def summarize_messages(summary, evicted):
+    """
+    Default summarizer: the last SUMMARY_ITEMS user requests that left the
+    window, shortened. summary is the previous list of them.
+    """
+    requests = deque(summary or (), maxlen=SUMMARY_ITEMS)
+    requests.extend(_snippet(m["content"]) for m in evicted if m["role"] == "user")
+    return list(requests)
+
+
+# ==============================
+# Per-session window
+# ==============================
+
+class ConversationWindow:
+    """
+    One session's chat: a fixed-size in-memory window over the SQLite log.
+    summarize: fn(previous_summary, evicted_messages) -> summary, e.g. an
+               LLM call; its result must stay small (it is kept in memory)
+    """
+
+    def __init__(self, session_id, store=None, window=WINDOW_SIZE,
+                 flush_every=FLUSH_EVERY, summarize=summarize_messages):
+        self.session_id = session_id
+        self.store = store or get_conversation_store()
+        self.window = window
+        # Never hold more unsaved messages than the window
+        self.flush_every = max(1, min(flush_every, window))
+        self.summarize = summarize
+        self.messages = deque()
+        self.summary = None
+        self.total = 0
+        self._pending = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, session_id, store=None, **kwargs):
+        """Window over an existing session, with its last messages reloaded."""
+        convo = cls(session_id, store, **kwargs)
+        convo.total = convo.store.count(session_id)
+        older = convo.store.page(session_id, limit=convo.window)
+        convo.messages.extend(older)
+        if convo.has_older and older:
+            # Rebuild the summary from the page just before the window only,
+            # so reloading costs the same however long the session is
+            earlier = convo.store.page(session_id, older[0]["id"], PAGE_SIZE)
+            convo.summary = convo.summarize(None, earlier)
+        return convo
+
+    def _append(self, role, content):
+        message = {"id": None, "role": role, "content": content, "timestamp": _timestamp()}
+        self.messages.append(message)
+        self._pending.append(message)
+        self.total += 1
+
+        evicted = []
+        while len(self.messages) > self.window:
+            evicted.append(self.messages.popleft())
+        if evicted:
+            self.summary = self.summarize(self.summary, evicted)
+        return message
+
+    def append(self, role, content, flush=False):
+        """Add one message; written once FLUSH_EVERY are pending, or now with flush=True."""
+        with self._lock:
+            message = self._append(role, content)
+            if flush or len(self._pending) >= self.flush_every:
+                self._flush()
+        return message
+
+    def add_turn(self, user_input, response):
+        """Both messages of a turn, saved together in one transaction."""
+        with self._lock:
+            self._append("user", user_input)
+            self._append("assistant", response)
+            self._flush()
+
+    def _flush(self):
+        pending, self._pending = self._pending, []
+        for message, row_id in zip(pending, self.store.append_many(self.session_id, pending)):
+            message["id"] = row_id
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    @property
+    def has_older(self):
+        return self.total > len(self.messages)
+
+    def page_older(self, before_id=None, limit=PAGE_SIZE):
+        """
+        Messages older than before_id, or just before the window when None.
+        Read from SQLite on demand; nothing is kept in memory.
+        """
+        self.flush()
+        if before_id is None:
+            if not self.has_older:
+                return []
+            before_id = self.messages[0]["id"] if self.messages else None
+        return self.store.page(self.session_id, before_id, limit)
+
+    def summary_text(self):
+        if not self.has_older:
+            return ""
+        if isinstance(self.summary, str):
+            return self.summary
+        requests = "; ".join(f'"{r}"' for r in self.summary or ())
+        return (f"{self.total - len(self.messages)} earlier messages. "
+                f"Recent earlier user requests: {requests or 'none'}.")
+
+    def llm_context(self, max_messages=6, max_chars=2000):
+        """Summary of earlier turns plus the last few messages, as prompt text."""
+        lines = []
+        summary = self.summary_text()
+        if summary:
+            lines.append(f"Earlier conversation: {summary}")
+        recent = list(self.messages)[-max_messages:]
+        lines.extend(f"{ROLE_LABELS.get(m['role'], m['role'])}: {_snippet(m['content'], max_chars)}"
+                     for m in recent)
+
+        text = "\n".join(lines)
+        return text if len(text) <= max_chars else text[-max_chars:]
+
+    def clear(self):
+        """Forget the session here and in SQLite."""
+        with self._lock:
+            self.messages.clear()
+            self._pending = []
+            self.summary = None
+            self.total = 0
+        self.store.delete(self.session_id)
+
+    def __len__(self):
+        return self.total
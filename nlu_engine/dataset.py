@@ -0,0 +1,186 @@
+# ==============================
+# Training Dataset Loader
+# ==============================
+#
+# One loader for every place training data lives:
+#
+#   intents.json             intent -> {"description", "examples"}
+#   nlu_engine/intents.json  intent -> [examples]
+#   *.csv                    text,intent  or  utterance,intent
+#   *.jsonl                  {"text": ..., "intent": ...} per line
+#   intents.py               INTENTS = {intent: [examples]}
+#   chatbot_data.db          Intent Studio's intents / intent_examples tables
+#
+# Sources are streamed lazily as (text, intent) records, de-duplicated by
+# a hash of the normalized text (first source wins), and summarised by an
+# order-independent content hash that trainers compare before retraining.
+#
+#   records = list(iter_records("intents.json", "data/training_data.csv"))
+#   content_hash("intents.json")
+
+import csv
+import hashlib
+import importlib
+import json
+import os
+import re
+import sqlite3
+
+SQLITE_PREFIX = "sqlite:"
+TEXT_COLUMNS = ("text", "utterance", "example", "query")
+INTENT_COLUMNS = ("intent", "label", "tag")
+
+
+def normalize(text):
+    return re.sub(r"\s+", " ", str(text)).strip().lower()
+
+
+def text_hash(text):
+    return hashlib.sha1(normalize(text).encode("utf-8")).hexdigest()
+
+
+# ==============================
+# Source adapters
+# ==============================
+
+def _iter_intent_mapping(data):
+    """intent -> [examples] or intent -> {"examples": [...]}."""
+    for intent, value in data.items():
+        examples = value.get("examples", []) if isinstance(value, dict) else value
+        for text in examples:
+            yield text, intent
+
+
+def iter_json(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+
+    # {"intents": [{"tag": ..., "patterns": [...]}]} as well as plain lists
+    if isinstance(data, dict) and isinstance(data.get("intents"), list):
+        data = data["intents"]
+
+    if isinstance(data, dict):
+        yield from _iter_intent_mapping(data)
+        return
+
+    for item in data:
+        intent = item.get("intent") or item.get("tag") or item.get("name")
+        for text in item.get("examples") or item.get("patterns") or []:
+            yield text, intent
+
+
+def iter_csv(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        fields = [c.strip().lower() for c in reader.fieldnames or []]
+        text_col = next((reader.fieldnames[fields.index(c)] for c in TEXT_COLUMNS if c in fields), None)
+        intent_col = next((reader.fieldnames[fields.index(c)] for c in INTENT_COLUMNS if c in fields), None)
+        if text_col is None or intent_col is None:
+            raise ValueError(f"{path}: expected a text/utterance column and an intent column")
+
+        for row in reader:
+            yield row[text_col], row[intent_col]
+
+
+def iter_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record["text"], record["intent"]
+
+
+def iter_python(module="intents", attr="INTENTS"):
+    data = getattr(importlib.import_module(module), attr)
+    yield from _iter_intent_mapping(data)
+
+
+def iter_sqlite(db_path="chatbot_data.db"):
+    """Intent Studio examples, streamed with a server-side cursor."""
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.execute("""
+            SELECT e.example, i.name
+            FROM intent_examples e JOIN intents i ON i.id = e.intent_id
+            ORDER BY e.id
+        """)
+        yield from cursor
+    finally:
+        conn.close()
+
+
+def iter_source(source):
+    """
+    Records from one source: a file path, "sqlite:<db path>",
+    "python:<module>[:<ATTR>]", a mapping, or an iterable of pairs.
+    """
+    if isinstance(source, dict):
+        yield from _iter_intent_mapping(source)
+    elif not isinstance(source, str):
+        yield from source
+    elif source.startswith(SQLITE_PREFIX):
+        yield from iter_sqlite(source[len(SQLITE_PREFIX):] or "chatbot_data.db")
+    elif source.startswith("python:"):
+        module, _, attr = source[len("python:"):].partition(":")
+        yield from iter_python(module, attr or "INTENTS")
+    elif source.endswith(".csv"):
+        yield from iter_csv(source)
+    elif source.endswith(".jsonl"):
+        yield from iter_jsonl(source)
+    elif source.endswith(".db"):
+        yield from iter_sqlite(source)
+    elif source.endswith(".py"):
+        yield from iter_python(os.path.splitext(os.path.basename(source))[0])
+    else:
+        yield from iter_json(source)
+
+
+# ==============================
+# Streaming + hashing
+# ==============================
+
+def iter_records(*sources, seen=None):
+    """
+    Lazily yield cleaned (text, intent) records from every source,
+    skipping blanks and texts already seen (by normalized-text hash).
+    """
+    seen = set() if seen is None else seen
+    for source in sources:
+        for text, intent in iter_source(source):
+            if text is None or intent is None:
+                continue
+            text, intent = str(text).strip(), str(intent).strip()
+            if not text or not intent:
+                continue
+
+            key = text_hash(text)
+            if key in seen:
+                continue
+            seen.add(key)
+            yield text, intent
+
+
+def hash_records(records):
+    """Order-independent SHA-256 of (text, intent) records."""
+    digests = sorted(
+        hashlib.sha1(f"{normalize(intent)}\t{normalize(text)}".encode("utf-8")).digest()
+        for text, intent in records
+    )
+    digest = hashlib.sha256()
+    for d in digests:
+        digest.update(d)
+    return digest.hexdigest()
+
+
+def content_hash(*sources):
+    return hash_records(iter_records(*sources))
+
+
+def load(*sources):
+    """
+    Materialise sources for a trainer: (texts, intents, content hash).
+    """
+    records = list(iter_records(*sources))
+    texts = [text for text, _ in records]
+    intents = [intent for _, intent in records]
+    return texts, intents, hash_records(records)
@@ -1,79 +1,154 @@
+import contextvars
+
 from database.bank_service import get_balance
 from llm.llm_groq import grok_answer
 from llm.web_search import web_search, latest_news
+from nlu_engine.dialogue_policy import DialoguePolicy
 from nlu_engine.entity_extractor import extract_account_number
-
-# Context memory
-context = {
-    "awaiting_account": False
-}
-
-
-def handle_dialogue(user_input: str) -> str:
-    user_input = user_input.strip()
-    lower_text = user_input.lower()
-
-    # --------------------------------------------------
-    # If bot is waiting for account number
-    # --------------------------------------------------
-    if context["awaiting_account"]:
-        account = extract_account_number(user_input)
-
-        if account:
-            context["awaiting_account"] = False
-            balance = get_balance(account)
-
-            if balance is None:
-                return f"I couldn’t find account {account} in our system."
-
-            return f"The balance for account {account} is ₹{balance:,}."
-
-        # Let LLM respond naturally
-        return grok_answer(user_input)
-
-    # --------------------------------------------------
-    # Direct balance request with account
-    # --------------------------------------------------
-    account = extract_account_number(user_input)
-
-    if account and "balance" in lower_text:
+from nlu_engine.escalation import escalate_to_human
+from nlu_engine.fallback import fallback_message
+from nlu_engine.keyword_router import KeywordAutomaton
+from nlu_engine.rate_limit import SHED_MESSAGE, get_admission
+from nlu_engine.response_catalog import get_catalog
+from nlu_engine.session_state import get_store
+from nlu_engine.tracing import span
+
+CATALOG = get_catalog()
+
+# Conversation so far (ConversationWindow.llm_context) for this turn's LLM calls
+_history = contextvars.ContextVar("bankbot_llm_history", default=None)
+
+# Set when the LLM fallback could not answer either (shed or errored); only
+# those turns count towards escalation, not questions the LLM answered
+_unhandled = contextvars.ContextVar("bankbot_turn_unhandled", default=False)
+
+# Keyword routes, earlier intents win when several match
+ROUTES = KeywordAutomaton({
+    "check_balance": ["balance"],
+    "latest_news": ["latest news", "today news"],
+    "web_search": ["search", "google", "find", "who is", "what is", "latest"],
+})
+
+
+# --------------------------------------------------
+# Handlers
+# --------------------------------------------------
+def _balance(slots, context):
+    account = slots["account_number"]
+    with span("get_balance"):
         balance = get_balance(account)
 
-        if balance is None:
-            return f"I couldn’t find account {account} in our system."
+    if balance is None:
+        return CATALOG.render("balance.not_found", {"account_number": account},
+                              context.get("locale"), context.get("channel"))
+    return {"balance": balance}
 
-        return f"The balance for account {account} is ₹{balance:,}."
 
-    # --------------------------------------------------
-    # Balance request without account
-    # --------------------------------------------------
-    if "balance" in lower_text:
-        context["awaiting_account"] = True
+def _ask_account():
+    with span("grok_answer"), get_admission().admit("llm") as admitted:
+        if not admitted:
+            return CATALOG.render("balance.ask_account")
         return grok_answer(
             "User wants to check bank balance but did not provide account number. Ask politely for the account number."
         )
 
-    # --------------------------------------------------
-    # Latest news (REAL-TIME)
-    # --------------------------------------------------
-    if "latest news" in lower_text or "today news" in lower_text:
-        return "📰 Latest News:\n" + latest_news()
-
-    # --------------------------------------------------
-    # Web search queries
-    # --------------------------------------------------
-    if any(word in lower_text for word in ["search", "google", "find", "who is", "what is", "latest"]):
-        web_result = web_search(user_input)
-        return web_result
-
-    # --------------------------------------------------
-    # Fallback → LLM
-    # --------------------------------------------------
-    return grok_answer(user_input)
-
-
-
-
 
+def _news(slots, context):
+    with span("latest_news"), get_admission().admit("search") as admitted:
+        return {"news": latest_news()} if admitted else SHED_MESSAGE
+
+
+def _web_search(slots, context):
+    with span("web_search"), get_admission().admit("search") as admitted:
+        return web_search(context["text"]) if admitted else SHED_MESSAGE
+
+
+def _llm(user_input):
+    history = _history.get()
+    prompt = f"{history}\nUser: {user_input}" if history else user_input
+    with span("grok_answer", prompt_length=len(prompt)) as call, get_admission().admit("llm") as admitted:
+        if not admitted:
+            _unhandled.set(True)
+            return SHED_MESSAGE
+        try:
+            return grok_answer(prompt)
+        except Exception as e:
+            call["status"] = "error"
+            call["attributes"]["error"] = f"{type(e).__name__}: {e}"
+            _unhandled.set(True)
+            return fallback_message()
+
+
+def _extract_account(text):
+    with span("extract_account_number"):
+        return extract_account_number(text)
+
+
+POLICY = DialoguePolicy(
+    {
+        "check_balance": {
+            "slots": ["account_number"],
+            "prompts": {"account_number": _ask_account},
+            "handler": _balance,
+            "template": CATALOG.ref("balance"),
+        },
+        "latest_news": {
+            "handler": _news,
+            "template": CATALOG.ref("news"),
+        },
+        "web_search": {
+            "handler": _web_search,
+        },
+    },
+    extractors={"account_number": _extract_account},
+    fallback=_llm,
+)
+
+
+def handle_dialogue(user_input: str, session_id: str = None,
+                    locale: str = None, channel: str = "markdown", history: str = None) -> str:
+    """
+    session_id keys the dialogue state (pending slots, turn and fallback
+    counters). Without one, the turn gets fresh state that is not kept.
+    locale / channel pick the response catalog variant.
+    history: summary + recent turns, prepended to LLM fallback prompts.
+    """
+    history_token = _history.set(history)
+    unhandled_token = _unhandled.set(False)
+    try:
+        return _run_turn(user_input, session_id, locale, channel)
+    finally:
+        _history.reset(history_token)
+        _unhandled.reset(unhandled_token)
+
+
+def _run_turn(user_input, session_id, locale, channel):
+    with span("handle_dialogue", input_length=len(user_input)) as turn, \
+            get_store().session(session_id) as state:
+        state["turns"] += 1
+        context = {"text": user_input.strip(), "locale": locale, "channel": channel}
+        response = _handle_dialogue(user_input, turn, state, context)
+
+        if _unhandled.get():
+            turn["attributes"]["unhandled"] = True
+            state["fallback_count"] += 1
+        else:
+            state["fallback_count"] = 0
+
+        turn["attributes"]["response_length"] = len(response)
+        return response
+
+
+def _handle_dialogue(user_input: str, turn: dict, state: dict, context: dict) -> str:
+    user_input = user_input.strip()
 
+    # Hand off to a human on request or after repeated fallbacks
+    if escalate_to_human(user_input, state["fallback_count"]):
+        turn["attributes"]["route"] = "escalate"
+        state["awaiting"] = state["pending_intent"] = None
+        state["slots"] = {}
+        return CATALOG.render("escalation", locale=context["locale"], channel=context["channel"])
 
+    response, route = POLICY.respond(user_input, ROUTES.first(user_input), state, context=context)
+    turn["attributes"]["route"] = route
+    return response
@@ -2,44 +2,83 @@
 # Dialogue Manager
 # ==============================
 
-from nlu_engine.intent_detector import detect_intent
+import threading
+
 from database.bank_service import check_balance, transfer_money
 from llm.llm_groq import grok_answer
+from nlu_engine import dataset
+from nlu_engine.cascade import CascadeRouter, TRANSFORMER_PATH
+from nlu_engine.dialogue_policy import DialoguePolicy
+from nlu_engine.keyword_router import INTENTS_PATH, KEYWORDS, get_router
+from nlu_engine.response_catalog import get_catalog
+from nlu_engine.tracing import span, traced
 
+DEMO_ACCOUNT = "999001"
+DEMO_PAYEE = "999002"
+CATALOG = get_catalog()
 
-def handle_dialogue(user_input: str) -> str:
-    if not user_input or not user_input.strip():
-        return "⚠️ Please enter a message."
-
-    intent = detect_intent(user_input)
 
-    # -------- GREETING --------
-    if intent == "greet":
-        return "👋 Hello! I’m BankBot. How can I help you?"
+def _check_balance(slots, context):
+    with span("check_balance"):
+        return {"account": DEMO_ACCOUNT, "balance": check_balance(DEMO_ACCOUNT)}
 
-    # -------- CHECK BALANCE --------
-    if intent == "check_balance":
-        account = "999001"
-        balance = check_balance(account)
-        return f"💰 Your account {account} has a balance of ₹{balance}."
 
-    # -------- TRANSFER MONEY --------
-    if intent == "transfer_money":
+def _transfer_money(slots, context):
+    with span("transfer_money"):
         return transfer_money(
-            from_account="999001",
-            to_account="999002",
+            from_account=DEMO_ACCOUNT,
+            to_account=DEMO_PAYEE,
             amount=1000
         )
 
-    # -------- FALLBACK TO LLM --------
-    return grok_answer(user_input)
 
+def _llm(user_input):
+    with span("grok_answer"):
+        return grok_answer(user_input)
 
 
+POLICY = DialoguePolicy(
+    {
+        "greet": {"template": CATALOG.ref("greet")},
+        "check_balance": {
+            "handler": _check_balance,
+            "template": CATALOG.ref("balance.account"),
+        },
+        "transfer_money": {"handler": _transfer_money},
+    },
+    fallback=_llm,
+)
 
+_cascade = None
+_cascade_lock = threading.Lock()
 
 
+def get_cascade():
+    """
+    Keyword -> TF-IDF -> DistilBERT, with the LLM for whatever none is sure of.
+    Trained and calibrated on first use, not on import.
+    """
+    global _cascade
+    with _cascade_lock:
+        if _cascade is None:
+            _cascade = CascadeRouter.from_examples(
+                dataset.iter_records(INTENTS_PATH), model_path=TRANSFORMER_PATH,
+                fallback=_llm, keywords=KEYWORDS, router=get_router()
+            )
+        return _cascade
 
 
+@traced("dialogue_manager.handle_dialogue")
+def handle_dialogue(user_input: str) -> str:
+    if not user_input or not user_input.strip():
+        return CATALOG.render("empty_message", channel="markdown")
+
+    with span("detect_intent") as detect:
+        routed = get_cascade().route(user_input)
+        detect["attributes"]["tier"] = routed["tier"]
 
+    if routed["intent"] is None:
+        return routed["response"]
 
+    response, _ = POLICY.respond(user_input, routed["intent"], context={"channel": "markdown"})
+    return response
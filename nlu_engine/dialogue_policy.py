@@ -0,0 +1,173 @@
+# ==============================
+# Dialogue Policy Engine
+# ==============================
+#
+# Intents are declared once as data: required slots (in the order they
+# are asked for), a handler, whether the action needs approval, and a
+# response template. DialoguePolicy compiles the declarations into a
+# dispatch table, so routing a turn is one dict lookup however many
+# intents there are, and runs a small slot-filling state machine on the
+# session state from nlu_engine.session_state:
+#
+#   no pending intent ──detect──▶ missing slot? ──yes──▶ ask, await slot
+#          ▲                          │ no                    │
+#          │                          ▼                       │ reply fills it
+#          └──────────── run handler / submit for approval ◀──┘
+#
+#   policy = DialoguePolicy({
+#       "greet": {"template": "Hello!"},
+#       "check_balance": {
+#           "slots": ["account_number"],
+#           "prompts": {"account_number": "Which account?"},
+#           "handler": lambda slots, ctx: {"balance": get_balance(slots["account_number"])},
+#           "template": "Balance for {account_number}: ₹{balance:,}",
+#       },
+#   }, extractors={"account_number": extract_account_number}, fallback=grok_answer)
+#
+#   response, route = policy.respond(text, intent, state)
+#
+# Templates, prompts and the fallback may also be response catalog
+# entries (nlu_engine.response_catalog); those render for the "locale"
+# and "channel" given in the turn's context.
+
+from nlu_engine.response_catalog import ResponseRef
+from nlu_engine.session_state import new_state
+
+SPEC_KEYS = {"slots", "prompts", "handler", "approval", "template"}
+DEFAULT_PROMPT = "Please provide the {slot}."
+
+
+def _render(template, values=None, context=None):
+    """str templates use str.format; catalog templates also pick a locale / channel variant."""
+    if isinstance(template, ResponseRef):
+        context = context or {}
+        return template.render(values, locale=context.get("locale"), channel=context.get("channel"))
+    return template.format(**values) if values is not None else template
+
+
+class _CompiledIntent:
+    __slots__ = ("name", "slots", "prompts", "handler", "approval", "template")
+
+    def __init__(self, name, spec):
+        unknown = set(spec) - SPEC_KEYS
+        if unknown:
+            raise ValueError(f"Intent '{name}' has unknown keys: {sorted(unknown)}")
+
+        self.name = name
+        self.slots = tuple(spec.get("slots", ()))
+        self.prompts = {
+            slot: spec.get("prompts", {}).get(slot, DEFAULT_PROMPT.format(slot=slot.replace("_", " ")))
+            for slot in self.slots
+        }
+        self.handler = spec.get("handler")
+        self.approval = bool(spec.get("approval", False))
+        self.template = spec.get("template")
+
+        if self.handler is None and self.template is None and not self.approval:
+            raise ValueError(f"Intent '{name}' needs a handler, a template or approval")
+
+    def missing_slot(self, slots):
+        for slot in self.slots:
+            if slots.get(slot) in (None, ""):
+                return slot
+        return None
+
+
+class DialoguePolicy:
+    """
+    intents:    {name: spec}, spec keys as in SPEC_KEYS
+    extractors: {slot: fn(text) -> value or None}; only the slots the
+                current intent needs are extracted on a turn
+    approval:   fn(intent, slots, context) called for approval intents
+    fallback:   fn(text) or a fixed string for unknown intents
+    """
+
+    def __init__(self, intents, extractors=None, approval=None,
+                 approval_template="🕒 Request submitted for approval", fallback=None):
+        self.table = {name: _CompiledIntent(name, spec) for name, spec in intents.items()}
+        self.extractors = dict(extractors or {})
+        self.approval = approval
+        self.approval_template = approval_template
+        self.fallback = fallback
+
+        for intent in self.table.values():
+            if intent.approval and approval is None:
+                raise ValueError(f"Intent '{intent.name}' needs approval but no approval hook was given")
+
+    @property
+    def intents(self):
+        return list(self.table)
+
+    def _extract(self, text, slots_needed, slots):
+        for slot in slots_needed:
+            if slots.get(slot) in (None, "") and slot in self.extractors:
+                value = self.extractors[slot](text)
+                if value not in (None, ""):
+                    slots[slot] = value
+
+    def _fallback(self, text, context):
+        if callable(self.fallback):
+            return self.fallback(text)
+        return _render(self.fallback, context=context) if self.fallback else "🤔 I didn’t understand that."
+
+    def _prompt(self, intent, slot, state, context):
+        state["pending_intent"] = intent.name
+        state["awaiting"] = slot
+        prompt = intent.prompts[slot]
+        return prompt() if callable(prompt) else _render(prompt, context=context)
+
+    def _run(self, intent, state, context):
+        slots = state["slots"]
+        state["pending_intent"] = state["awaiting"] = None
+        state["slots"] = {}
+
+        if intent.approval:
+            self.approval(intent.name, slots, context)
+            return _render(self.approval_template, context=context)
+
+        values = dict(slots)
+        if intent.handler is not None:
+            result = intent.handler(slots, context)
+            # A handler returns template values, or a finished reply
+            if not isinstance(result, dict):
+                return str(result)
+            values.update(result)
+        return _render(intent.template, values, context) if intent.template else ""
+
+    def respond(self, text, intent, state=None, slots=None, context=None):
+        """
+        Advance the dialogue by one turn. Returns (response, route) where
+        route is the intent name, "<intent>_prompt" when a slot was asked
+        for, or "fallback".
+
+        intent:  detected intent name (None / unknown names fall back)
+        slots:   slot values already extracted by the caller
+        context: passed through to handlers (user, account, UI state...)
+        """
+        state = state if state is not None else new_state()
+        if slots:
+            state["slots"].update({k: v for k, v in slots.items() if v not in (None, "")})
+
+        # A reply to a prompt continues the pending intent unless the
+        # user clearly started another one
+        pending = self.table.get(state.get("pending_intent"))
+        if pending is not None and (intent not in self.table or intent == pending.name):
+            self._extract(text, pending.slots, state["slots"])
+            if state["slots"].get(state["awaiting"]) not in (None, ""):
+                compiled = pending
+            else:
+                return self._fallback(text, context), "fallback"
+        else:
+            compiled = self.table.get(intent)
+            if compiled is None:
+                return self._fallback(text, context), "fallback"
+            if pending is not None:
+                # Switched intent: forget the abandoned one's slots
+                state["slots"] = dict(slots or {})
+                state["pending_intent"] = state["awaiting"] = None
+            self._extract(text, compiled.slots, state["slots"])
+
+        slot = compiled.missing_slot(state["slots"])
+        if slot is not None:
+            return self._prompt(compiled, slot, state, context), f"{compiled.name}_prompt"
+        return self._run(compiled, state, context), compiled.name
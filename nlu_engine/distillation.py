@@ -0,0 +1,254 @@
+# ==============================
+# Teacher -> Student Distillation
+# ==============================
+#
+# The fine-tuned transformer (IntentClassifier) soft-labels a large
+# unlabeled pool — production queries plus augmented training text — in
+# batches, and the NumPy NeuralNLUEngine is trained on those probability
+# targets. The report compares teacher and student on agreement,
+# accuracy on a held-out split of the labelled data (kept out of the
+# pool) and per-query latency.
+#
+#   python -m nlu_engine.distillation --features hashing --epochs 30
+
+import argparse
+import itertools
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+import joblib
+import numpy as np
+
+from nlu_engine import active_learning, augmentation, dataset, model_registry
+from nlu_engine.evaluation import split_examples
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEACHER_PATH = os.path.join(BASE_DIR, "models", "intent_model")
+DEFAULT_DATA = os.path.join(BASE_DIR, "nlu_engine", "intents.json")
+REGISTRY_NAME = "distilled_student"
+STUDENT_FILE = "student.joblib"
+
+LABEL_BATCH = 64
+LATENCY_SAMPLE = 200
+
+
+# ==============================
+# Unlabeled pool
+# ==============================
+
+def iter_log_queries(sources=active_learning.SOURCES):
+    for _, db_path, table, text_col, _, _ in sources:
+        if not os.path.exists(db_path):
+            continue
+        conn = sqlite3.connect(db_path)
+        try:
+            if active_learning._table_exists(conn, table):
+                for (text,) in conn.execute(f"SELECT {text_col} FROM {table}"):
+                    yield text
+        finally:
+            conn.close()
+
+
+def iter_pool(data_sources=(DEFAULT_DATA,), n_variants=5, include_logs=True, exclude=()):
+    """
+    Distinct texts from the logs and the augmented training data.
+    exclude: text hashes (dataset.text_hash) to leave out, e.g. a test split.
+    """
+    texts = (text for text, _ in augmentation.iter_augmented(*data_sources, n_variants=n_variants))
+    if include_logs:
+        texts = itertools.chain(iter_log_queries(), texts)
+
+    seen = set(exclude)
+    for text in texts:
+        if not text or not str(text).strip():
+            continue
+        key = dataset.text_hash(text)
+        if key not in seen:
+            seen.add(key)
+            yield str(text).strip()
+
+
+# ==============================
+# Teacher labelling
+# ==============================
+
+def soft_label(teacher, texts, temperature=2.0, batch_size=LABEL_BATCH):
+    """
+    Teacher probabilities for every text, computed in batches.
+    temperature > 1 softens them so the student sees how classes relate.
+    """
+    probs = []
+    for start in range(0, len(texts), batch_size):
+        probs.append(teacher.predict_proba(texts[start:start + batch_size]))
+    probs = np.concatenate(probs)
+
+    softened = probs ** (1.0 / temperature)
+    return softened / softened.sum(axis=1, keepdims=True)
+
+
+def latency_ms(predict_one, texts):
+    """Median and p95 single-query latency."""
+    timings = []
+    for text in texts[:LATENCY_SAMPLE]:
+        start = time.perf_counter_ns()
+        predict_one(text)
+        timings.append((time.perf_counter_ns() - start) / 1_000_000)
+    return {
+        "median_ms": float(np.median(timings)),
+        "p95_ms": float(np.percentile(timings, 95)),
+    }
+
+
+def student_proba(student, texts):
+    if student.hasher is not None:
+        X = student.hasher.transform(texts).toarray()
+    else:
+        X = np.array([student.vectorize_text(t) for t in texts])
+    logits = X @ student.weights + student.bias
+    exp_logits = np.exp(logits - logits.max(axis=1, keepdims=True))
+    return exp_logits / exp_logits.sum(axis=1, keepdims=True)
+
+
+# ==============================
+# Distillation job
+# ==============================
+
+def distill(teacher=None, data_sources=(DEFAULT_DATA,), features="hashing", n_variants=5,
+            epochs=30, learning_rate=5.0, batch_size=32, temperature=2.0,
+            holdout=0.2, label_holdout=0.2, seed=42, include_logs=True):
+    """
+    Train a student on teacher soft labels. Returns (student, report).
+    label_holdout: stratified share of the labelled data kept out of the
+    pool (and its augmentations); accuracy is reported on it.
+    """
+    from nlu_engine.streamlit_app import NeuralNLUEngine
+
+    if teacher is None:
+        from nlu_engine.intent_classifier import IntentClassifier
+        teacher = IntentClassifier(TEACHER_PATH)
+    intent_names = teacher.labels
+
+    records = list(dataset.iter_records(*data_sources))
+    labelled = [(t, i) for t, i in records if i in intent_names]
+    labelled_train, labelled_test = split_examples(labelled, label_holdout, seed)
+    unscored = [(t, i) for t, i in records if i not in intent_names]
+
+    test_keys = {dataset.text_hash(t) for t, _ in labelled_test}
+    pool = list(iter_pool((labelled_train + unscored,), n_variants, include_logs, exclude=test_keys))
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(pool))
+    n_holdout = int(len(pool) * holdout)
+    held_out = [pool[i] for i in order[:n_holdout]]
+    train_texts = [pool[i] for i in order[n_holdout:]]
+
+    print(f"📌 Soft-labelling {len(pool)} texts with the teacher...")
+    started = time.perf_counter()
+    targets = soft_label(teacher, train_texts, temperature)
+    labelling_seconds = time.perf_counter() - started
+
+    print(f"📌 Training {features} student...")
+    np.random.seed(seed)
+    student = NeuralNLUEngine(features=features)
+    student.train_soft(train_texts, targets, intent_names,
+                       epochs=epochs, learning_rate=learning_rate, batch_size=batch_size)
+
+    # Agreement on pool texts neither model was fit to
+    teacher_held = teacher.predict_proba(held_out).argmax(axis=1) if held_out else np.zeros(0)
+    student_held = student_proba(student, held_out).argmax(axis=1) if held_out else np.zeros(0)
+
+    # Accuracy against the human labels the student never trained on
+    texts = [t for t, _ in labelled_test]
+    expected = np.array([intent_names.index(i) for _, i in labelled_test])
+    teacher_pred = teacher.predict_proba(texts).argmax(axis=1) if texts else np.zeros(0)
+    student_pred = student_proba(student, texts).argmax(axis=1) if texts else np.zeros(0)
+
+    teacher_latency = latency_ms(teacher.predict_intent, texts or held_out)
+    student_latency = latency_ms(student.predict, texts or held_out)
+
+    report = {
+        "pool_size": len(pool),
+        "train_size": len(train_texts),
+        "holdout_size": len(held_out),
+        "labelled_test_size": len(labelled_test),
+        "student_features": features,
+        "temperature": temperature,
+        "labelling_seconds": round(labelling_seconds, 2),
+        "agreement_holdout": float(np.mean(teacher_held == student_held)) if held_out else None,
+        "agreement_labelled": float(np.mean(teacher_pred == student_pred)) if texts else None,
+        "teacher_accuracy": float(np.mean(teacher_pred == expected)) if texts else None,
+        "student_accuracy": float(np.mean(student_pred == expected)) if texts else None,
+        "teacher_latency": teacher_latency,
+        "student_latency": student_latency,
+        "speedup": teacher_latency["median_ms"] / max(student_latency["median_ms"], 1e-6),
+    }
+    return student, report
+
+
+def publish(student, report, params):
+    """Save the student + report as a new registry version."""
+    with tempfile.TemporaryDirectory() as workdir:
+        joblib.dump(student, os.path.join(workdir, STUDENT_FILE))
+        with open(os.path.join(workdir, "distillation_report.json"), "w") as f:
+            json.dump(report, f, indent=2)
+
+        return model_registry.register(
+            REGISTRY_NAME,
+            workdir,
+            metrics={
+                "accuracy": report["student_accuracy"],
+                "teacher_accuracy": report["teacher_accuracy"],
+                "agreement": report["agreement_labelled"],
+                "median_latency_ms": report["student_latency"]["median_ms"],
+            },
+            params=params,
+        )
+
+
+def print_report(report):
+    t, s = report["teacher_latency"], report["student_latency"]
+    print(f"\n{'':<22}{'Teacher':>12}{'Student':>12}")
+    if report["teacher_accuracy"] is not None:
+        print(f"{'Accuracy (held-out)':<22}{report['teacher_accuracy'] * 100:>11.1f}%{report['student_accuracy'] * 100:>11.1f}%")
+    print(f"{'Median latency (ms)':<22}{t['median_ms']:>12.3f}{s['median_ms']:>12.3f}")
+    print(f"{'p95 latency (ms)':<22}{t['p95_ms']:>12.3f}{s['p95_ms']:>12.3f}")
+    agreement = []
+    if report["agreement_labelled"] is not None:
+        agreement.append(f"{report['agreement_labelled'] * 100:.1f}% on "
+                         f"{report['labelled_test_size']} held-out labelled texts")
+    if report["agreement_holdout"] is not None:
+        agreement.append(f"{report['agreement_holdout'] * 100:.1f}% on "
+                         f"{report['holdout_size']} held-out pool texts")
+    if agreement:
+        print(f"\n🤝 Agreement: {', '.join(agreement)}")
+    print(f"⚡ Student is {report['speedup']:.0f}x faster per query")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distil the transformer intent model into NeuralNLUEngine")
+    parser.add_argument("--data", nargs="+", default=[DEFAULT_DATA])
+    parser.add_argument("--features", choices=["bow", "hashing"], default="hashing")
+    parser.add_argument("--variants", type=int, default=5)
+    parser.add_argument("--epochs", type=int, default=30)
+    parser.add_argument("--learning-rate", type=float, default=5.0,
+                        help="L2-normalised hashed features need a larger step than raw counts")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--temperature", type=float, default=2.0)
+    parser.add_argument("--no-logs", action="store_true", help="Leave production queries out of the pool")
+    args = parser.parse_args()
+
+    params = {
+        "features": args.features, "variants": args.variants, "epochs": args.epochs,
+        "learning_rate": args.learning_rate, "batch_size": args.batch_size,
+        "temperature": args.temperature,
+    }
+    student, report = distill(
+        data_sources=args.data, features=args.features, n_variants=args.variants,
+        epochs=args.epochs, learning_rate=args.learning_rate, batch_size=args.batch_size,
+        temperature=args.temperature, include_logs=not args.no_logs
+    )
+    print_report(report)
+    version = publish(student, report, params)
+    print(f"📦 Registered {REGISTRY_NAME} version {version}")
@@ -0,0 +1,161 @@
+# ==============================
+# Embedding Cache + Linear Head
+# ==============================
+#
+# Frozen sentence embeddings are computed once per utterance and kept in
+# a memory-mapped .npy file keyed by a hash of the text. A small
+# LogisticRegression (or MLP) head is trained on top, so retraining
+# after an intent edit only embeds the new utterances.
+
+import hashlib
+import json
+import os
+
+import joblib
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.neural_network import MLPClassifier
+
+from nlu_engine.shared_weights import load_joblib
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BASE_DIR, "models", "embedding_cache")
+ENCODER_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+HEAD_FILE = "embedding_head.joblib"
+
+_encoders = {}
+
+
+def text_key(text):
+    return hashlib.sha1(text.strip().lower().encode("utf-8")).hexdigest()
+
+
+def get_encoder(name=ENCODER_NAME):
+    """Load each sentence encoder once per process."""
+    if name not in _encoders:
+        from sentence_transformers import SentenceTransformer
+        _encoders[name] = SentenceTransformer(name)
+    return _encoders[name]
+
+
+class EmbeddingCache:
+    def __init__(self, encoder_name=ENCODER_NAME, cache_dir=CACHE_DIR):
+        self.encoder_name = encoder_name
+        self.directory = os.path.join(cache_dir, encoder_name.replace("/", "__"))
+        self.matrix_path = os.path.join(self.directory, "embeddings.npy")
+        self.index_path = os.path.join(self.directory, "index.json")
+
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+
+    def _matrix(self):
+        if not os.path.exists(self.matrix_path):
+            return None
+        return np.load(self.matrix_path, mmap_mode="r")
+
+    def _append(self, keys, vectors):
+        """Grow the .npy file with new rows, then swap it in atomically."""
+        os.makedirs(self.directory, exist_ok=True)
+        old = self._matrix()
+        n_old = 0 if old is None else old.shape[0]
+
+        tmp_path = self.matrix_path + ".tmp"
+        grown = np.lib.format.open_memmap(
+            tmp_path, mode="w+", dtype=np.float32,
+            shape=(n_old + len(vectors), vectors.shape[1])
+        )
+        if n_old:
+            grown[:n_old] = old
+        grown[n_old:] = vectors
+        grown.flush()
+        del grown, old
+        os.replace(tmp_path, self.matrix_path)
+
+        for offset, key in enumerate(keys):
+            self.index[key] = n_old + offset
+
+        tmp_index = self.index_path + ".tmp"
+        with open(tmp_index, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp_index, self.index_path)
+
+    def embed(self, texts):
+        """Embeddings for texts, encoding only the ones not cached yet."""
+        keys = [text_key(t) for t in texts]
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in self.index and key not in missing:
+                missing[key] = text
+
+        if missing:
+            vectors = get_encoder(self.encoder_name).encode(
+                list(missing.values()),
+                batch_size=64,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            ).astype(np.float32)
+            self._append(list(missing.keys()), vectors)
+
+        matrix = self._matrix()
+        return np.asarray(matrix[[self.index[k] for k in keys]])
+
+
+def train_embedding_head(texts, labels, label_map, model_path, head="logreg",
+                         encoder_name=ENCODER_NAME):
+    """Fit a head on cached embeddings and save it to model_path."""
+    cache = EmbeddingCache(encoder_name)
+    n_cached = sum(1 for t in set(texts) if text_key(t) in cache.index)
+    print(f"📌 Embedding {len(set(texts)) - n_cached} new utterances ({n_cached} cached)...")
+    X = cache.embed(texts)
+
+    if head == "mlp":
+        classifier = MLPClassifier(hidden_layer_sizes=(256,), max_iter=500, random_state=42)
+    else:
+        classifier = LogisticRegression(max_iter=1000, C=10.0)
+    classifier.fit(X, labels)
+
+    id2label = {idx: intent for intent, idx in label_map.items()}
+    os.makedirs(model_path, exist_ok=True)
+    joblib.dump(
+        {
+            "encoder": encoder_name,
+            "classifier": classifier,
+            "id2label": id2label,
+        },
+        os.path.join(model_path, HEAD_FILE)
+    )
+    print("🎉 Embedding head saved!")
+    return classifier
+
+
+class EmbeddingHeadClassifier:
+    """Serves intents from a head saved by train_embedding_head()."""
+
+    def __init__(self, model_path):
+        bundle = load_joblib(os.path.join(model_path, HEAD_FILE))
+        self.encoder_name = bundle["encoder"]
+        self.classifier = bundle["classifier"]
+        self.id2label = bundle["id2label"]
+
+    @staticmethod
+    def available(model_path):
+        return os.path.exists(os.path.join(model_path, HEAD_FILE))
+
+    @property
+    def labels(self):
+        return [self.id2label[int(c)] for c in self.classifier.classes_]
+
+    def predict_proba(self, texts):
+        X = get_encoder(self.encoder_name).encode(
+            list(texts), convert_to_numpy=True, normalize_embeddings=True
+        )
+        return self.classifier.predict_proba(X)
+
+    def predict_intent(self, text):
+        probs = self.predict_proba([text])[0]
+        best = int(probs.argmax())
+        label_id = int(self.classifier.classes_[best])
+        return self.id2label[label_id], float(probs[best])
@@ -1,9 +1,14 @@
-def escalate_to_human(user_input, fallback_count):
-    text = user_input.lower()
+import re
+
+# Whole words only: "agents' fees" or "humane" are not hand-off requests
+HANDOFF_PATTERN = re.compile(r"\b(agent|human)\b", re.I)
 
-    if "agent" in text or "human" in text:
+
+def escalate_to_human(user_input, fallback_count):
+    if HANDOFF_PATTERN.search(user_input):
         return True
 
+    # fallback_count: consecutive turns the bot could not answer at all
     if fallback_count >= 3:
         return True
 
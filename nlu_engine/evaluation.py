@@ -0,0 +1,165 @@
+# ==============================
+# Model Evaluation Engine
+# ==============================
+#
+# Evaluates the intent classifier on a held-out split of the training
+# examples in one batched pass: confusion matrix, per-intent
+# precision / recall / F1 and one-vs-rest ROC-AUC, all with NumPy.
+# Results are cached by model version (data + config hash) so
+# re-rendering a dashboard tab is a dictionary lookup.
+
+import hashlib
+import json
+from collections import OrderedDict
+
+import numpy as np
+from scipy.stats import rankdata
+
+from nlu_engine.classifier_service import IntentClassifierService
+
+MODEL_NAME = "tfidf-logreg"
+CACHE_SIZE = 8
+
+_results = OrderedDict()
+
+
+def model_version(pairs, test_size=0.25, seed=42):
+    """Stable version id for a training set + evaluation config."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps(
+        {"model": MODEL_NAME, "test_size": test_size, "seed": seed},
+        sort_keys=True
+    ).encode())
+    for text, intent in sorted(pairs):
+        digest.update(f"{intent}\t{text}\n".encode())
+    return digest.hexdigest()[:12]
+
+
+def split_examples(pairs, test_size=0.25, seed=42):
+    """
+    Stratified split. Every intent with at least two examples keeps one
+    for training and puts at least one in the held-out set.
+    """
+    rng = np.random.default_rng(seed)
+    by_intent = OrderedDict()
+    for text, intent in pairs:
+        by_intent.setdefault(intent, []).append(text)
+
+    train, test = [], []
+    for intent, texts in by_intent.items():
+        order = rng.permutation(len(texts))
+        n_test = int(round(len(texts) * test_size))
+        if len(texts) >= 2:
+            n_test = min(max(n_test, 1), len(texts) - 1)
+        else:
+            n_test = 0
+
+        for rank, i in enumerate(order):
+            (test if rank < n_test else train).append((texts[i], intent))
+
+    return train, test
+
+
+def confusion_matrix(y_true, y_pred, n_classes):
+    matrix = np.zeros((n_classes, n_classes), dtype=int)
+    np.add.at(matrix, (y_true, y_pred), 1)
+    return matrix
+
+
+def per_class_scores(matrix):
+    """Precision, recall, F1 and support per class from a confusion matrix."""
+    tp = np.diag(matrix).astype(float)
+    predicted = matrix.sum(axis=0)
+    support = matrix.sum(axis=1)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(support > 0, tp / support, 0.0)
+        f1 = np.where(
+            precision + recall > 0,
+            2 * precision * recall / (precision + recall),
+            0.0
+        )
+
+    return precision, recall, f1, support
+
+
+def roc_auc_ovr(y_true, probs):
+    """
+    One-vs-rest ROC-AUC for every class at once, via the rank-sum
+    (Mann-Whitney U) statistic: O(n log n) per class, ties count half.
+    Classes without both positives and negatives in the split get NaN.
+    """
+    n, k = probs.shape
+    positive = np.zeros((n, k), dtype=bool)
+    positive[np.arange(n), y_true] = True
+
+    ranks = rankdata(probs, axis=0)  # average ranks, column by column
+    n_pos = positive.sum(axis=0)
+    n_neg = n - n_pos
+    u = (ranks * positive).sum(axis=0) - n_pos * (n_pos + 1) / 2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(n_pos * n_neg > 0, u / (n_pos * n_neg), np.nan)
+
+
+def evaluate(pairs, test_size=0.25, seed=42):
+    """Train on the train split and score the held-out split in one pass."""
+    pairs = list(pairs)
+    train, test = split_examples(pairs, test_size, seed)
+    if not train or not test:
+        return None
+
+    classifier = IntentClassifierService.from_examples(train)
+    if not classifier.trained:
+        return None
+    labels = [str(label) for label in classifier.labels]
+    index = {label: i for i, label in enumerate(labels)}
+
+    # Held-out intents the model never saw cannot be scored
+    test = [(text, intent) for text, intent in test if intent in index]
+    if not test:
+        return None
+    texts = [text for text, _ in test]
+    y_true = np.array([index[intent] for _, intent in test])
+
+    probs = classifier.predict_proba(texts)
+    y_pred = probs.argmax(axis=1)
+
+    matrix = confusion_matrix(y_true, y_pred, len(labels))
+    precision, recall, f1, support = per_class_scores(matrix)
+    auc = roc_auc_ovr(y_true, probs)
+
+    return {
+        "version": model_version(pairs, test_size, seed),
+        "labels": labels,
+        "confusion_matrix": matrix,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "support": support,
+        "roc_auc": auc,
+        "accuracy": float(np.trace(matrix) / matrix.sum()),
+        "macro_precision": float(precision.mean()),
+        "macro_recall": float(recall.mean()),
+        "macro_f1": float(f1.mean()),
+        "macro_roc_auc": float(np.nanmean(auc)) if np.any(~np.isnan(auc)) else float("nan"),
+        "train_size": len(train),
+        "test_size": len(test),
+    }
+
+
+def evaluate_cached(pairs, test_size=0.25, seed=42):
+    """evaluate(), memoised by model version."""
+    pairs = list(pairs)
+    version = model_version(pairs, test_size, seed)
+
+    if version in _results:
+        _results.move_to_end(version)
+        return _results[version]
+
+    result = evaluate(pairs, test_size, seed)
+    _results[version] = result
+    if len(_results) > CACHE_SIZE:
+        _results.popitem(last=False)
+    return result
@@ -1,10 +1,6 @@
-def fallback_message():
-    return (
-        "❓ I didn't understand that.\n\n"
-        "You can ask me about:\n"
-        "• Account balance\n"
-        "• Card blocking\n"
-        "• Loans\n"
-        "• Transactions\n"
-        "• Branch details"
-    )
+from nlu_engine.response_catalog import get_catalog
+
+
+def fallback_message(locale=None, channel="markdown"):
+    # Constant template: the same string object on every call
+    return get_catalog().render("fallback.help", locale=locale, channel=channel)
@@ -0,0 +1,99 @@
+# ==============================
+# Hashed Character N-gram Features
+# ==============================
+#
+# Drop-in replacement for TfidfVectorizer with a fixed number of
+# feature columns. Character n-grams are hashed straight into columns,
+# so there is no vocabulary to grow or pickle, and misspellings like
+# "balnce" still share most n-grams with "balance". IDF is optional and
+# is accumulated as a document-frequency array in a streaming pass, so
+# memory stays at n_features counters however much data is seen.
+#
+#   features = HashedFeatures(n_features=2 ** 18)
+#   X = features.fit_transform(texts)
+#   features.partial_fit(more_texts)     # keep IDF up to date incrementally
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+DEFAULT_N_FEATURES = 2 ** 18
+CHUNK_SIZE = 4096
+
+
+class HashedFeatures:
+    def __init__(self, n_features=DEFAULT_N_FEATURES, ngram_range=(2, 4), use_idf=True,
+                 sublinear_tf=True):
+        self.n_features = n_features
+        self.ngram_range = tuple(ngram_range)
+        self.use_idf = use_idf
+        self.sublinear_tf = sublinear_tf
+
+        self.n_docs = 0
+        self.doc_freq = np.zeros(n_features, dtype=np.int32) if use_idf else None
+        self._idf = None
+
+    @property
+    def hasher(self):
+        # Stateless, so it is rebuilt on demand instead of being pickled
+        return HashingVectorizer(
+            analyzer="char_wb",
+            ngram_range=self.ngram_range,
+            n_features=self.n_features,
+            lowercase=True,
+            alternate_sign=False,
+            norm=None
+        )
+
+    def _counts(self, texts):
+        return self.hasher.transform(texts)
+
+    def partial_fit(self, texts):
+        """Add a batch of documents to the IDF statistics."""
+        if self.use_idf:
+            counts = self._counts(texts)
+            counts.sum_duplicates()
+            present = np.bincount(counts.indices, minlength=self.n_features)
+            self.doc_freq += present.astype(np.int32)
+            self.n_docs += counts.shape[0]
+            self._idf = None
+        return self
+
+    def fit(self, texts):
+        """Reset and stream IDF statistics over texts, CHUNK_SIZE at a time."""
+        self.n_docs = 0
+        self._idf = None
+        if self.use_idf:
+            self.doc_freq[:] = 0
+
+        chunk = []
+        for text in texts:
+            chunk.append(text)
+            if len(chunk) == CHUNK_SIZE:
+                self.partial_fit(chunk)
+                chunk = []
+        if chunk:
+            self.partial_fit(chunk)
+        return self
+
+    @property
+    def idf(self):
+        # Smoothed like TfidfVectorizer(smooth_idf=True); computed once per fit
+        # (getattr: pickles from before the cache existed have no _idf)
+        if getattr(self, "_idf", None) is None:
+            self._idf = np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1.0
+        return self._idf
+
+    def transform(self, texts):
+        X = self._counts(texts).astype(np.float64)
+        if self.sublinear_tf:
+            X.data = np.log1p(X.data)
+        if self.use_idf:
+            # Scale each stored value by its column's IDF, in place; no
+            # n_features x n_features diagonal matrix per call
+            X.data *= self.idf[X.indices]
+        return normalize(X, norm="l2", copy=False)
+
+    def fit_transform(self, texts):
+        texts = list(texts)
+        return self.fit(texts).transform(texts)
@@ -1,12 +1,17 @@
 import os
 import json
 from transformers import AutoTokenizer, AutoModelForSequenceClassification
+import numpy as np
 import torch
 
-class IntentClassifier:
-    def __init__(self, model_path):
-        self.model_path = model_path
+from nlu_engine.embedding_head import EmbeddingHeadClassifier
+from nlu_engine.model_registry import ModelWatcher
 
+REGISTRY_NAME = "intent_model"
+
+
+class _TransformerModel:
+    def __init__(self, model_path):
         # Load tokenizer
         self.tokenizer = AutoTokenizer.from_pretrained(
             model_path,
@@ -24,9 +29,23 @@ class IntentClassifier:
         with open(labels_file, "r") as f:
             self.id2label = json.load(f)  # keys are strings
 
-    def predict_intent(self, text):
-        """Returns predicted intent label string and confidence"""
+    @property
+    def labels(self):
+        return [self.id2label[str(i)] for i in range(len(self.id2label))]
+
+    def predict_proba(self, texts, batch_size=64):
+        """Softmax probabilities for many texts, one forward pass per batch."""
+        probs = []
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(
+                list(texts[start:start + batch_size]),
+                return_tensors="pt", truncation=True, padding=True
+            )
+            with torch.no_grad():
+                probs.append(torch.softmax(self.model(**tokens).logits, dim=1).numpy())
+        return np.concatenate(probs)
 
+    def predict_intent(self, text):
         # Tokenize input
         tokens = self.tokenizer(text, return_tensors="pt", truncation=True, padding=True)
 
@@ -40,4 +59,40 @@ class IntentClassifier:
         # Map to label using id2label
         predicted_intent = self.id2label[str(predicted_class_id)]
 
-        return predicted_intent, confidence
\ No newline at end of file
+        return predicted_intent, confidence
+
+
+def load_model(model_path):
+    """Embedding head when one was trained, otherwise the fine-tuned transformer."""
+    if EmbeddingHeadClassifier.available(model_path):
+        return EmbeddingHeadClassifier(model_path)
+    return _TransformerModel(model_path)
+
+
+class IntentClassifier:
+    def __init__(self, model_path, registry_name=REGISTRY_NAME):
+        self.model_path = model_path
+
+        # Serve the registry's current version when there is one, so new
+        # versions are picked up without restarting
+        self.watcher = ModelWatcher(registry_name, load_model)
+        self.local = None if self.watcher.available else load_model(model_path)
+
+    @property
+    def version(self):
+        return self.watcher.version
+
+    def _model(self):
+        return self.watcher.get() or self.local
+
+    @property
+    def labels(self):
+        """Intent names in predict_proba column order"""
+        return self._model().labels
+
+    def predict_proba(self, texts):
+        return self._model().predict_proba(texts)
+
+    def predict_intent(self, text):
+        """Returns predicted intent label string and confidence"""
+        return self._model().predict_intent(text)
@@ -1,17 +1,12 @@
-def detect_intent(text: str) -> str:
-    text = text.lower()
-
-    if any(word in text for word in ["balance", "balnce", "bal"]):
-        return "check_balance"
-
-    if any(word in text for word in ["news", "latest", "current"]):
-        return "latest_news"
-
-    if any(word in text for word in ["transfer", "send money"]):
-        return "transfer_money"
-
-    return "general"
-
+from nlu_engine.keyword_router import KeywordAutomaton
 
+# Checked in this order; plain substring matches, so "bal" also catches "balnce"
+RULES = KeywordAutomaton({
+    "check_balance": ["balance", "balnce", "bal"],
+    "latest_news": ["news", "latest", "current"],
+    "transfer_money": ["transfer", "send money"],
+})
 
 
+def detect_intent(text: str) -> str:
+    return RULES.first(text, default="general")
@@ -1,15 +1,10 @@
-def detect_intent(msg: str) -> str:
-    msg = msg.lower()
-
-    # 🔒 Balance FIRST
-    if "balance" in msg or "check balance" in msg:
-        return "check_balance"
+from nlu_engine.keyword_router import get_router
 
-    if "transfer" in msg or "send money" in msg:
-        return "transfer_money"
+# 🔒 Balance FIRST: earlier intents win when several match
+INTENTS = ("check_balance", "transfer_money", "greet")
 
-    if "hi" in msg or "hello" in msg:
-        return "greet"
-
-    return "fallback"
 
+def detect_intent(msg: str) -> str:
+    # Shared whole-word router over the keywords and intents.json examples
+    hits = get_router().match(msg)
+    return next((intent for intent in INTENTS if hits[intent]), "fallback")
@@ -0,0 +1,163 @@
+# ==============================
+# Keyword Pre-Router
+# ==============================
+#
+# Aho–Corasick automaton over intent keywords. It is built once from the
+# keyword lists and intent examples, then finds every keyword occurrence
+# in a single left-to-right pass over the message. The cost depends on
+# the message length, not on how many keywords or intents there are.
+#
+#   automaton = KeywordAutomaton({"check_balance": ["balance", "bal"],
+#                                 "transfer_money": ["transfer"]})
+#   automaton.match("transfer my balance")  # Counter({'check_balance': 1, 'transfer_money': 1})
+#   automaton.first("transfer my balance")  # 'check_balance' (declared first)
+#
+#   candidates("show my balance")            # [('check_balance', 2), ...]
+
+import json
+import os
+import threading
+from collections import Counter, deque
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INTENTS_PATH = os.path.join(BASE_DIR, "nlu_engine", "intents.json")
+
+# Keywords from the rule-based detectors, highest priority first
+KEYWORDS = {
+    "check_balance": ["balance", "balnce", "bal", "check balance"],
+    "latest_news": ["latest news", "today news", "news"],
+    "transfer_money": ["transfer", "send money"],
+    "greet": ["hi", "hello"],
+}
+
+
+class KeywordAutomaton:
+    """
+    keywords:    {intent: [phrase, ...]}; dict order sets priority for first()
+    whole_words: only count hits that start and end on word boundaries
+                 (False keeps plain substring semantics)
+    """
+
+    def __init__(self, keywords, whole_words=False):
+        self.whole_words = whole_words
+        self.priority = {}
+        self.keywords = []          # index -> (phrase, intent)
+
+        # Trie: per-node transition dicts, failure links and outputs
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+
+        seen = set()
+        for intent, phrases in keywords.items():
+            self.priority.setdefault(intent, len(self.priority))
+            for phrase in phrases:
+                phrase = phrase.lower().strip()
+                if phrase and (phrase, intent) not in seen:
+                    seen.add((phrase, intent))
+                    self._add(phrase, len(self.keywords))
+                    self.keywords.append((phrase, intent))
+
+        self._build_links()
+
+    def _add(self, phrase, index):
+        node = 0
+        for ch in phrase:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(index)
+
+    def _build_links(self):
+        # Breadth-first, so a node's failure target is always finished first;
+        # depth-1 nodes keep failure link 0 (the root)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(ch, 0)
+                # Every keyword ending at the fallback state also ends here
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def iter_hits(self, text):
+        """Yield (start, end, phrase, intent) for every keyword occurrence."""
+        text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for index in out[node]:
+                phrase, intent = self.keywords[index]
+                start = i - len(phrase) + 1
+                if self.whole_words and not _on_word_boundaries(text, start, i + 1):
+                    continue
+                yield start, i + 1, phrase, intent
+
+    def match(self, text):
+        """Counter of intent -> number of keyword hits."""
+        return Counter(intent for _, _, _, intent in self.iter_hits(text))
+
+    def first(self, text, default=None):
+        """The highest-priority intent with any hit (rule-list semantics)."""
+        best = None
+        for _, _, _, intent in self.iter_hits(text):
+            if best is None or self.priority[intent] < self.priority[best]:
+                best = intent
+                if self.priority[best] == 0:
+                    break
+        return best if best is not None else default
+
+
+def _on_word_boundaries(text, start, end):
+    return (start == 0 or not text[start - 1].isalnum()) and \
+        (end == len(text) or not text[end].isalnum())
+
+
+# ==============================
+# Shared router
+# ==============================
+
+def load_intent_examples(path=INTENTS_PATH):
+    """{intent: [example, ...]} from an intents.json (list or {"examples": [...]} values)."""
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    return {
+        intent: data["examples"] if isinstance(data, dict) else list(data)
+        for intent, data in raw.items()
+    }
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Process-wide automaton over KEYWORDS plus the intent examples."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            keywords = {intent: list(phrases) for intent, phrases in KEYWORDS.items()}
+            if os.path.exists(INTENTS_PATH):
+                for intent, examples in load_intent_examples().items():
+                    keywords.setdefault(intent, []).extend(examples)
+            _router = KeywordAutomaton(keywords, whole_words=True)
+        return _router
+
+
+def candidates(text, router=None):
+    """Candidate intents for text as (intent, hits), most hits first."""
+    return (router if router is not None else get_router()).match(text).most_common()
@@ -1,7 +1,6 @@
 import streamlit as st
 import json
 import os
-import subprocess
 import time
 
 # Paths - handle both running from root and from nlu_engine folder
@@ -495,58 +494,55 @@ st.markdown("### 🎯 Model Training")
 col_train1, col_train2 = st.columns([3, 1])
 
 with col_train1:
+    try:
+        from nlu_engine import training_jobs
+    except ModuleNotFoundError:
+        import training_jobs
+
     if st.button("🚀 Retrain Intent Model"):
-        st.info("🔄 Training started...")
-        
-        # Progress bar
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        try:
-            # Run training
-            start_time = time.time()
-            
-            # Determine the correct path to train_intent.py
-            if os.path.basename(BASE_DIR) == "nlu_engine":
-                train_script = os.path.join(BASE_DIR, "train_intent.py")
-            else:
-                train_script = os.path.join(BASE_DIR, "nlu_engine", "train_intent.py")
-            
-            result = subprocess.run(
-                ["python3", train_script],
-                capture_output=True,
-                text=True,
-                check=True
-            )
-            
-            # Simulate progress
-            for i in range(100):
-                progress_bar.progress(i + 1)
-                status_text.text(f"Training... {i+1}%")
-                time.sleep(0.02)
-            
-            end_time = time.time()
-            training_time = end_time - start_time
-            
-            # Show success
-            st.success(f"✅ Training completed successfully in {training_time:.2f} seconds!")
-            
-            # Show training output if available
-            if result.stdout:
-                with st.expander("📋 View Training Details"):
-                    st.code(result.stdout, language="text")
-            
-            # Clear cache to reload models
+        job_id = training_jobs.submit_job(INTENTS_PATH, MODEL_DIR)
+        st.session_state.training_job_id = job_id
+        ahead = training_jobs.queue_position(job_id)
+        if ahead:
+            st.info(f"⏳ Another training run is in progress. Job #{job_id} is queued ({ahead} ahead).")
+        else:
+            st.info(f"🔄 Training job #{job_id} started in the background.")
+
+    job = None
+    poll_training = False
+    if st.session_state.get("training_job_id"):
+        training_jobs.dispatch()
+        job = training_jobs.get_job(st.session_state.training_job_id)
+
+    if job:
+        poll_training = job["status"] in ("queued", "running")
+        if job["status"] == "queued":
+            st.info(f"⏳ Job #{job['id']} is waiting for the current training run to finish...")
+        elif job["status"] == "running":
+            progress = job["step"] / job["total_steps"] if job["total_steps"] else 0.0
+            st.progress(min(progress, 1.0))
+            loss_text = f" | Loss: {job['loss']:.4f}" if job["loss"] is not None else ""
+            st.text(f"Training job #{job['id']} • Epoch {job['epoch']:.2f} • Step {job['step']}/{job['total_steps']}{loss_text}")
+        elif job["status"] == "completed":
+            st.success(f"✅ Training job #{job['id']} completed at {job['finished_at']}")
+        elif job["status"] == "cancelled":
+            st.warning(f"🛑 Training job #{job['id']} was cancelled")
+        else:
+            st.error("❌ Training failed!")
+            if job["message"]:
+                with st.expander("🔍 Error Details"):
+                    st.code(job["message"], language="text")
+
+        if job["status"] in ("queued", "running"):
+            if st.button("🛑 Cancel Training"):
+                training_jobs.cancel_job(job["id"])
+                st.rerun()
+        elif job["status"] == "completed" and st.session_state.get("reloaded_for_job") != job["id"]:
+            # Reload models once per finished job
+            st.session_state.reloaded_for_job = job["id"]
+            st.session_state.models_loaded = False
             st.cache_resource.clear()
             st.balloons()
-            
-        except subprocess.CalledProcessError as e:
-            st.error(f"❌ Training failed!")
-            if e.stderr:
-                with st.expander("🔍 Error Details"):
-                    st.code(e.stderr, language="text")
-        except Exception as e:
-            st.error(f"❌ Unexpected error: {str(e)}")
 
 with col_train2:
     if st.button("🔄 Reload Models"):
@@ -559,4 +555,9 @@ with col_train2:
 
 # Footer
 st.markdown("---")
-st.markdown('<div class="footer">💡 BankBot NLU Milestone 1 - Streamlit Demo</div>', unsafe_allow_html=True)
\ No newline at end of file
+st.markdown('<div class="footer">💡 BankBot NLU Milestone 1 - Streamlit Demo</div>', unsafe_allow_html=True)
+
+# Poll training job state instead of blocking the session on training
+if poll_training:
+    time.sleep(2)
+    st.rerun()
@@ -0,0 +1,277 @@
+# ==============================
+# Model Registry
+# ==============================
+#
+# Trained models are copied into content-addressed version directories
+# and never modified afterwards. Each version carries a manifest.json
+# (metrics, data hash, training time, params). A per-model CURRENT file
+# names the version being served and is replaced atomically, so readers
+# see either the old or the new version — never a half-written model.
+#
+#   models/registry/<name>/versions/<version>/...   artifacts + manifest.json
+#   models/registry/<name>/CURRENT                 active version id
+#
+#   version = register("intent_model", "models/intent_model", metrics={...})
+#   activate("intent_model", older_version)        # rollback
+#   watcher = ModelWatcher("intent_model", load_fn)
+#   model = watcher.get()                          # hot-swaps in the background
+
+import fnmatch
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REGISTRY_DIR = os.getenv("BANKBOT_MODEL_REGISTRY", os.path.join(BASE_DIR, "models", "registry"))
+
+MANIFEST_FILE = "manifest.json"
+CURRENT_FILE = "CURRENT"
+VERSION_LENGTH = 16
+
+
+def _model_dir(name, root=None):
+    return os.path.join(root or REGISTRY_DIR, name)
+
+
+def _versions_dir(name, root=None):
+    return os.path.join(_model_dir(name, root), "versions")
+
+
+def _write_atomic(path, text):
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def content_hash(path):
+    """SHA-256 over relative file names and bytes of a file or directory."""
+    digest = hashlib.sha256()
+
+    if os.path.isfile(path):
+        files = [(os.path.basename(path), path)]
+    else:
+        files = []
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                full = os.path.join(dirpath, filename)
+                files.append((os.path.relpath(full, path).replace(os.sep, "/"), full))
+        files.sort()
+
+    for rel, full in files:
+        if rel == MANIFEST_FILE:
+            continue
+        digest.update(rel.encode("utf-8") + b"\0")
+        with open(full, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+
+# ==============================
+# Registering versions
+# ==============================
+
+def register(name, source, metrics=None, data_hash=None, params=None,
+             training_seconds=None, activate_version=True,
+             ignore=("checkpoint-*", "runs"), root=None):
+    """
+    Copy a trained model (file or directory) into the registry.
+    Identical artifacts map to the same version, so re-registering is a no-op.
+    Returns the version id.
+    """
+    versions = _versions_dir(name, root)
+    os.makedirs(versions, exist_ok=True)
+
+    # Stage next to the final location so the rename below is atomic
+    staging = tempfile.mkdtemp(dir=versions, prefix=".staging-")
+    try:
+        if os.path.isdir(source):
+            shutil.copytree(source, staging, dirs_exist_ok=True,
+                            ignore=shutil.ignore_patterns(*ignore))
+        else:
+            shutil.copy2(source, os.path.join(staging, os.path.basename(source)))
+
+        version = content_hash(staging)[:VERSION_LENGTH]
+        final = os.path.join(versions, version)
+
+        if os.path.exists(final):
+            shutil.rmtree(staging)
+        else:
+            manifest = {
+                "name": name,
+                "version": version,
+                "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "created_ts": time.time(),
+                "source": os.path.abspath(source),
+                "artifacts": sorted(
+                    f for f in os.listdir(staging) if not fnmatch.fnmatch(f, ".*")
+                ),
+                "metrics": metrics or {},
+                "data_hash": data_hash,
+                "params": params or {},
+                "training_seconds": training_seconds,
+            }
+            _write_atomic(os.path.join(staging, MANIFEST_FILE), json.dumps(manifest, indent=2))
+            os.rename(staging, final)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if activate_version:
+        activate(name, version, root)
+    return version
+
+
+def activate(name, version, root=None):
+    """Point CURRENT at an existing version (also used to roll back)."""
+    if not os.path.isdir(os.path.join(_versions_dir(name, root), version)):
+        raise ValueError(f"Unknown {name} version: {version}")
+    _write_atomic(os.path.join(_model_dir(name, root), CURRENT_FILE), version)
+
+
+def rollback(name, root=None):
+    """Activate the version registered just before the current one."""
+    current = current_version(name, root)
+    history = [m["version"] for m in list_versions(name, root)]
+    if current not in history or history.index(current) == len(history) - 1:
+        return None
+    previous = history[history.index(current) + 1]
+    activate(name, previous, root)
+    return previous
+
+
+# ==============================
+# Reading the registry
+# ==============================
+
+def current_version(name, root=None):
+    try:
+        with open(os.path.join(_model_dir(name, root), CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def version_path(name, version, root=None):
+    return os.path.join(_versions_dir(name, root), version)
+
+
+def current_path(name, root=None):
+    version = current_version(name, root)
+    return version_path(name, version, root) if version else None
+
+
+def get_manifest(name, version, root=None):
+    try:
+        with open(os.path.join(version_path(name, version, root), MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def list_versions(name, root=None):
+    """Manifests of every version of a model, newest first."""
+    versions = _versions_dir(name, root)
+    if not os.path.isdir(versions):
+        return []
+
+    current = current_version(name, root)
+    manifests = []
+    for version in os.listdir(versions):
+        if version.startswith("."):
+            continue
+        manifest = get_manifest(name, version, root)
+        if manifest:
+            manifest["current"] = version == current
+            manifests.append(manifest)
+
+    return sorted(manifests, key=lambda m: m["created_ts"], reverse=True)
+
+
+def find_version(name, data_hash, params=None, root=None):
+    """A registered version trained on the same data (and params), if any."""
+    wanted = json.dumps(params or {}, sort_keys=True)
+    for manifest in list_versions(name, root):
+        if manifest["data_hash"] == data_hash and json.dumps(manifest["params"], sort_keys=True) == wanted:
+            return manifest["version"]
+    return None
+
+
+def list_models(root=None):
+    root = root or REGISTRY_DIR
+    if not os.path.isdir(root):
+        return []
+    return sorted(d for d in os.listdir(root) if os.path.isdir(_versions_dir(d, root)))
+
+
+# ==============================
+# Hot-swapping
+# ==============================
+
+class ModelWatcher:
+    """
+    Serves the model CURRENT points to and reloads it when the pointer moves.
+    The pointer is checked at most every poll_interval seconds; a new
+    version loads on a background thread while requests keep using the
+    old one, then the reference is swapped.
+    """
+
+    def __init__(self, name, loader, poll_interval=2.0, root=None):
+        self.name = name
+        self.loader = loader
+        self.poll_interval = poll_interval
+        self.root = root
+
+        self.version = None
+        self.model = None
+        self._last_check = 0.0
+        self._loading = threading.Lock()
+
+        version = current_version(name, root)
+        if version:
+            self._load(version)
+
+    @property
+    def available(self):
+        return self.model is not None or current_version(self.name, self.root) is not None
+
+    def _load(self, version):
+        model = self.loader(version_path(self.name, version, self.root))
+        self.model, self.version = model, version
+
+    def _load_in_background(self, version):
+        try:
+            self._load(version)
+        finally:
+            self._loading.release()
+
+    def get(self):
+        now = time.monotonic()
+        if now - self._last_check >= self.poll_interval:
+            self._last_check = now
+            version = current_version(self.name, self.root)
+
+            if version and version != self.version and self._loading.acquire(blocking=False):
+                if self.model is None:
+                    # Nothing to serve yet, so this first load has to block
+                    try:
+                        self._load(version)
+                    finally:
+                        self._loading.release()
+                else:
+                    threading.Thread(
+                        target=self._load_in_background, args=(version,), daemon=True
+                    ).start()
+
+        return self.model
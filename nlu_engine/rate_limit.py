@@ -0,0 +1,298 @@
+# ==============================
+# Rate Limiting & Admission Control
+# ==============================
+#
+# Two layers in front of the expensive work (NLU pool, Groq, web search):
+#
+#   token bucket   per user / session / IP; each request takes a token,
+#                  tokens refill at `rate` per second up to `burst`
+#                    InMemoryRateLimiter  one process
+#                    SQLiteRateLimiter    shared by several worker processes
+#   admission      process-wide caps on in-flight work by kind ("llm",
+#                  "search", "queue"); past the cap the caller gets a
+#                  canned reply right away instead of waiting behind
+#                  everyone else
+#
+#   allowed, retry_after = check_rate(session_id or client_ip)
+#
+#   with get_admission().admit("llm") as admitted:
+#       response = grok_answer(text) if admitted else SHED_MESSAGE
+#
+#   get_admission().metrics()          # admitted / rejected counts, in flight
+#   get_admission().prometheus_text()  # same, Prometheus exposition format
+#
+# BANKBOT_RATE_LIMIT_STORE=sqlite shares buckets between processes (file
+# from BANKBOT_RATE_LIMIT_DB).
+
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+
+from nlu_engine.tracing import span
+
+RATE = float(os.getenv("BANKBOT_RATE_LIMIT", "1"))        # tokens per second
+BURST = float(os.getenv("BANKBOT_RATE_BURST", "10"))      # bucket size
+MAX_KEYS = int(os.getenv("BANKBOT_RATE_LIMIT_KEYS", "100000"))
+RATE_LIMIT_DB = os.getenv("BANKBOT_RATE_LIMIT_DB", "rate_limit.db")
+PURGE_INTERVAL = 60.0                                      # seconds between idle-bucket sweeps
+
+# Per worker process
+MAX_LLM_IN_FLIGHT = int(os.getenv("BANKBOT_MAX_LLM_IN_FLIGHT", "16"))
+MAX_SEARCH_IN_FLIGHT = int(os.getenv("BANKBOT_MAX_SEARCH_IN_FLIGHT", "8"))
+MAX_QUEUE_DEPTH = int(os.getenv("BANKBOT_MAX_QUEUE_DEPTH", "128"))
+
+RATE_LIMIT_MESSAGE = "You're sending messages too quickly. Please wait a moment and try again."
+SHED_MESSAGE = ("We're experiencing high demand right now. For balance, transfers or card "
+                "services, please try again in a few moments.")
+
+
+# ==============================
+# Token buckets
+# ==============================
+
+def _refill(tokens, updated_at, now, rate, burst):
+    return min(burst, tokens + (now - updated_at) * rate)
+
+
+class InMemoryRateLimiter:
+    def __init__(self, rate=RATE, burst=BURST, max_keys=MAX_KEYS):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self._lock = threading.Lock()
+
+    def acquire(self, key, cost=1):
+        """
+        Take cost tokens from key's bucket. A cost above burst is charged as
+        a full bucket, since the bucket never holds more than that.
+        Returns (allowed, seconds until enough tokens would be available).
+        """
+        cost = min(cost, self.burst)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+            tokens = _refill(tokens, updated_at, now, self.rate, self.burst)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+
+            # Least recently seen keys go first; a dropped bucket comes back full
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+        return allowed, 0.0 if allowed else (cost - tokens) / self.rate
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SQLiteRateLimiter:
+    """
+    Buckets in a SQLite table. Each thread keeps one open connection, and
+    fully refilled buckets are purged every purge_interval seconds so the
+    table only holds recently active keys.
+    """
+
+    def __init__(self, db_path=RATE_LIMIT_DB, rate=RATE, burst=BURST, purge_interval=PURGE_INTERVAL):
+        self.db_path = db_path
+        self.rate = rate
+        self.burst = burst
+        self.purge_interval = purge_interval
+        self._local = threading.local()
+        self._last_purge = time.time()
+        self._connect().execute("""
+        CREATE TABLE IF NOT EXISTS rate_limit (
+            key TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def acquire(self, key, cost=1):
+        cost = min(cost, self.burst)
+        now = time.time()
+        conn = self._connect()
+        # Write lock up front so two processes can't spend the same token
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM rate_limit WHERE key = ?", (key,)
+            ).fetchone()
+            tokens = _refill(*row, now, self.rate, self.burst) if row else self.burst
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            conn.execute(
+                "INSERT INTO rate_limit (key, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at",
+                (key, tokens, now)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+        if now - self._last_purge >= self.purge_interval:
+            self._last_purge = now
+            self.purge_idle()
+
+        return allowed, 0.0 if allowed else (cost - tokens) / self.rate
+
+    def reset(self, key):
+        self._connect().execute("DELETE FROM rate_limit WHERE key = ?", (key,))
+
+    def purge_idle(self):
+        """Drop buckets that have refilled completely; they behave like missing ones."""
+        cur = self._connect().execute("DELETE FROM rate_limit WHERE updated_at < ?",
+                                      (time.time() - self.burst / self.rate,))
+        return cur.rowcount
+
+
+# ==============================
+# Admission control
+# ==============================
+
+class AdmissionController:
+    """
+    limits: {kind: max concurrent}. Kinds without a limit are always admitted
+    (but still counted).
+    """
+
+    def __init__(self, limits=None):
+        self.limits = dict(limits if limits is not None else
+                           {"llm": MAX_LLM_IN_FLIGHT, "search": MAX_SEARCH_IN_FLIGHT,
+                            "queue": MAX_QUEUE_DEPTH})
+        self._lock = threading.Lock()
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        with self._lock:
+            self.in_flight = Counter()
+            self.peak = Counter()
+            self.admitted = Counter()
+            self.rejected = Counter()   # reason -> count
+
+    def try_acquire(self, kind):
+        with self._lock:
+            limit = self.limits.get(kind)
+            if limit is not None and self.in_flight[kind] >= limit:
+                admitted = False
+            else:
+                admitted = True
+                self.in_flight[kind] += 1
+                self.admitted[kind] += 1
+                self.peak[kind] = max(self.peak[kind], self.in_flight[kind])
+        if not admitted:
+            self.reject(f"{kind}_saturated", kind=kind, in_flight=limit)
+        return admitted
+
+    def release(self, kind):
+        with self._lock:
+            self.in_flight[kind] -= 1
+
+    @contextmanager
+    def admit(self, kind):
+        """Yields whether the work may run; the slot is freed afterwards."""
+        admitted = self.try_acquire(kind)
+        try:
+            yield admitted
+        finally:
+            if admitted:
+                self.release(kind)
+
+    def reject(self, reason, **attributes):
+        """Count a rejection and leave a span for it in the trace buffer."""
+        with self._lock:
+            self.rejected[reason] += 1
+        with span("admission_rejected", reason=reason, **attributes):
+            pass
+
+    def metrics(self):
+        with self._lock:
+            admitted = sum(self.admitted.values())
+            rejected = sum(self.rejected.values())
+            return {
+                "pid": os.getpid(),
+                "limits": dict(self.limits),
+                "in_flight": dict(self.in_flight),
+                "peak_in_flight": dict(self.peak),
+                "admitted": dict(self.admitted),
+                "rejected": dict(self.rejected),
+                "rejection_rate": rejected / (admitted + rejected) if admitted + rejected else 0.0,
+            }
+
+    def prometheus_text(self):
+        m = self.metrics()
+        lines = [
+            "# HELP bankbot_admitted_total Requests admitted, by kind of work.",
+            "# TYPE bankbot_admitted_total counter",
+            *[f'bankbot_admitted_total{{kind="{k}"}} {v}' for k, v in m["admitted"].items()],
+            "# HELP bankbot_rejected_total Requests rejected by the rate limiter or load shedding.",
+            "# TYPE bankbot_rejected_total counter",
+            *[f'bankbot_rejected_total{{reason="{r}"}} {v}' for r, v in m["rejected"].items()],
+            "# HELP bankbot_in_flight Work currently running, by kind.",
+            "# TYPE bankbot_in_flight gauge",
+            *[f'bankbot_in_flight{{kind="{k}"}} {v}' for k, v in m["in_flight"].items()],
+            "# HELP bankbot_in_flight_limit Admission limit, by kind.",
+            "# TYPE bankbot_in_flight_limit gauge",
+            *[f'bankbot_in_flight_limit{{kind="{k}"}} {v}' for k, v in m["limits"].items()],
+        ]
+        return "\n".join(lines) + "\n"
+
+
+# ==============================
+# Process-wide instances
+# ==============================
+
+_limiter = None
+_admission = None
+_init_lock = threading.Lock()
+
+
+def get_limiter():
+    """Process-wide limiter chosen by BANKBOT_RATE_LIMIT_STORE (memory | sqlite)."""
+    global _limiter
+    with _init_lock:
+        if _limiter is None:
+            if os.getenv("BANKBOT_RATE_LIMIT_STORE", "memory") == "sqlite":
+                _limiter = SQLiteRateLimiter()
+            else:
+                _limiter = InMemoryRateLimiter()
+        return _limiter
+
+
+def get_admission():
+    global _admission
+    with _init_lock:
+        if _admission is None:
+            _admission = AdmissionController()
+        return _admission
+
+
+def check_rate(key, cost=1):
+    """
+    Token-bucket check for one caller (user, session or IP).
+    Returns (allowed, retry_after_seconds); rejections show up in the
+    admission metrics as "rate_limited".
+    """
+    allowed, retry_after = get_limiter().acquire(key, cost)
+    if not allowed:
+        get_admission().reject("rate_limited")
+    return allowed, retry_after
@@ -0,0 +1,256 @@
+# ==============================
+# Response Catalog
+# ==============================
+#
+# Bot copy lives in responses.json instead of f-strings in every handler.
+# The catalog is read once and every template is compiled once, so
+# rendering a turn is one format_map call and a dict lookup. Templates
+# without fields render to the same string object every time.
+#
+#   responses.json   {"responses": {locale: {key: template | {channel: template}}}}
+#
+#   catalog = get_catalog()
+#   catalog.render("balance", {"account_number": "999001", "balance": 125000})
+#   # 'The balance for account 999001 is ₹1,25,000.'
+#   catalog.render("balance", {...}, locale="hi-IN", channel="markdown")
+#
+#   # Drop-in for a DialoguePolicy template, prompt or fallback
+#   "template": get_catalog().ref("balance")
+#
+# Format specs: {x:currency} and {x:number} group digits for the locale
+# (Indian 1,25,000 or Western 125,000); anything else goes to format().
+# Missing keys fall back locale -> locale's "fallback" -> default locale,
+# and channel -> default channel -> any variant.
+#
+# BANKBOT_RESPONSES points at another catalog file, BANKBOT_LOCALE sets
+# the default locale.
+
+import json
+import os
+import threading
+from string import Formatter
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESPONSES_PATH = os.getenv("BANKBOT_RESPONSES", os.path.join(BASE_DIR, "nlu_engine", "responses.json"))
+DEFAULT_LOCALE = os.getenv("BANKBOT_LOCALE")
+CHANNELS = ("text", "markdown")
+DEFAULT_NUMBERS = {"currency": "₹", "grouping": "western"}
+
+_FORMATTER = Formatter()
+
+
+# ==============================
+# Number formatting
+# ==============================
+
+def _group(digits, grouping):
+    if grouping == "indian" and len(digits) > 3:
+        # Last three digits, then pairs: 1,25,00,000
+        head, tail = digits[:-3], digits[-3:]
+        pairs = []
+        while len(head) > 2:
+            pairs.insert(0, head[-2:])
+            head = head[:-2]
+        return ",".join([head] + pairs + [tail])
+    return f"{int(digits):,}" if len(digits) > 3 else digits
+
+
+def format_number(value, grouping="western"):
+    """Digit-grouped amount; whole numbers drop the decimals. Non-numbers pass through."""
+    try:
+        number = float(value.replace(",", "")) if isinstance(value, str) else value
+        whole, fraction = divmod(abs(number), 1)
+    except (TypeError, ValueError):
+        return str(value)
+
+    sign = "-" if number < 0 else ""
+    if not fraction:
+        return sign + _group(str(int(whole)), grouping)
+    whole, _, fraction = f"{abs(number):.2f}".partition(".")
+    grouped = _group(whole, grouping)
+    return sign + grouped if fraction == "00" else f"{sign}{grouped}.{fraction}"
+
+
+# ==============================
+# Templates
+# ==============================
+
+class CompiledTemplate:
+    """
+    One template, parsed once. Standard fields stay in a format string;
+    {x:currency} / {x:number} fields become placeholders filled from
+    pre-formatted values, so render() is a single format_map call.
+    """
+    __slots__ = ("source", "locale", "_format", "_custom", "_constant")
+
+    def __init__(self, source, locale=None):
+        self.source = source
+        self.locale = locale or DEFAULT_NUMBERS
+        pieces = []
+        custom = []
+        has_fields = False
+        for literal, field, spec, conversion in _FORMATTER.parse(source):
+            pieces.append(literal.replace("{", "{{").replace("}", "}}"))
+            if field is None:
+                continue
+            has_fields = True
+            if not field.isidentifier() or "{" in (spec or ""):
+                raise ValueError(f"Unsupported field '{{{field}:{spec}}}' in template {source!r}")
+            if spec in ("currency", "number"):
+                placeholder = f"{field}__{spec}"
+                custom.append((placeholder, field, spec))
+                pieces.append("{" + placeholder + "}")
+            else:
+                pieces.append("{" + field + (f"!{conversion}" if conversion else "") + (f":{spec}" if spec else "") + "}")
+
+        self._format = "".join(pieces)
+        self._custom = tuple(custom)
+        # Literal text only: render() hands back this one string
+        self._constant = None if has_fields else "".join(
+            literal for literal, _, _, _ in _FORMATTER.parse(source)
+        )
+
+    def render(self, values=None, numbers=None):
+        """numbers: {"currency", "grouping"} to use instead of the template locale's."""
+        if self._constant is not None:
+            return self._constant
+        values = values or {}
+        if self._custom:
+            numbers = numbers or self.locale
+            values = dict(values)
+            for placeholder, field, spec in self._custom:
+                number = format_number(values[field], numbers["grouping"])
+                if spec == "currency":
+                    # -₹1,500 rather than ₹-1,500
+                    sign, number = ("-", number[1:]) if number.startswith("-") else ("", number)
+                    number = sign + numbers["currency"] + number
+                values[placeholder] = number
+        return self._format.format_map(values)
+
+    def format(self, **values):
+        """str.format-compatible, so a compiled template can stand in for a string."""
+        return self.render(values)
+
+    def __repr__(self):
+        return f"CompiledTemplate({self.source!r})"
+
+
+class ResponseRef:
+    """A catalog key resolved at render time, for the caller's locale and channel."""
+    __slots__ = ("catalog", "key")
+
+    def __init__(self, catalog, key):
+        self.catalog = catalog
+        self.key = key
+
+    def render(self, values=None, locale=None, channel=None):
+        return self.catalog.render(self.key, values, locale, channel)
+
+    def format(self, **values):
+        return self.render(values)
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return f"ResponseRef({self.key!r})"
+
+
+# ==============================
+# Catalog
+# ==============================
+
+class ResponseCatalog:
+    def __init__(self, catalog, default_locale=None):
+        self.default_locale = default_locale or catalog.get("default_locale", "en-IN")
+        self.default_channel = catalog.get("default_channel", CHANNELS[0])
+        self.locales = catalog.get("locales", {})
+
+        # (locale, key) -> {channel: CompiledTemplate}
+        self._variants = {}
+        for locale, entries in catalog.get("responses", {}).items():
+            settings = self.numbers(locale)
+            for key, entry in entries.items():
+                if isinstance(entry, str):
+                    entry = {channel: entry for channel in CHANNELS}
+                self._variants[(locale, key)] = {
+                    channel: CompiledTemplate(source, settings) for channel, source in entry.items()
+                }
+
+        self._keys = {key for _, key in self._variants}
+        self._numbers = {locale: self.numbers(locale) for locale in self.locales}
+        self._resolved = {}  # (key, locale, channel) -> CompiledTemplate
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path=RESPONSES_PATH, default_locale=DEFAULT_LOCALE):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), default_locale)
+
+    def numbers(self, locale=None):
+        """Currency symbol and digit grouping for a locale."""
+        settings = self.locales.get(locale or self.default_locale, {})
+        return {
+            "currency": settings.get("currency", DEFAULT_NUMBERS["currency"]),
+            "grouping": settings.get("grouping", DEFAULT_NUMBERS["grouping"]),
+        }
+
+    def _locale_chain(self, locale):
+        """hi-IN -> its configured fallbacks -> hi -> default locale."""
+        chain = []
+        while locale and locale not in chain:
+            chain.append(locale)
+            locale = self.locales.get(locale, {}).get("fallback")
+        if chain and "-" in chain[0]:
+            chain.append(chain[0].split("-")[0])
+        chain.append(self.default_locale)
+        return chain
+
+    def template(self, key, locale=None, channel=None):
+        """The compiled template for key, after locale and channel fallbacks."""
+        cache_key = (key, locale, channel)
+        compiled = self._resolved.get(cache_key)
+        if compiled is not None:
+            return compiled
+
+        for candidate in self._locale_chain(locale or self.default_locale):
+            variants = self._variants.get((candidate, key))
+            if variants:
+                compiled = (variants.get(channel or self.default_channel)
+                            or variants.get(self.default_channel)
+                            or next(iter(variants.values())))
+                break
+        else:
+            raise KeyError(f"No response '{key}' in the catalog")
+
+        with self._lock:
+            self._resolved[cache_key] = compiled
+        return compiled
+
+    def render(self, key, values=None, locale=None, channel=None, **kwargs):
+        if kwargs:
+            values = {**(values or {}), **kwargs}
+        # A key missing in this locale still formats numbers the locale's way
+        numbers = self._numbers.get(locale) if locale else None
+        return self.template(key, locale, channel).render(values, numbers)
+
+    def ref(self, key):
+        """Lazily rendered stand-in for a template string; fails fast on unknown keys."""
+        self.template(key)
+        return ResponseRef(self, key)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """Process-wide catalog, loaded from RESPONSES_PATH on first use."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ResponseCatalog.from_file()
+        return _catalog
@@ -0,0 +1,173 @@
+# ==============================
+# Dialogue State Store
+# ==============================
+#
+# Per-session dialogue state (slot filling, turn counter, fallback count)
+# keyed by session ID, instead of one module-level dict shared by every
+# user and thread.
+#
+#   InMemoryStateStore  one process; TTL expiry + LRU eviction
+#   SQLiteStateStore    shared by several worker processes
+#
+#   store = get_store()
+#   with store.session(session_id) as state:
+#       state["turns"] += 1
+#
+# BANKBOT_STATE_STORE=sqlite selects the SQLite store (file from
+# BANKBOT_STATE_DB).
+
+import copy
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+
+SESSION_TTL = int(os.getenv("BANKBOT_SESSION_TTL", "1800"))  # seconds idle
+MAX_SESSIONS = int(os.getenv("BANKBOT_MAX_SESSIONS", "10000"))
+STATE_DB = os.getenv("BANKBOT_STATE_DB", "dialogue_state.db")
+
+
+def new_state():
+    return {
+        "awaiting": None,          # slot the bot just asked for
+        "pending_intent": None,    # intent waiting on that slot
+        "slots": {},
+        "turns": 0,
+        "fallback_count": 0,
+    }
+
+
+class _StateStore(ABC):
+    @abstractmethod
+    def get(self, session_id):
+        ...
+
+    @abstractmethod
+    def save(self, session_id, state):
+        ...
+
+    @abstractmethod
+    def delete(self, session_id):
+        ...
+
+    @contextmanager
+    def session(self, session_id):
+        """
+        Load a session's state, yield it for the turn, then save it.
+        session_id=None gives a throwaway state that is never stored.
+        """
+        state = self.get(session_id) if session_id is not None else new_state()
+        yield state
+        if session_id is not None:
+            self.save(session_id, state)
+
+
+class InMemoryStateStore(_StateStore):
+    def __init__(self, ttl=SESSION_TTL, max_sessions=MAX_SESSIONS):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # session_id -> (last_seen, state)
+        self._lock = threading.Lock()
+
+    def _evict(self, now):
+        # Oldest entries sit at the front, so expiry stops at the first live one
+        while self._sessions:
+            session_id, (last_seen, _) = next(iter(self._sessions.items()))
+            if now - last_seen <= self.ttl and len(self._sessions) <= self.max_sessions:
+                break
+            self._sessions.popitem(last=False)
+
+    def get(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return new_state()
+            self._sessions.move_to_end(session_id)
+            return copy.deepcopy(entry[1])
+
+    def save(self, session_id, state):
+        now = time.monotonic()
+        with self._lock:
+            self._sessions[session_id] = (now, copy.deepcopy(state))
+            self._sessions.move_to_end(session_id)
+            self._evict(now)
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteStateStore(_StateStore):
+    def __init__(self, db_path=STATE_DB, ttl=SESSION_TTL):
+        self.db_path = db_path
+        self.ttl = ttl
+        conn = self._connect()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS dialogue_state (
+            session_id TEXT PRIMARY KEY,
+            state TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_dialogue_state_updated ON dialogue_state (updated_at)")
+        conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def get(self, session_id):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT state FROM dialogue_state WHERE session_id = ? AND updated_at >= ?",
+            (session_id, time.time() - self.ttl)
+        ).fetchone()
+        conn.close()
+        return json.loads(row[0]) if row else new_state()
+
+    def save(self, session_id, state):
+        now = time.time()
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO dialogue_state (session_id, state, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(session_id) DO UPDATE SET state = excluded.state, updated_at = excluded.updated_at",
+            (session_id, json.dumps(state), now)
+        )
+        conn.close()
+
+    def delete(self, session_id):
+        conn = self._connect()
+        conn.execute("DELETE FROM dialogue_state WHERE session_id = ?", (session_id,))
+        conn.close()
+
+    def purge_expired(self):
+        conn = self._connect()
+        cur = conn.execute("DELETE FROM dialogue_state WHERE updated_at < ?", (time.time() - self.ttl,))
+        conn.close()
+        return cur.rowcount
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide store chosen by BANKBOT_STATE_STORE (memory | sqlite)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if os.getenv("BANKBOT_STATE_STORE", "memory") == "sqlite":
+                _store = SQLiteStateStore()
+            else:
+                _store = InMemoryStateStore()
+        return _store
@@ -0,0 +1,167 @@
+# ==============================
+# Shared Model Weights
+# ==============================
+#
+# Lets several worker processes serve one copy of the model weights:
+#
+#   mmap       joblib bundles (TF-IDF + LogReg, cosine matrices, embedding
+#              heads) are loaded with mmap_mode="r", so their NumPy arrays
+#              are pages of the file in the OS page cache, shared by every
+#              process that maps it
+#   preload    the parent loads the models, freezes the GC so collections
+#              in the children don't write to the shared objects' headers,
+#              then forks; the workers share those pages copy-on-write
+#              (gunicorn --preload, see backend/gunicorn_conf.py)
+#
+#   bundle = load_joblib(path)            # read-only, memory-mapped arrays
+#   freeze_for_fork()                     # in the parent, right before forking
+#   memory_usage()                        # {'rss_mb', 'pss_mb', 'shared_mb', 'private_mb'}
+#
+#   python -m nlu_engine.shared_weights models/registry/.../intent_model.pkl --workers 4
+
+import argparse
+import gc
+import os
+from multiprocessing import get_context
+
+import joblib
+
+# BANKBOT_MMAP_MODELS=0 loads private in-memory copies instead
+MMAP_MODE = "r" if os.getenv("BANKBOT_MMAP_MODELS", "1") != "0" else None
+
+
+def load_joblib(path, mmap_mode=MMAP_MODE):
+    """
+    joblib.load with the bundle's arrays memory-mapped read-only. Only
+    uncompressed dumps (joblib's default) can be mapped; others load normally.
+    """
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+
+def freeze_for_fork():
+    """
+    Move every live object to the GC's permanent generation. Children
+    forked afterwards never rescan them, so their pages stay shared.
+    """
+    gc.disable()
+    gc.collect()
+    gc.freeze()
+    gc.enable()
+
+
+def memory_usage(pid="self"):
+    """RSS and PSS (RSS with shared pages split between their users) in MB."""
+    fields = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 3 and parts[-1] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1])
+    except OSError:
+        # Not Linux: RSS only
+        import resource
+        rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return {"rss_mb": rss_kb / 1024, "pss_mb": None, "shared_mb": None, "private_mb": None}
+
+    return {
+        "rss_mb": fields.get("Rss", 0) / 1024,
+        "pss_mb": fields.get("Pss", 0) / 1024,
+        "shared_mb": (fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)) / 1024,
+        "private_mb": (fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1024,
+    }
+
+
+# ==============================
+# Per-worker memory comparison
+# ==============================
+
+def _touch(bundle):
+    """Read every array once, as serving requests eventually would."""
+    import numpy as np
+    from scipy import sparse
+
+    total = 0.0
+    stack = [bundle]
+    seen = set()
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, np.ndarray) and obj.dtype.kind in "fiu":
+            total += float(obj.sum())
+        elif sparse.issparse(obj):
+            total += float(obj.sum())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+        elif isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif hasattr(obj, "__dict__"):
+            stack.extend(vars(obj).values())
+    return total
+
+
+def _worker(path, preloaded, mmap_mode, ready, results, release):
+    bundle = preloaded if preloaded is not None else load_joblib(path, mmap_mode)
+    _touch(bundle)
+    ready.release()
+    # Measure once every worker is up, so shared pages are split fairly
+    release.acquire()
+    results.put(memory_usage())
+
+
+def compare(path, workers=4, modes=("private", "mmap", "preload")):
+    """Average per-worker RSS/PSS for each way of loading the model (None where not measurable)."""
+    ctx = get_context("fork")
+    report = {}
+    for mode in modes:
+        preloaded = None
+        if mode == "preload":
+            preloaded = load_joblib(path, None)
+            freeze_for_fork()
+
+        ready, release = ctx.Semaphore(0), ctx.Semaphore(0)
+        results = ctx.Queue()
+        procs = [
+            ctx.Process(target=_worker, args=(path, preloaded, "r" if mode == "mmap" else None,
+                                              ready, results, release))
+            for _ in range(workers)
+        ]
+        for p in procs:
+            p.start()
+        for _ in procs:
+            ready.acquire()
+        for _ in procs:
+            release.release()
+
+        usage = [results.get() for _ in procs]
+        for p in procs:
+            p.join()
+        gc.unfreeze()
+        del preloaded
+
+        report[mode] = {key: _mean(u[key] for u in usage) for key in ("rss_mb", "pss_mb", "private_mb")}
+    return report
+
+
+def _mean(values):
+    """Average of the measured values; None when the platform reported none."""
+    values = [v for v in values if v is not None]
+    return sum(values) / len(values) if values else None
+
+
+def _mb(value, width):
+    return f"{value:>{width}.1f}" if value is not None else f"{'n/a':>{width}}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-worker memory for private, mmap and preload-then-fork loading")
+    parser.add_argument("path", help="joblib model bundle")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    report = compare(args.path, args.workers)
+    print(f"\n{'mode':<10}{'RSS MB':>10}{'PSS MB':>10}{'private MB':>12}   (per worker, {args.workers} workers)")
+    for mode, usage in report.items():
+        print(f"{mode:<10}{_mb(usage['rss_mb'], 10)}{_mb(usage['pss_mb'], 10)}{_mb(usage['private_mb'], 12)}")
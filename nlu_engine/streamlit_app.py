@@ -2,13 +2,24 @@ import streamlit as st
 import numpy as np
 import pandas as pd
 from datetime import datetime
+import copy
 import re
+import threading
 import time
+import sys
+from pathlib import Path
+
+# Make the project packages importable under `streamlit run nlu_engine/streamlit_app.py`
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from nlu_engine.hashing_features import HashedFeatures
 
 # ==================== NEURAL NETWORK IMPLEMENTATION ====================
 
 class NeuralNLUEngine:
-    def __init__(self):
+    def __init__(self, features="bow", n_features=2 ** 12):
+        self.features = features
+        # "hashing": fixed-width char n-gram features instead of a vocabulary
+        self.hasher = HashedFeatures(n_features=n_features) if features == "hashing" else None
         self.intents = {}
         self.model_trained = False
         self.vocab = set()
@@ -30,20 +41,34 @@ class NeuralNLUEngine:
         text = re.sub(r'[^\w\s]', ' ', text)
         return text.split()
     
-    def build_vocabulary(self):
-        """Build vocabulary from all examples"""
-        self.vocab = set()
-        for intent, examples in self.intents.items():
-            for example in examples:
+    def build_vocabulary(self, texts=None):
+        """Build vocabulary from all examples (or the given texts)"""
+        if texts is None:
+            texts = [ex for examples in self.intents.values() for ex in examples]
+        
+        if self.hasher is not None:
+            # Streaming IDF pass; no vocabulary is kept
+            self.hasher.fit(texts)
+        else:
+            self.vocab = set()
+            for example in texts:
                 words = self.preprocess_text(example)
                 self.vocab.update(words)
+            
+            self.word_to_idx = {word: idx for idx, word in enumerate(sorted(self.vocab))}
         
-        self.word_to_idx = {word: idx for idx, word in enumerate(sorted(self.vocab))}
         self.intent_to_idx = {intent: idx for idx, intent in enumerate(sorted(self.intents.keys()))}
         self.idx_to_intent = {idx: intent for intent, idx in self.intent_to_idx.items()}
     
+    @property
+    def n_features(self):
+        return self.hasher.n_features if self.hasher is not None else len(self.vocab)
+    
     def vectorize_text(self, text):
         """Convert text to vector using bag of words"""
+        if self.hasher is not None:
+            return self.hasher.transform([text]).toarray()[0]
+        
         words = self.preprocess_text(text)
         vector = np.zeros(len(self.vocab))
         for word in words:
@@ -77,14 +102,17 @@ class NeuralNLUEngine:
         for intent, examples in self.intents.items():
             intent_idx = self.intent_to_idx[intent]
             for example in examples:
-                X_train.append(self.vectorize_text(example))
+                X_train.append(example if self.hasher is not None else self.vectorize_text(example))
                 y_train.append(intent_idx)
         
-        X_train = np.array(X_train)
+        if self.hasher is not None:
+            X_train = self.hasher.transform(X_train).toarray()
+        else:
+            X_train = np.array(X_train)
         y_train = np.array(y_train)
         
         # Initialize weights
-        n_features = len(self.vocab)
+        n_features = self.n_features
         n_classes = len(self.intents)
         self.weights = np.random.randn(n_features, n_classes) * 0.01
         self.bias = np.zeros(n_classes)
@@ -136,6 +164,60 @@ class NeuralNLUEngine:
         self.model_trained = True
         return True, "Model trained successfully", self.training_history
     
+    def train_soft(self, texts, soft_targets, intent_names, epochs=20, learning_rate=0.5, batch_size=32):
+        """
+        Distillation: fit to a teacher's probability distributions instead
+        of one-hot labels. Column j of soft_targets is intent_names[j].
+        """
+        self.intents = {name: self.intents.get(name, []) for name in intent_names}
+        self.build_vocabulary(texts)
+        self.intent_to_idx = {intent: idx for idx, intent in enumerate(intent_names)}
+        self.idx_to_intent = {idx: intent for intent, idx in self.intent_to_idx.items()}
+        self.training_history = []
+        
+        if self.hasher is not None:
+            X_train = self.hasher.transform(texts).toarray()
+        else:
+            X_train = np.array([self.vectorize_text(t) for t in texts])
+        targets = np.asarray(soft_targets, dtype=float)
+        
+        n_classes = len(intent_names)
+        self.weights = np.random.randn(self.n_features, n_classes) * 0.01
+        self.bias = np.zeros(n_classes)
+        
+        for epoch in range(epochs):
+            indices = np.random.permutation(len(X_train))
+            epoch_loss = 0
+            n_batches = 0
+            
+            for i in range(0, len(X_train), batch_size):
+                batch_X = X_train[indices[i:i+batch_size]]
+                batch_t = targets[indices[i:i+batch_size]]
+                
+                logits = np.dot(batch_X, self.weights) + self.bias
+                exp_logits = np.exp(logits - np.max(logits, axis=1, keepdims=True))
+                probs = exp_logits / np.sum(exp_logits, axis=1, keepdims=True)
+                
+                # Cross-entropy against the soft targets
+                epoch_loss += -np.mean(np.sum(batch_t * np.log(probs + 1e-10), axis=1))
+                n_batches += 1
+                
+                grad = (probs - batch_t) / len(batch_X)
+                self.weights -= learning_rate * np.dot(batch_X.T, grad)
+                self.bias -= learning_rate * np.sum(grad, axis=0)
+            
+            agreement = np.mean(
+                np.argmax(np.dot(X_train, self.weights) + self.bias, axis=1) == np.argmax(targets, axis=1)
+            )
+            self.training_history.append({
+                'epoch': epoch + 1,
+                'loss': epoch_loss / n_batches,
+                'accuracy': agreement
+            })
+        
+        self.model_trained = True
+        return True, "Student trained successfully", self.training_history
+    
     def predict(self, text, top_k=3):
         """Predict intent and confidence"""
         if not self.model_trained:
@@ -205,126 +287,201 @@ class NeuralNLUEngine:
         
         return entities
 
+# ==================== SHARED ENGINE ====================
+
+DEFAULT_INTENTS = {
+    'check_balance': [
+        "What's my account balance?",
+        "Show balance for my savings account",
+        "How much money do I have in my current account?",
+        "Check balance of my savings",
+        "Can you tell me my account balance?",
+        "What's the balance in my checking account?",
+        "Show me my balance",
+        "How much is left in my savings?",
+        "Account balance check",
+        "Display my current balance",
+        "How much do I have?",
+        "Check my bank balance",
+        "What is my balance?",
+        "Balance inquiry",
+        "Show my account balance",
+        "Current account balance",
+        "Savings account balance",
+        "Tell me my balance",
+        "How much money in my account",
+        "Balance check please"
+    ],
+    'transfer_money': [
+        "Transfer 5000 from savings to checking",
+        "Move $1500 to account 12345678",
+        "Please transfer $250 to my friend",
+        "Transfer funds from my savings to current account",
+        "I want to send 1000 rupees to account 9876543210",
+        "Send money to account 4532",
+        "Transfer $500 to checking",
+        "Move funds between accounts",
+        "Wire money to another account",
+        "Send payment to account",
+        "Transfer money please",
+        "I need to transfer funds",
+        "Move money from savings",
+        "Send $1000 to account 8765",
+        "Transfer amount to account",
+        "Make a transfer",
+        "Send funds to checking account",
+        "Transfer RS 2000",
+        "Wire transfer to account"
+    ],
+    'card_block': [
+        "Block my credit card",
+        "I lost my debit card",
+        "Disable my card",
+        "My card was stolen",
+        "Freeze my credit card",
+        "Lock my debit card",
+        "Card block request",
+        "Stop my card",
+        "Deactivate my card",
+        "I need to block my card",
+        "Card lost, please block",
+        "Emergency card block",
+        "Suspend my card",
+        "Cancel my card",
+        "Block card immediately",
+        "My card is missing",
+        "Report stolen card",
+        "Disable card access",
+        "Stop card transactions",
+        "Lock my card now"
+    ],
+    'find_atm': [
+        "Where is the nearest ATM?",
+        "Find ATM near me",
+        "ATM locations nearby",
+        "Show me ATM locations",
+        "Nearest bank branch",
+        "ATM finder",
+        "Where can I withdraw cash?",
+        "Find closest ATM",
+        "ATM near my location",
+        "Show ATMs in my area",
+        "Locate ATM",
+        "Find cash machine",
+        "Where is ATM",
+        "Nearest cash point",
+        "ATM search",
+        "Show me nearby ATMs",
+        "Find ATM close to me",
+        "ATM locator",
+        "Where can I find ATM",
+        "Nearest withdrawal point",
+        "Show branch locations"
+    ],
+    'loan_inquiry': [
+        "I want to apply for a home loan",
+        "Personal loan information",
+        "How can I get a car loan?",
+        "Loan application",
+        "Tell me about home loans",
+        "What are loan rates?",
+        "Apply for personal loan",
+        "Education loan details",
+        "Business loan inquiry",
+        "How to apply for loan",
+        "Loan eligibility check",
+        "Interest rates for loans",
+        "Home loan application",
+        "Need a loan",
+        "Loan information please",
+        "Want to borrow money",
+        "Loan options available",
+        "Check loan eligibility",
+        "Apply for credit"
+    ]
+}
+
+
+class SharedNLUEngine:
+    """
+    One engine per server process, shared by every browser session.
+
+    Readers use whichever engine is currently published. New intents wait
+    in `pending` until the next successful train(), which fits a private
+    copy and publishes it with a single reference swap, so a prediction
+    never sees half-updated weights and adding an intent never turns
+    predictions off for other sessions. Training is serialized by a lock.
+    """
+
+    def __init__(self, features="bow"):
+        self._engine = NeuralNLUEngine(features=features)
+        self._train_lock = threading.Lock()
+        self.pending = {}
+        self.version = 0
+
+    def _clone(self):
+        current = self._engine
+        clone = copy.copy(current)
+        clone.intents = dict(current.intents)
+        # The hasher's IDF is refit in place, so it must not be shared
+        clone.hasher = copy.deepcopy(current.hasher)
+        return clone
+
+    def _publish(self, engine):
+        self._engine = engine
+        self.version += 1
+
+    @property
+    def engine(self):
+        return self._engine
+
+    @property
+    def intents(self):
+        """Published intents plus the ones waiting for training."""
+        return {**self._engine.intents, **self.pending}
+
+    @property
+    def model_trained(self):
+        return self._engine.model_trained
+
+    @property
+    def is_training(self):
+        return self._train_lock.locked()
+
+    def add_intent(self, intent_name, examples):
+        """Queue an intent for the next train(); the published model keeps serving."""
+        with self._train_lock:
+            self.pending = {**self.pending, intent_name: examples}
+
+    def train(self, epochs=10, learning_rate=0.01, batch_size=8):
+        """Train a copy with the pending intents and publish it; concurrent requests wait their turn."""
+        with self._train_lock:
+            clone = self._clone()
+            for intent_name, examples in self.pending.items():
+                clone.add_intent(intent_name, examples)
+            success, message, history = clone.train(epochs, learning_rate, batch_size)
+            if success:
+                self._publish(clone)
+                self.pending = {}
+            return success, message, history
+
+    def predict(self, text, top_k=3):
+        return self._engine.predict(text, top_k=top_k)
+
+    def extract_entities(self, text):
+        return self._engine.extract_entities(text)
+
+
+@st.cache_resource
+def get_shared_engine():
+    shared = SharedNLUEngine()
+    for intent, examples in DEFAULT_INTENTS.items():
+        shared.add_intent(intent, examples)
+    return shared
+
 # ==================== SESSION STATE ====================
 
 def init_session_state():
-    if 'nlu_engine' not in st.session_state:
-        st.session_state.nlu_engine = NeuralNLUEngine()
-        # Load default intents
-        default_intents = {
-            'check_balance': [
-                "What's my account balance?",
-                "Show balance for my savings account",
-                "How much money do I have in my current account?",
-                "Check balance of my savings",
-                "Can you tell me my account balance?",
-                "What's the balance in my checking account?",
-                "Show me my balance",
-                "How much is left in my savings?",
-                "Account balance check",
-                "Display my current balance",
-                "How much do I have?",
-                "Check my bank balance",
-                "What is my balance?",
-                "Balance inquiry",
-                "Show my account balance",
-                "Current account balance",
-                "Savings account balance",
-                "Tell me my balance",
-                "How much money in my account",
-                "Balance check please"
-            ],
-            'transfer_money': [
-                "Transfer 5000 from savings to checking",
-                "Move $1500 to account 12345678",
-                "Please transfer $250 to my friend",
-                "Transfer funds from my savings to current account",
-                "I want to send 1000 rupees to account 9876543210",
-                "Send money to account 4532",
-                "Transfer $500 to checking",
-                "Move funds between accounts",
-                "Wire money to another account",
-                "Send payment to account",
-                "Transfer money please",
-                "I need to transfer funds",
-                "Move money from savings",
-                "Send $1000 to account 8765",
-                "Transfer amount to account",
-                "Make a transfer",
-                "Send funds to checking account",
-                "Transfer RS 2000",
-                "Wire transfer to account"
-            ],
-            'card_block': [
-                "Block my credit card",
-                "I lost my debit card",
-                "Disable my card",
-                "My card was stolen",
-                "Freeze my credit card",
-                "Lock my debit card",
-                "Card block request",
-                "Stop my card",
-                "Deactivate my card",
-                "I need to block my card",
-                "Card lost, please block",
-                "Emergency card block",
-                "Suspend my card",
-                "Cancel my card",
-                "Block card immediately",
-                "My card is missing",
-                "Report stolen card",
-                "Disable card access",
-                "Stop card transactions",
-                "Lock my card now"
-            ],
-            'find_atm': [
-                "Where is the nearest ATM?",
-                "Find ATM near me",
-                "ATM locations nearby",
-                "Show me ATM locations",
-                "Nearest bank branch",
-                "ATM finder",
-                "Where can I withdraw cash?",
-                "Find closest ATM",
-                "ATM near my location",
-                "Show ATMs in my area",
-                "Locate ATM",
-                "Find cash machine",
-                "Where is ATM",
-                "Nearest cash point",
-                "ATM search",
-                "Show me nearby ATMs",
-                "Find ATM close to me",
-                "ATM locator",
-                "Where can I find ATM",
-                "Nearest withdrawal point",
-                "Show branch locations"
-            ],
-            'loan_inquiry': [
-                "I want to apply for a home loan",
-                "Personal loan information",
-                "How can I get a car loan?",
-                "Loan application",
-                "Tell me about home loans",
-                "What are loan rates?",
-                "Apply for personal loan",
-                "Education loan details",
-                "Business loan inquiry",
-                "How to apply for loan",
-                "Loan eligibility check",
-                "Interest rates for loans",
-                "Home loan application",
-                "Need a loan",
-                "Loan information please",
-                "Want to borrow money",
-                "Loan options available",
-                "Check loan eligibility",
-                "Apply for credit"
-            ]
-        }
-        for intent, examples in default_intents.items():
-            st.session_state.nlu_engine.add_intent(intent, examples)
-    
     if 'query_history' not in st.session_state:
         st.session_state.query_history = []
     
@@ -340,6 +497,7 @@ def main():
     st.set_page_config(page_title="NLU Engine", page_icon="🧠", layout="wide")
     
     init_session_state()
+    shared_engine = get_shared_engine()
     
     # Custom CSS
     st.markdown("""
@@ -450,16 +608,20 @@ def main():
         st.markdown("### 📚 Intent Library")
         
         # Model status indicator
-        if st.session_state.nlu_engine.model_trained:
+        if shared_engine.model_trained:
             st.success("✅ Model is trained and ready")
+            if shared_engine.pending:
+                st.info(f"🕒 {len(shared_engine.pending)} new intent(s) will be used after the next training")
         else:
             st.warning("⚠️ Model needs training")
+        if shared_engine.is_training:
+            st.info("⏳ Training in progress in another session; queries use the current model until it finishes")
         
         st.markdown("---")
         
         # Display existing intents
-        for intent_name in sorted(st.session_state.nlu_engine.intents.keys()):
-            examples = st.session_state.nlu_engine.intents[intent_name]
+        for intent_name in sorted(shared_engine.intents.keys()):
+            examples = shared_engine.intents[intent_name]
             
             with st.expander(f"📋 {intent_name} ({len(examples)} examples)", expanded=False):
                 st.markdown(f"**Training examples:**")
@@ -485,7 +647,7 @@ def main():
             if new_intent_name and new_intent_examples:
                 examples = [line.strip() for line in new_intent_examples.split('\n') if line.strip()]
                 if examples:
-                    st.session_state.nlu_engine.add_intent(new_intent_name, examples)
+                    shared_engine.add_intent(new_intent_name, examples)
                     st.success(f"✅ Intent '{new_intent_name}' created with {len(examples)} examples!")
                     time.sleep(1)
                     st.rerun()
@@ -503,7 +665,7 @@ def main():
         if st.session_state.show_training:
             st.markdown("### 🔧 Training Configuration")
             
-            if not st.session_state.nlu_engine.intents:
+            if not shared_engine.intents:
                 st.error("⚠️ No intents found. Please create at least one intent.")
             else:
                 epochs = st.slider("Training Epochs", min_value=5, max_value=100, value=20, step=5, key="epochs_slider")
@@ -521,7 +683,7 @@ def main():
                     status_text = st.empty()
                     
                     with st.spinner("🧠 Training neural network..."):
-                        success, message, history = st.session_state.nlu_engine.train(
+                        success, message, history = shared_engine.train(
                             epochs=epochs,
                             learning_rate=learning_rate,
                             batch_size=batch_size
@@ -626,12 +788,12 @@ def main():
         top_k = st.slider("Top predictions to show", min_value=1, max_value=10, value=3, key="top_k_slider")
         
         if st.button("🔎 Analyze Query", type="primary", use_container_width=True, key="analyze_btn"):
-            if not st.session_state.nlu_engine.model_trained:
+            if not shared_engine.model_trained:
                 st.warning("⚠️ Please train the model first before testing.")
             elif user_query:
                 with st.spinner("🧠 Analyzing query..."):
-                    intent, confidence, all_scores = st.session_state.nlu_engine.predict(user_query, top_k=top_k)
-                    entities = st.session_state.nlu_engine.extract_entities(user_query)
+                    intent, confidence, all_scores = shared_engine.predict(user_query, top_k=top_k)
+                    entities = shared_engine.extract_entities(user_query)
                     
                     # Store in history
                     st.session_state.query_history.append({
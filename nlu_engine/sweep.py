@@ -0,0 +1,252 @@
+# ==============================
+# Hyperparameter Sweep Runner
+# ==============================
+#
+# Grid or random search over the NeuralNLUEngine (bag-of-words softmax)
+# and the TF-IDF + LogisticRegression classifier. Every (trial, fold)
+# pair is an independent task in a ProcessPoolExecutor, so a sweep keeps
+# all CPU cores busy. Scores are stratified k-fold cross-validation means.
+#
+#   results = run_sweep(pairs, model="tfidf", search="grid", folds=5)
+#   best_config(results)
+#
+#   python -m nlu_engine.sweep --model neural --search random --trials 12
+
+import argparse
+import itertools
+import json
+import os
+import random
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import multiprocessing
+
+import numpy as np
+
+from nlu_engine import dataset
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA = os.path.join(BASE_DIR, "intents.json")
+
+SEARCH_SPACES = {
+    "neural": {
+        "epochs": [10, 25, 50],
+        "learning_rate": [0.01, 0.05, 0.1, 0.5],
+        "batch_size": [8, 16, 32],
+    },
+    "tfidf": {
+        "C": [0.1, 1.0, 10.0, 100.0],
+        "ngram_max": [1, 2, 3],
+        "sublinear_tf": [True, False],
+    },
+}
+
+
+# ==============================
+# Search strategies
+# ==============================
+
+def grid_configs(space):
+    """Every combination of the values in the search space."""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def random_configs(space, n_trials, seed=42):
+    """n_trials distinct configs sampled from the grid (all of it if smaller)."""
+    grid = grid_configs(space)
+    if n_trials >= len(grid):
+        return grid
+    return random.Random(seed).sample(grid, n_trials)
+
+
+def stratified_folds(intents, folds=5, seed=42):
+    """
+    Assign every example a fold id, dealing each intent's examples
+    round-robin so every fold sees every intent where possible.
+    """
+    rng = np.random.default_rng(seed)
+    intents = np.asarray(intents)
+    fold_of = np.zeros(len(intents), dtype=int)
+
+    for intent in np.unique(intents):
+        members = np.flatnonzero(intents == intent)
+        fold_of[rng.permutation(members)] = np.arange(len(members)) % folds
+
+    return fold_of
+
+
+# ==============================
+# Trials (run inside worker processes)
+# ==============================
+
+def _limit_worker_threads():
+    """One BLAS thread per worker; the pool already provides the parallelism."""
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(1)
+    except ImportError:
+        pass
+
+
+def _log_loss(probs, y):
+    return float(-np.mean(np.log(probs[np.arange(len(y)), y] + 1e-10)))
+
+
+def _fit_neural(train_pairs, val_pairs, params, seed):
+    from nlu_engine.streamlit_app import NeuralNLUEngine
+
+    np.random.seed(seed)
+    engine = NeuralNLUEngine()
+    by_intent = OrderedDict()
+    for text, intent in train_pairs:
+        by_intent.setdefault(intent, []).append(text)
+    for intent, examples in by_intent.items():
+        engine.add_intent(intent, examples)
+
+    engine.train(
+        epochs=params["epochs"],
+        learning_rate=params["learning_rate"],
+        batch_size=params["batch_size"]
+    )
+
+    X = np.array([engine.vectorize_text(text) for text, _ in val_pairs])
+    logits = X @ engine.weights + engine.bias
+    exp_logits = np.exp(logits - logits.max(axis=1, keepdims=True))
+    probs = exp_logits / exp_logits.sum(axis=1, keepdims=True)
+
+    # Intents missing from this training fold can never be predicted
+    y = np.array([engine.intent_to_idx.get(intent, -1) for _, intent in val_pairs])
+    known = y >= 0
+    accuracy = float(np.mean(probs.argmax(axis=1) == y))
+    loss = _log_loss(probs[known], y[known]) if known.any() else float("nan")
+    return accuracy, loss
+
+
+def _fit_tfidf(train_pairs, val_pairs, params, seed):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    texts, intents = zip(*train_pairs)
+    vectorizer = TfidfVectorizer(
+        ngram_range=(1, params["ngram_max"]),
+        sublinear_tf=params["sublinear_tf"]
+    )
+    X = vectorizer.fit_transform([t.lower() for t in texts])
+    model = LogisticRegression(max_iter=1000, C=params["C"], random_state=seed)
+    model.fit(X, intents)
+
+    probs = model.predict_proba(vectorizer.transform([t.lower() for t, _ in val_pairs]))
+    index = {label: i for i, label in enumerate(model.classes_)}
+    y = np.array([index.get(intent, -1) for _, intent in val_pairs])
+    known = y >= 0
+    accuracy = float(np.mean(probs.argmax(axis=1) == y))
+    loss = _log_loss(probs[known], y[known]) if known.any() else float("nan")
+    return accuracy, loss
+
+
+TRAINERS = {
+    "neural": _fit_neural,
+    "tfidf": _fit_tfidf,
+}
+
+
+def run_fold(model, params, pairs, fold_of, fold, seed):
+    """Train on every fold but one and score the held-out fold."""
+    train_pairs = [p for p, f in zip(pairs, fold_of) if f != fold]
+    val_pairs = [p for p, f in zip(pairs, fold_of) if f == fold]
+
+    start = time.perf_counter()
+    accuracy, loss = TRAINERS[model](train_pairs, val_pairs, params, seed + fold)
+    return accuracy, loss, time.perf_counter() - start
+
+
+# ==============================
+# Sweep driver
+# ==============================
+
+def run_sweep(pairs, model="tfidf", space=None, search="grid", n_trials=10,
+              folds=5, seed=42, max_workers=None, on_result=None):
+    """
+    Cross-validate every config and return one result per trial, best first.
+    on_result(result, done, total) is called as each trial finishes.
+    """
+    pairs = [(str(text), str(intent)) for text, intent in pairs]
+    space = space or SEARCH_SPACES[model]
+    configs = grid_configs(space) if search == "grid" else random_configs(space, n_trials, seed)
+
+    # Folds can't outnumber the examples of the smallest intent
+    counts = np.unique([intent for _, intent in pairs], return_counts=True)[1]
+    folds = max(2, min(folds, int(counts.min()))) if len(counts) else 2
+    fold_of = stratified_folds([intent for _, intent in pairs], folds, seed)
+
+    scores = {trial: [] for trial in range(len(configs))}
+    results = []
+
+    # spawn: forking a threaded Streamlit server is unsafe
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count(),
+                             mp_context=context,
+                             initializer=_limit_worker_threads) as pool:
+        futures = {
+            pool.submit(run_fold, model, params, pairs, fold_of, fold, seed): trial
+            for trial, params in enumerate(configs)
+            for fold in range(folds)
+        }
+
+        for future in as_completed(futures):
+            trial = futures[future]
+            scores[trial].append(future.result())
+            if len(scores[trial]) < folds:
+                continue
+
+            accuracies, losses, durations = map(np.array, zip(*scores[trial]))
+            result = {
+                "model": model,
+                "params": configs[trial],
+                "folds": folds,
+                "accuracy": float(accuracies.mean()),
+                "accuracy_std": float(accuracies.std()),
+                "loss": float(np.nanmean(losses)) if np.any(~np.isnan(losses)) else float("nan"),
+                "duration": float(durations.sum()),
+            }
+            results.append(result)
+            if on_result:
+                on_result(result, len(results), len(configs))
+
+    return sorted(results, key=lambda r: (-r["accuracy"], r["loss"]))
+
+
+def best_config(results):
+    """Highest mean CV accuracy; lower loss breaks ties."""
+    if not results:
+        return None
+    return min(results, key=lambda r: (-r["accuracy"], r["loss"]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cross-validated hyperparameter sweep")
+    parser.add_argument("--data", nargs="+", default=[DEFAULT_DATA],
+                        help="Any sources nlu_engine.dataset can read")
+    parser.add_argument("--model", choices=sorted(TRAINERS), default="tfidf")
+    parser.add_argument("--search", choices=["grid", "random"], default="grid")
+    parser.add_argument("--trials", type=int, default=10)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    def report(result, done, total):
+        print(f"[{done}/{total}] {json.dumps(result['params'])} "
+              f"acc={result['accuracy'] * 100:.1f}% ±{result['accuracy_std'] * 100:.1f} "
+              f"loss={result['loss']:.4f}")
+
+    results = run_sweep(
+        list(dataset.iter_records(*args.data)), args.model, search=args.search, n_trials=args.trials,
+        folds=args.folds, max_workers=args.workers, on_result=report
+    )
+
+    best = best_config(results)
+    print(f"\n🏆 Best {args.model} config: {json.dumps(best['params'])}")
+    print(f"   CV accuracy {best['accuracy'] * 100:.2f}% ±{best['accuracy_std'] * 100:.2f} "
+          f"over {best['folds']} folds, loss {best['loss']:.4f}")
@@ -0,0 +1,262 @@
+# ==============================
+# Request Tracing
+# ==============================
+#
+# Lightweight span-based tracing for chat turns. Every turn gets a
+# context-local trace ID; nested spans record how long each stage took.
+# Finished spans go to an in-process ring buffer and, when
+# BANKBOT_TRACE_FILE is set, one OTLP/JSON line per turn is appended to
+# that file so other processes (the admin dashboard) can read it.
+
+import contextvars
+import functools
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+TRACE_BUFFER_SIZE = int(os.getenv("BANKBOT_TRACE_BUFFER", "2048"))
+TRACE_FILE = os.getenv("BANKBOT_TRACE_FILE")
+SERVICE_NAME = "bankbot"
+
+_trace_id = contextvars.ContextVar("bankbot_trace_id", default=None)
+_parent_span = contextvars.ContextVar("bankbot_parent_span", default=None)
+_trace_spans = contextvars.ContextVar("bankbot_trace_spans", default=None)
+
+_spans = deque(maxlen=TRACE_BUFFER_SIZE)
+_lock = threading.Lock()
+
+
+def get_trace_id():
+    """Trace ID of the turn running in the current context (or None)."""
+    return _trace_id.get()
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a block of work as a span.
+    Starts a new trace when no trace is active in this context.
+    """
+    is_root = _trace_id.get() is None
+    if is_root:
+        trace_token = _trace_id.set(secrets.token_hex(16))
+        spans_token = _trace_spans.set([])
+
+    record = {
+        "trace_id": _trace_id.get(),
+        "span_id": secrets.token_hex(8),
+        "parent_id": _parent_span.get(),
+        "name": name,
+        "start_ns": time.time_ns(),
+        "end_ns": None,
+        "duration_ms": None,
+        "status": "ok",
+        "attributes": dict(attributes),
+    }
+    parent_token = _parent_span.set(record["span_id"])
+    started = time.perf_counter_ns()
+
+    try:
+        yield record
+    except Exception as e:
+        record["status"] = "error"
+        record["attributes"]["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        elapsed = time.perf_counter_ns() - started
+        record["end_ns"] = record["start_ns"] + elapsed
+        record["duration_ms"] = elapsed / 1_000_000
+        _parent_span.reset(parent_token)
+
+        trace = _trace_spans.get()
+        if trace is not None:
+            trace.append(record)
+        with _lock:
+            _spans.append(record)
+
+        if is_root:
+            _trace_spans.reset(spans_token)
+            _trace_id.reset(trace_token)
+            if TRACE_FILE:
+                export_trace(trace, TRACE_FILE)
+
+
+def traced(name=None):
+    """Decorator form of span(), named after the function by default."""
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ==============================
+# Ring buffer access
+# ==============================
+
+def recent_spans(limit=None):
+    with _lock:
+        spans = list(_spans)
+    return spans[-limit:] if limit else spans
+
+
+def recent_traces(limit=20):
+    """Group buffered spans by trace, newest trace last."""
+    return group_traces(recent_spans(), limit)
+
+
+def group_traces(spans, limit=20):
+    traces = OrderedDict()
+    for s in spans:
+        traces.setdefault(s["trace_id"], []).append(s)
+    items = list(traces.items())[-limit:]
+    return OrderedDict(
+        (tid, sorted(group, key=lambda s: s["start_ns"])) for tid, group in items
+    )
+
+
+def clear():
+    with _lock:
+        _spans.clear()
+
+
+# ==============================
+# OTLP/JSON export
+# ==============================
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _to_otlp_span(record):
+    return {
+        "traceId": record["trace_id"],
+        "spanId": record["span_id"],
+        "parentSpanId": record["parent_id"] or "",
+        "name": record["name"],
+        "kind": 1,
+        "startTimeUnixNano": str(record["start_ns"]),
+        "endTimeUnixNano": str(record["end_ns"]),
+        "attributes": [
+            {"key": k, "value": _otlp_value(v)} for k, v in record["attributes"].items()
+        ],
+        "status": {"code": 2 if record["status"] == "error" else 1},
+    }
+
+
+def export_trace(spans, path):
+    """Append one trace as an OTLP ExportTraceServiceRequest JSON line."""
+    payload = {
+        "resourceSpans": [{
+            "resource": {
+                "attributes": [
+                    {"key": "service.name", "value": {"stringValue": SERVICE_NAME}}
+                ]
+            },
+            "scopeSpans": [{
+                "scope": {"name": "bankbot.tracing"},
+                "spans": [_to_otlp_span(s) for s in spans],
+            }],
+        }]
+    }
+    line = json.dumps(payload, ensure_ascii=False)
+
+    try:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with _lock, open(path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+    except OSError:
+        # Tracing must never break a chat turn
+        pass
+
+
+def _from_otlp_value(value):
+    if "intValue" in value:
+        return int(value["intValue"])
+    for key in ("doubleValue", "boolValue", "stringValue"):
+        if key in value:
+            return value[key]
+    return None
+
+
+def load_trace_file(path, limit=20):
+    """Read the newest `limit` traces written by export_trace()."""
+    if not path or not os.path.exists(path):
+        return OrderedDict()
+
+    with open(path, "r", encoding="utf-8") as f:
+        lines = deque(f, maxlen=limit)
+
+    spans = []
+    for line in lines:
+        try:
+            payload = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        for resource in payload.get("resourceSpans", []):
+            for scope in resource.get("scopeSpans", []):
+                for s in scope.get("spans", []):
+                    start, end = int(s["startTimeUnixNano"]), int(s["endTimeUnixNano"])
+                    spans.append({
+                        "trace_id": s["traceId"],
+                        "span_id": s["spanId"],
+                        "parent_id": s.get("parentSpanId") or None,
+                        "name": s["name"],
+                        "start_ns": start,
+                        "end_ns": end,
+                        "duration_ms": (end - start) / 1_000_000,
+                        "status": "error" if s.get("status", {}).get("code") == 2 else "ok",
+                        "attributes": {
+                            a["key"]: _from_otlp_value(a["value"]) for a in s.get("attributes", [])
+                        },
+                    })
+
+    return group_traces(spans, limit)
+
+
+def flame_rows(spans):
+    """
+    Flatten one trace into rows for a flame-style chart:
+    depth, offset from the root start and duration, all in ms.
+    """
+    if not spans:
+        return []
+
+    by_id = {s["span_id"]: s for s in spans}
+    root_start = min(s["start_ns"] for s in spans)
+
+    def depth(s):
+        d = 0
+        while s["parent_id"] in by_id:
+            s = by_id[s["parent_id"]]
+            d += 1
+        return d
+
+    return [
+        {
+            "name": s["name"],
+            "depth": depth(s),
+            "offset_ms": (s["start_ns"] - root_start) / 1_000_000,
+            "duration_ms": s["duration_ms"],
+            "status": s["status"],
+        }
+        for s in sorted(spans, key=lambda s: s["start_ns"])
+    ]
@@ -1,72 +1,351 @@
 # train_intent.py
 
+import hashlib
 import json
 import os
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, TrainingArguments, Trainer
-from datasets import Dataset
+import shutil
+import tempfile
+import time
+from transformers import (
+    AutoTokenizer,
+    AutoModelForSequenceClassification,
+    DataCollatorWithPadding,
+    EarlyStoppingCallback,
+    TrainingArguments,
+    Trainer
+)
+from datasets import Dataset, load_from_disk
+import numpy as np
 import torch
 
+from nlu_engine import augmentation, dataset, model_registry
+from nlu_engine.embedding_head import train_embedding_head
+
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
 MODEL_DIR = os.path.join(BASE_DIR, "models", "intent_model")
+TOKENIZED_CACHE_DIR = os.path.join(BASE_DIR, "models", "tokenized_cache")
+BASE_MODEL = "distilbert-base-uncased"
+REGISTRY_NAME = "intent_model"
 
 def load_training_data(data_path):
-    with open(data_path, "r") as f:
-        intents = json.load(f)
-
+    """Any format nlu_engine.dataset understands; label ids follow first appearance."""
     texts = []
     labels = []
-    label_map = {intent: idx for idx, intent in enumerate(intents.keys())}
+    label_map = {}
 
-    for intent, examples in intents.items():
-        for ex in examples:
-            texts.append(ex)
-            labels.append(label_map[intent])
+    for text, intent in dataset.iter_records(data_path):
+        texts.append(text)
+        labels.append(label_map.setdefault(intent, len(label_map)))
 
     return texts, labels, label_map
 
 
-def train(data_path, model_path, epochs, batch_size, learning_rate):
-    print("📌 Loading training data...")
-    texts, labels, label_map = load_training_data(data_path)
+def scan_training_data(data_path):
+    """
+    One streaming pass over the data: label ids (first appearance, same as
+    load_training_data) and the content hash. Texts are not kept.
+    """
+    label_map = {}
+
+    def records():
+        for text, intent in dataset.iter_records(data_path):
+            label_map.setdefault(intent, len(label_map))
+            yield text, intent
+
+    data_hash = dataset.hash_records(records())
+    return label_map, data_hash
 
-    dataset = Dataset.from_dict({
-        "text": texts,
-        "label": labels
-    })
 
-    print("📌 Loading tokenizer & model...")
-    tokenizer = AutoTokenizer.from_pretrained("distilbert-base-uncased")
+def _labelled_records(data_path, label_map, data_hash):
+    # data_hash is unused here but part of gen_kwargs, so the datasets cache
+    # is keyed by the content rather than the (possibly rewritten) path
+    for text, intent in dataset.iter_records(data_path):
+        yield {"text": text, "label": label_map[intent]}
+
+
+def stream_dataset(data_path, label_map, data_hash, cache_dir=TOKENIZED_CACHE_DIR):
+    """Records written straight into an on-disk Arrow table, never a Python list."""
+    return Dataset.from_generator(
+        _labelled_records,
+        gen_kwargs={"data_path": data_path, "label_map": label_map, "data_hash": data_hash},
+        cache_dir=os.path.join(cache_dir, "arrow"),
+    )
+
+
+def tokenized_cache_key(tokenizer, data_key):
+    """Hash of the tokenizer identity + training data (content hash and split)."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps({
+        "tokenizer": tokenizer.name_or_path,
+        "vocab_size": tokenizer.vocab_size,
+        "max_length": tokenizer.model_max_length,
+        "data": data_key,
+    }, sort_keys=True).encode())
+    return digest.hexdigest()[:16]
+
+
+def tokenize_dataset(tokenizer, records, data_key, cache_dir=TOKENIZED_CACHE_DIR):
+    """
+    Tokenize without padding (the collator pads each batch to its own
+    longest example) and cache the result on disk so repeat trainings on
+    unchanged data skip tokenization.
+    records: Dataset with "text" / "label" columns; data_key identifies it.
+    """
+    cache_path = os.path.join(cache_dir, tokenized_cache_key(tokenizer, data_key))
+    if os.path.isdir(cache_path):
+        print("📌 Using cached tokenized dataset...")
+        return load_from_disk(cache_path)
 
     def tokenize(batch):
-        return tokenizer(batch["text"], padding=True, truncation=True)
+        return tokenizer(batch["text"], truncation=True)
+
+    tokenized = records.map(tokenize, batched=True, remove_columns=["text"])
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tokenized.save_to_disk(cache_path)
+    return tokenized
+
+
+# ==============================
+# Training profiles
+# ==============================
+#
+# "full": fine-tune every layer (original behaviour).
+# "fast": CPU-friendly - freeze the embeddings and the lower transformer
+#         layers, bf16 autocast on CPUs that support it, and early
+#         stopping on a validation split.
+PROFILES = {
+    "full": {
+        "frozen_layers": 0,
+        "early_stopping": False,
+        "bf16": False,
+    },
+    "fast": {
+        "frozen_layers": 4,
+        "early_stopping": True,
+        "bf16": True,
+        "validation_fraction": 0.15,
+        "patience": 2,
+    },
+}
+
+# Head-only modes: frozen cached sentence embeddings + a small classifier
+HEAD_PROFILES = {
+    "head": "logreg",
+    "head_mlp": "mlp",
+}
+
+
+def configure_cpu_threads():
+    """One intra-op thread per core this process may run on."""
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    torch.set_num_threads(cores)
+    return cores
+
+
+def cpu_supports_bf16():
+    if torch.cuda.is_available():
+        return False
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def freeze_lower_layers(model, n_layers):
+    """Freeze the embeddings and the first n transformer blocks."""
+    base = getattr(model, model.base_model_prefix)
+    for param in base.embeddings.parameters():
+        param.requires_grad = False
+
+    blocks = base.transformer.layer if hasattr(base, "transformer") else base.encoder.layer
+    for block in blocks[:n_layers]:
+        for param in block.parameters():
+            param.requires_grad = False
+
+
+def split_indices(labels, fraction, seed=42):
+    """Per-label hold-out; labels with fewer than 3 examples stay in train."""
+    rng = np.random.default_rng(seed)
+    by_label = {}
+    for i, label in enumerate(labels):
+        by_label.setdefault(label, []).append(i)
+
+    train_idx, val_idx = [], []
+    for label in sorted(by_label):
+        idx = rng.permutation(by_label[label])
+        n_val = max(1, int(round(len(idx) * fraction))) if len(idx) >= 3 else 0
+        val_idx.extend(idx[:n_val].tolist())
+        train_idx.extend(idx[n_val:].tolist())
+    return sorted(train_idx), sorted(val_idx)
 
-    dataset = dataset.map(tokenize, batched=True)
+
+def split_validation(texts, labels, fraction, seed=42):
+    """split_indices applied to in-memory lists."""
+    train_idx, val_idx = split_indices(labels, fraction, seed)
+
+    def pick(ids):
+        return [texts[i] for i in ids], [labels[i] for i in ids]
+
+    return pick(train_idx), pick(val_idx)
+
+
+def compute_accuracy(eval_pred):
+    logits, label_ids = eval_pred
+    return {"accuracy": float((np.argmax(logits, axis=-1) == label_ids).mean())}
+
+
+def publish(model_path, data_hash, params, metrics, started, registry_name=REGISTRY_NAME):
+    """Register a finished model so serving picks it up atomically."""
+    if not registry_name:
+        return None
+    version = model_registry.register(
+        registry_name,
+        model_path,
+        metrics=metrics,
+        data_hash=data_hash,
+        params=params,
+        training_seconds=round(time.perf_counter() - started, 2)
+    )
+    print(f"📦 Registered {registry_name} version {version}")
+    return version
+
+
+def train(data_path, model_path, epochs, batch_size, learning_rate, callbacks=None, profile="full",
+          registry_name=REGISTRY_NAME, augment_variants=0):
+    started = time.perf_counter()
+    params = {
+        "epochs": epochs,
+        "batch_size": batch_size,
+        "learning_rate": learning_rate,
+        "profile": profile,
+        "augment_variants": augment_variants,
+    }
+
+    if augment_variants:
+        print(f"📌 Augmenting training data ({augment_variants} variants per example)...")
+        data_path = augmentation.build_augmented(data_path, n_variants=augment_variants)
+
+    print("📌 Scanning training data...")
+    label_map, data_hash = scan_training_data(data_path)
+
+    # Same data + same settings: serve the version we already have
+    if registry_name:
+        existing = model_registry.find_version(registry_name, data_hash, params)
+        if existing:
+            model_registry.activate(registry_name, existing)
+            print(f"⏭️ Data unchanged (hash {data_hash[:12]}); reusing {registry_name} version {existing}")
+            return
+
+    # Each run writes into a fresh directory that then replaces model_path,
+    # so nothing from an earlier profile (an embedding head next to new
+    # transformer weights, or the other way round) ends up in this version
+    parent = os.path.dirname(os.path.abspath(model_path))
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=parent, prefix=".train-")
+    os.chmod(staging, 0o755)  # mkdtemp is owner-only; model_path is not
+    try:
+        metrics = fit_profile(profile, data_path, label_map, data_hash, staging,
+                              epochs, batch_size, learning_rate, callbacks)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    if os.path.exists(model_path):
+        shutil.rmtree(model_path)
+    os.rename(staging, model_path)
+
+    publish(model_path, data_hash, params, metrics, started, registry_name)
+
+
+def fit_profile(profile, data_path, label_map, data_hash, model_path, epochs, batch_size,
+                learning_rate, callbacks=None):
+    """Train one profile into an empty model_path; returns its metrics."""
+    if profile in HEAD_PROFILES:
+        # The embedding head encodes every text in one go, so it needs the lists
+        texts, labels, label_map = load_training_data(data_path)
+        train_embedding_head(texts, labels, label_map, model_path, head=HEAD_PROFILES[profile])
+        return {}
+
+    settings = PROFILES[profile]
+    callbacks = list(callbacks or [])
+
+    print(f"📌 Loading tokenizer & model ({profile} profile)...")
+    if profile != "full":
+        print(f"📌 Using {configure_cpu_threads()} CPU threads")
+
+    tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL)
+    records = stream_dataset(data_path, label_map, data_hash)
+
+    val_dataset = None
+    if settings["early_stopping"]:
+        fraction = settings["validation_fraction"]
+        # Only the label column is read to pick the split
+        train_idx, val_idx = split_indices(records["label"], fraction)
+        train_dataset = tokenize_dataset(
+            tokenizer, records.select(train_idx), f"{data_hash}:train:{fraction}"
+        )
+        if val_idx:
+            val_dataset = tokenize_dataset(
+                tokenizer, records.select(val_idx), f"{data_hash}:val:{fraction}"
+            )
+    else:
+        train_dataset = tokenize_dataset(tokenizer, records, data_hash)
 
     model = AutoModelForSequenceClassification.from_pretrained(
-        "distilbert-base-uncased",
+        BASE_MODEL,
         num_labels=len(label_map)
     )
+    if settings["frozen_layers"]:
+        freeze_lower_layers(model, settings["frozen_layers"])
+
+    if val_dataset is not None:
+        callbacks.append(EarlyStoppingCallback(early_stopping_patience=settings["patience"]))
+        eval_args = {
+            "evaluation_strategy": "epoch",
+            "save_strategy": "epoch",
+            "load_best_model_at_end": True,
+            "metric_for_best_model": "accuracy",
+        }
+    else:
+        eval_args = {"evaluation_strategy": "no"}
 
     training_args = TrainingArguments(
         output_dir=model_path,
-        evaluation_strategy="no",
         per_device_train_batch_size=batch_size,
+        per_device_eval_batch_size=batch_size,
         num_train_epochs=epochs,
         learning_rate=learning_rate,
+        group_by_length=True,
+        bf16=settings["bf16"] and cpu_supports_bf16(),
         logging_steps=10,
-        save_total_limit=1
+        save_total_limit=1,
+        **eval_args
     )
 
     trainer = Trainer(
         model=model,
         args=training_args,
-        train_dataset=dataset
+        train_dataset=train_dataset,
+        eval_dataset=val_dataset,
+        data_collator=DataCollatorWithPadding(tokenizer),
+        compute_metrics=compute_accuracy if val_dataset is not None else None,
+        callbacks=callbacks
     )
 
     print("📌 Training started...")
-    trainer.train()
+    train_output = trainer.train()
     print("✅ Training complete!")
 
+    metrics = {"training_loss": float(train_output.training_loss)}
+    if val_dataset is not None:
+        metrics["val_accuracy"] = float(trainer.evaluate()["eval_accuracy"])
+
     print("📌 Saving model & labels...")
     os.makedirs(model_path, exist_ok=True)
 
@@ -76,4 +355,9 @@ def train(data_path, model_path, epochs, batch_size, learning_rate):
     with open(os.path.join(model_path, "labels.json"), "w") as f:
         json.dump(label_map, f, indent=2)
 
+    # IntentClassifier maps predictions back through id2label.json
+    with open(os.path.join(model_path, "id2label.json"), "w") as f:
+        json.dump({str(idx): intent for intent, idx in label_map.items()}, f, indent=2)
+
     print("🎉 Model saved successfully!")
+    return metrics
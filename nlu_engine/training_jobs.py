@@ -0,0 +1,327 @@
+# ==============================
+# Background Training Jobs
+# ==============================
+#
+# Training runs in its own worker process instead of inside the
+# Streamlit callback. Jobs live in a small SQLite table so any session
+# (or process) can see progress, cancel a run, or queue the next one.
+# Only one job runs at a time; the rest wait in the queue.
+#
+#   job_id = submit_job(data_path, model_path, epochs=10)
+#   get_job(job_id)   -> status, epoch, step, loss, ...
+#   cancel_job(job_id)
+
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JOBS_DB = os.getenv("BANKBOT_JOBS_DB", os.path.join(BASE_DIR, "models", "training_jobs.db"))
+
+PROGRESS_INTERVAL = 1.0  # seconds between progress writes
+SPAWN_GRACE = 60         # seconds a claimed job may go without a worker pid
+
+
+def _connect():
+    os.makedirs(os.path.dirname(JOBS_DB), exist_ok=True)
+    conn = sqlite3.connect(JOBS_DB, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS training_jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        status TEXT NOT NULL,
+        params TEXT NOT NULL,
+        submitted_by TEXT,
+        created_at TEXT NOT NULL,
+        started_at TEXT,
+        finished_at TEXT,
+        pid INTEGER,
+        epoch REAL DEFAULT 0,
+        step INTEGER DEFAULT 0,
+        total_steps INTEGER DEFAULT 0,
+        loss REAL,
+        message TEXT,
+        cancel_requested INTEGER DEFAULT 0
+    )
+    """)
+    return conn
+
+
+def _now():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _row_to_job(row):
+    if row is None:
+        return None
+    job = dict(row)
+    job["params"] = json.loads(job["params"])
+    return job
+
+
+# ==============================
+# Public API
+# ==============================
+
+def submit_job(data_path, model_path, epochs=10, batch_size=8, learning_rate=3e-5,
+               submitted_by=None, **options):
+    """Queue a training run and start it if nothing else is training."""
+    params = {
+        "data_path": data_path,
+        "model_path": model_path,
+        "epochs": int(epochs),
+        "batch_size": int(batch_size),
+        "learning_rate": float(learning_rate),
+        **options,
+    }
+
+    conn = _connect()
+    cur = conn.execute(
+        "INSERT INTO training_jobs (status, params, submitted_by, created_at) VALUES (?, ?, ?, ?)",
+        ("queued", json.dumps(params), submitted_by, _now())
+    )
+    job_id = cur.lastrowid
+    conn.close()
+
+    dispatch()
+    return job_id
+
+
+def get_job(job_id):
+    conn = _connect()
+    row = conn.execute("SELECT * FROM training_jobs WHERE id = ?", (job_id,)).fetchone()
+    conn.close()
+    return _row_to_job(row)
+
+
+def list_jobs(limit=20):
+    conn = _connect()
+    rows = conn.execute(
+        "SELECT * FROM training_jobs ORDER BY id DESC LIMIT ?", (limit,)
+    ).fetchall()
+    conn.close()
+    return [_row_to_job(r) for r in rows]
+
+
+def active_job():
+    """The running job, or else the oldest queued one."""
+    reap_stale_jobs()
+    conn = _connect()
+    row = conn.execute("""
+        SELECT * FROM training_jobs
+        WHERE status IN ('running', 'queued')
+        ORDER BY CASE status WHEN 'running' THEN 0 ELSE 1 END, id
+        LIMIT 1
+    """).fetchone()
+    conn.close()
+    return _row_to_job(row)
+
+
+def queue_position(job_id):
+    conn = _connect()
+    (ahead,) = conn.execute(
+        "SELECT COUNT(*) FROM training_jobs WHERE status IN ('running', 'queued') AND id < ?",
+        (job_id,)
+    ).fetchone()
+    conn.close()
+    return ahead
+
+
+def cancel_job(job_id):
+    """Cancel a queued job outright, or ask a running one to stop."""
+    conn = _connect()
+    conn.execute(
+        "UPDATE training_jobs SET status = 'cancelled', finished_at = ?, message = 'Cancelled before start' "
+        "WHERE id = ? AND status = 'queued'",
+        (_now(), job_id)
+    )
+    conn.execute(
+        "UPDATE training_jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'",
+        (job_id,)
+    )
+    conn.close()
+
+
+def dispatch():
+    """Start the next queued job in a worker process if none is running."""
+    reap_stale_jobs()
+
+    conn = _connect()
+    conn.execute("BEGIN IMMEDIATE")
+    running = conn.execute(
+        "SELECT 1 FROM training_jobs WHERE status = 'running' LIMIT 1"
+    ).fetchone()
+    row = None if running else conn.execute(
+        "SELECT id FROM training_jobs WHERE status = 'queued' ORDER BY id LIMIT 1"
+    ).fetchone()
+
+    if row is None:
+        conn.execute("COMMIT")
+        conn.close()
+        return None
+
+    job_id = row["id"]
+    conn.execute(
+        "UPDATE training_jobs SET status = 'running', started_at = ? WHERE id = ?",
+        (_now(), job_id)
+    )
+    conn.execute("COMMIT")
+
+    try:
+        worker = subprocess.Popen(
+            [sys.executable, "-m", "nlu_engine.training_jobs", "run", str(job_id)],
+            cwd=BASE_DIR,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True
+        )
+    except OSError as e:
+        conn.execute(
+            "UPDATE training_jobs SET status = 'failed', finished_at = ?, message = ? WHERE id = ?",
+            (_now(), f"Could not start worker: {e}", job_id)
+        )
+        conn.close()
+        return None
+    conn.execute("UPDATE training_jobs SET pid = ? WHERE id = ?", (worker.pid, job_id))
+    conn.close()
+    return job_id
+
+
+def reap_stale_jobs():
+    """
+    Mark running jobs whose worker process has died as failed. A job with
+    no pid SPAWN_GRACE seconds after it was claimed lost its dispatcher
+    before the worker was recorded, and would block the queue forever.
+    """
+    conn = _connect()
+    rows = conn.execute(
+        "SELECT id, pid, started_at FROM training_jobs WHERE status = 'running'"
+    ).fetchall()
+
+    for row in rows:
+        if row["pid"] is None:
+            started = datetime.strptime(row["started_at"], "%Y-%m-%d %H:%M:%S")
+            stale = (datetime.now() - started).total_seconds() > SPAWN_GRACE
+        else:
+            stale = not _pid_alive(row["pid"])
+        if stale:
+            conn.execute(
+                "UPDATE training_jobs SET status = 'failed', finished_at = ?, "
+                "message = 'Worker process exited unexpectedly' WHERE id = ? AND status = 'running'",
+                (_now(), row["id"])
+            )
+    conn.close()
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+
+    # A finished child we never waited on is a zombie, not a live worker
+    try:
+        waited, _ = os.waitpid(pid, os.WNOHANG)
+        return waited == 0
+    except ChildProcessError:
+        return True
+
+
+# ==============================
+# Worker side
+# ==============================
+
+def _update(job_id, **fields):
+    conn = _connect()
+    assignments = ", ".join(f"{k} = ?" for k in fields)
+    conn.execute(f"UPDATE training_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+    conn.close()
+
+
+def _cancel_requested(job_id):
+    conn = _connect()
+    (flag,) = conn.execute(
+        "SELECT cancel_requested FROM training_jobs WHERE id = ?", (job_id,)
+    ).fetchone()
+    conn.close()
+    return bool(flag)
+
+
+class TrainingCancelled(Exception):
+    pass
+
+
+def make_progress_callback(job_id):
+    """TrainerCallback that streams epoch/step/loss into the job table."""
+    from transformers import TrainerCallback
+
+    class JobProgressCallback(TrainerCallback):
+        def __init__(self):
+            self.last_write = 0.0
+            self.loss = None
+
+        def on_train_begin(self, args, state, control, **kwargs):
+            _update(job_id, total_steps=state.max_steps)
+
+        def on_log(self, args, state, control, logs=None, **kwargs):
+            if logs and "loss" in logs:
+                self.loss = float(logs["loss"])
+
+        def on_step_end(self, args, state, control, **kwargs):
+            now = time.monotonic()
+            if now - self.last_write >= PROGRESS_INTERVAL or state.global_step == state.max_steps:
+                self.last_write = now
+                _update(
+                    job_id,
+                    epoch=float(state.epoch or 0),
+                    step=state.global_step,
+                    total_steps=state.max_steps,
+                    loss=self.loss
+                )
+                # Abort before the model is saved
+                if _cancel_requested(job_id):
+                    raise TrainingCancelled()
+            return control
+
+    return JobProgressCallback()
+
+
+def run_job(job_id):
+    """Entry point of the worker process."""
+    job = get_job(job_id)
+    params = dict(job["params"])
+    _update(job_id, pid=os.getpid())
+
+    try:
+        from nlu_engine.train_intent import train
+
+        train(
+            params.pop("data_path"),
+            params.pop("model_path"),
+            params.pop("epochs"),
+            params.pop("batch_size"),
+            params.pop("learning_rate"),
+            callbacks=[make_progress_callback(job_id)],
+            **params
+        )
+    except TrainingCancelled:
+        _update(job_id, status="cancelled", finished_at=_now(), message="Cancelled by user")
+    except Exception as e:
+        _update(job_id, status="failed", finished_at=_now(), message=f"{type(e).__name__}: {e}")
+    else:
+        _update(job_id, status="completed", finished_at=_now(), message="Model saved")
+    finally:
+        dispatch()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "run":
+        run_job(int(sys.argv[2]))
+    else:
+        print("Usage: python -m nlu_engine.training_jobs run <job_id>")
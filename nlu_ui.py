@@ -3,9 +3,10 @@ import streamlit as st
 import os
 import json
 import re
+import time
 from nlu_engine.intent_classifier import IntentClassifier
 from nlu_engine.entity_extractor import get_entities
-from nlu_engine.train_intent import train
+from nlu_engine import training_jobs
 
 # ----------------------------
 # Paths
@@ -140,9 +141,49 @@ batch_size = st.number_input("Batch Size", min_value=2, max_value=32, value=8)
 learning_rate = st.number_input(
     "Learning Rate", min_value=0.00001, max_value=0.01, value=0.00003, format="%.5f"
 )
+profile = st.selectbox(
+    "Training Profile", ["full", "fast", "head", "head_mlp"],
+    help="fast: freezes lower layers, uses bf16 where the CPU supports it and stops early on a validation split. "
+         "head / head_mlp: trains only a classifier on cached sentence embeddings (near-instant retrains)"
+)
+augment_variants = st.number_input(
+    "Augmented Variants per Example", min_value=0, max_value=20, value=0,
+    help="Template, synonym and typo variants generated before training (0 = off)"
+)
 
 if st.button("Train Model"):
-    with st.spinner("Training model... this may take a few minutes..."):
-        train(TRAIN_DATA_PATH, INTENT_MODEL_PATH, epochs, batch_size, learning_rate)
-    st.success("Model training completed!")
-    st.balloons()
\ No newline at end of file
+    st.session_state.training_job_id = training_jobs.submit_job(
+        TRAIN_DATA_PATH, INTENT_MODEL_PATH, epochs, batch_size, learning_rate, profile=profile,
+        augment_variants=augment_variants
+    )
+
+# ----------------------------
+# Training Job Status (polled, training runs in a worker process)
+# ----------------------------
+if st.session_state.get("training_job_id"):
+    training_jobs.dispatch()
+    job = training_jobs.get_job(st.session_state.training_job_id)
+
+    if job is None:
+        # Deleted, or the jobs database was reset
+        st.session_state.pop("training_job_id", None)
+        st.warning("That training job no longer exists; start a new one.")
+    elif job["status"] == "queued":
+        ahead = training_jobs.queue_position(job["id"])
+        st.info(f"Job #{job['id']} queued behind {ahead} other training run(s)")
+    elif job["status"] == "running":
+        st.progress(min(job["step"] / job["total_steps"], 1.0) if job["total_steps"] else 0.0)
+        loss = f"{job['loss']:.4f}" if job["loss"] is not None else "-"
+        st.write(f"Epoch {job['epoch']:.2f} • Step {job['step']}/{job['total_steps']} • Loss {loss}")
+    elif job["status"] == "completed":
+        st.success("Model training completed!")
+    elif job["status"] == "cancelled":
+        st.warning("Training cancelled")
+    else:
+        st.error(f"Training failed: {job['message']}")
+
+    if job is not None and job["status"] in ("queued", "running"):
+        if st.button("Cancel Training"):
+            training_jobs.cancel_job(job["id"])
+        time.sleep(2)
+        st.rerun()
\ No newline at end of file
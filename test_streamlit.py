@@ -1,5 +1,10 @@
+import uuid
+
 import streamlit as st
+from nlu_engine.conversation_store import PAGE_SIZE, ConversationWindow
 from nlu_engine.dialogue_handler import handle_dialogue
+from nlu_engine.rate_limit import RATE_LIMIT_MESSAGE, check_rate
+from nlu_engine.session_state import get_store
 
 # =================================================
 # PAGE CONFIG (MUST BE FIRST)
@@ -114,8 +119,19 @@ footer, header { visibility: hidden; }
 if "authenticated" not in st.session_state:
     st.session_state.authenticated = False
 
-if "chat_history" not in st.session_state:
-    st.session_state.chat_history = []
+if "session_id" not in st.session_state:
+    st.session_state.session_id = str(uuid.uuid4())
+
+# Bounded window over the chat; older turns stay in SQLite
+if "conversation" not in st.session_state:
+    st.session_state.conversation = ConversationWindow.load(st.session_state.session_id)
+
+# Pages of earlier messages the user has asked to see
+if "history_pages" not in st.session_state:
+    st.session_state.history_pages = 0
+
+# Only the newest messages are drawn on every rerun
+RENDER_LAST = 20
 
 # =================================================
 # LOGIN PAGE
@@ -148,15 +164,31 @@ def chatbot_page():
         unsafe_allow_html=True
     )
 
+    convo = st.session_state.conversation
+
     # Greeting
-    if not st.session_state.chat_history:
-        st.session_state.chat_history.append({
-            "role": "assistant",
-            "content": "👋 Hello! I’m your **BankBot AI**. Ask me about balance, transactions, or latest banking updates."
-        })
-
-    # Render history
-    for msg in st.session_state.chat_history:
+    if not len(convo):
+        convo.append(
+            "assistant",
+            "👋 Hello! I’m your **BankBot AI**. Ask me about balance, transactions, or latest banking updates.",
+            flush=True,
+        )
+
+    # Render history: earlier messages only on request, read from SQLite
+    visible = list(convo.messages)[-RENDER_LAST:]
+    if len(convo) > len(visible):
+        if st.session_state.history_pages:
+            convo.flush()
+            earlier = convo.page_older(visible[0]["id"], PAGE_SIZE * st.session_state.history_pages)
+            with st.expander(f"🕘 {len(earlier)} earlier messages", expanded=True):
+                for msg in earlier:
+                    with st.chat_message(msg["role"]):
+                        st.markdown(msg["content"])
+        if st.button("⬆️ Load earlier messages"):
+            st.session_state.history_pages += 1
+            st.rerun()
+
+    for msg in visible:
         with st.chat_message(msg["role"]):
             st.markdown(msg["content"])
 
@@ -164,22 +196,29 @@ def chatbot_page():
     user_input = st.chat_input("Ask about balance, transfer, loans, or news...")
 
     if user_input:
-        st.session_state.chat_history.append(
-            {"role": "user", "content": user_input}
-        )
+        with st.chat_message("user"):
+            st.markdown(user_input)
 
+        allowed, _ = check_rate(f"session:{st.session_state.session_id}")
         with st.chat_message("assistant"):
-            with st.spinner("🔐 Processing securely..."):
-                response = handle_dialogue(user_input)
-                st.markdown(response)
+            if not allowed:
+                response = RATE_LIMIT_MESSAGE
+            else:
+                with st.spinner("🔐 Processing securely..."):
+                    response = handle_dialogue(user_input, st.session_state.session_id,
+                                               history=convo.llm_context())
+            st.markdown(response)
 
-        st.session_state.chat_history.append(
-            {"role": "assistant", "content": response}
-        )
+        # Both messages in one write
+        convo.add_turn(user_input, response)
 
     if st.button("Logout"):
         st.session_state.authenticated = False
-        st.session_state.chat_history = []
+        st.session_state.conversation.flush()
+        get_store().delete(st.session_state.session_id)
+        st.session_state.session_id = str(uuid.uuid4())
+        st.session_state.conversation = ConversationWindow(st.session_state.session_id)
+        st.session_state.history_pages = 0
         st.rerun()
 
 # =================================================